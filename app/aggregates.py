@@ -0,0 +1,337 @@
+"""Running per-month, per-category totals for summaries.
+
+Each bucket holds, in integer cents, the income and expense of one category
+in one month, plus how many rows went into it. A summary over whole months
+adds up buckets; the partial months at either end of a date range come from
+per-day totals (``DailyTotals``) or, failing those, the records themselves.
+"""
+
+import threading
+from bisect import bisect_left, bisect_right, insort
+from datetime import date, timedelta
+from typing import Callable, Iterable, Optional
+
+from app.models import Summary
+
+# Bucket layout: [income, expense, expense_rows, rows].
+INCOME, EXPENSE, EXPENSE_ROWS, ROWS = range(4)
+
+Bucket = tuple[str, str, list[int]]
+
+# Days earlier than the last one with records that ``DailyTotals`` keeps
+# outside its trees before rebuilding them.
+MAX_EXTRA_DAYS = 128
+
+
+def to_cents(amount: float) -> int:
+    return round(amount * 100)
+
+
+def _tally(values: list[int], amount: float) -> None:
+    cents = to_cents(amount)
+    if cents > 0:
+        values[INCOME] += cents
+    else:
+        values[EXPENSE] -= cents
+        values[EXPENSE_ROWS] += 1
+    values[ROWS] += 1
+
+
+def month_key(d: date) -> str:
+    return d.isoformat()[:7]
+
+
+def _month_end(d: date) -> date:
+    next_month = (d.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return next_month - timedelta(days=1)
+
+
+def split_range(
+    from_date: Optional[date],
+    to_date: Optional[date],
+) -> tuple[list[tuple[date, date]], Optional[tuple[Optional[str], Optional[str]]]]:
+    """Split an inclusive date range into partial months and whole months.
+
+    Returns the ``(from, to)`` ranges that cover partial months, and the
+    first and last whole month (``None`` meaning unbounded), or ``None`` when
+    no whole month falls inside the range.
+    """
+    if from_date is not None and to_date is not None and from_date > to_date:
+        return [], None
+    edges = []
+    first = last = None
+    if from_date is not None:
+        if from_date.day == 1:
+            first = month_key(from_date)
+        else:
+            month_end = _month_end(from_date)
+            if to_date is not None and to_date <= month_end:
+                return [(from_date, to_date)], None
+            edges.append((from_date, month_end))
+            first = month_key(month_end + timedelta(days=1))
+    if to_date is not None:
+        if to_date == _month_end(to_date):
+            last = month_key(to_date)
+        else:
+            month_start = to_date.replace(day=1)
+            edges.append((month_start, to_date))
+            last = month_key(month_start - timedelta(days=1))
+    if first is not None and last is not None and first > last:
+        return edges, None
+    return edges, (first, last)
+
+
+class MonthlyAggregates:
+    """Buckets keyed by month and category, kept current on append."""
+
+    def __init__(self, records: Iterable[dict] = ()):
+        self._lock = threading.Lock()
+        self._months: dict[str, dict[str, list[int]]] = {}
+        # Sorted month keys, so a month range is two binary searches.
+        self._keys: list[str] = []
+        self.add(records)
+
+    def _bucket(self, month: str, category: str) -> list[int]:
+        categories = self._months.get(month)
+        if categories is None:
+            categories = self._months[month] = {}
+            insort(self._keys, month)
+        bucket = categories.get(category)
+        if bucket is None:
+            bucket = categories[category] = [0, 0, 0, 0]
+        return bucket
+
+    def add(self, records: Iterable[dict]) -> None:
+        with self._lock:
+            for r in records:
+                _tally(self._bucket(r["date"][:7], r["category"]), r["amount"])
+
+    def merge(self, buckets: Iterable[Bucket]) -> None:
+        with self._lock:
+            for month, category, values in buckets:
+                bucket = self._bucket(month, category)
+                for i, value in enumerate(values):
+                    bucket[i] += value
+
+    def buckets(self, first: Optional[str] = None, last: Optional[str] = None) -> list[Bucket]:
+        """Buckets from month ``first`` to ``last`` inclusive."""
+        with self._lock:
+            lo = bisect_left(self._keys, first) if first is not None else 0
+            hi = bisect_right(self._keys, last) if last is not None else len(self._keys)
+            return [
+                (month, category, list(bucket))
+                for month in self._keys[lo:hi]
+                for category, bucket in self._months[month].items()
+            ]
+
+    def summary(self) -> Summary:
+        """Equivalent of ``compute_summary`` over every bucket."""
+        income = expense = 0
+        spend: dict[str, int] = {}
+        monthly: dict[str, int] = {}
+        for month, category, bucket in self.buckets():
+            income += bucket[INCOME]
+            expense += bucket[EXPENSE]
+            if bucket[EXPENSE_ROWS]:
+                spend[category] = spend.get(category, 0) + bucket[EXPENSE]
+            if bucket[ROWS]:
+                monthly[month] = monthly.get(month, 0) + bucket[INCOME] - bucket[EXPENSE]
+        return Summary(
+            total_income=round(income / 100, 2),
+            total_expense=round(expense / 100, 2),
+            net=round((income - expense) / 100, 2),
+            spend_by_category={c: round(v / 100, 2) for c, v in spend.items()},
+            monthly_net={m: round(v / 100, 2) for m, v in monthly.items()},
+        )
+
+
+def _contains(values: list[int], value: int) -> bool:
+    i = bisect_left(values, value)
+    return i < len(values) and values[i] == value
+
+
+class FenwickTree:
+    """Prefix sums over ``size`` slots, each holding ``width`` integers.
+
+    Adding to a slot and summing a prefix both touch O(log size) nodes.
+    """
+
+    def __init__(self, size: int, width: int):
+        self.size = size
+        self._trees = [[0] * (size + 1) for _ in range(width)]
+
+    @classmethod
+    def from_points(cls, columns: list[list[int]]) -> "FenwickTree":
+        """Build from per-slot values, one list per column, in O(size)."""
+        tree = cls(0, 0)
+        tree.size = len(columns[0])
+        tree._trees = [[0, *column] for column in columns]
+        for values in tree._trees:
+            for i in range(1, tree.size + 1):
+                parent = i + (i & -i)
+                if parent <= tree.size:
+                    values[parent] += values[i]
+        return tree
+
+    def points(self) -> list[list[int]]:
+        """Per-slot values, one list per column; the inverse of ``from_points``."""
+        columns = []
+        for values in self._trees:
+            values = list(values)
+            for i in range(self.size, 0, -1):
+                parent = i + (i & -i)
+                if parent <= self.size:
+                    values[parent] -= values[i]
+            columns.append(values[1:])
+        return columns
+
+    def add(self, slot: int, amounts: list[int]) -> None:
+        i = slot + 1
+        while i <= self.size:
+            for values, amount in zip(self._trees, amounts):
+                values[i] += amount
+            i += i & -i
+
+    def prefix(self, end: int) -> list[int]:
+        """Sums of slots ``[0, end)``."""
+        sums = [0] * len(self._trees)
+        i = end
+        while i > 0:
+            for column, values in enumerate(self._trees):
+                sums[column] += values[i]
+            i -= i & -i
+        return sums
+
+    def range(self, start: int, end: int) -> list[int]:
+        """Sums of slots ``[start, end)``."""
+        return [b - a for a, b in zip(self.prefix(start), self.prefix(end))]
+
+
+class DailyTotals:
+    """Per-category buckets by day, as one Fenwick tree per category.
+
+    Slot ``i`` of every tree holds the ``i``-th of the distinct days that
+    have transactions, so the trees are sized by how many days have records
+    rather than by the calendar span between the first and the last, and the
+    totals for any date range are two binary searches and two prefix sums per
+    category. A new day after the last one takes the next spare slot. A new
+    day before it is kept aside and scanned, until ``MAX_EXTRA_DAYS`` such
+    days (or running out of spare slots) rebuild the trees over them all.
+    """
+
+    def __init__(self, records: Iterable[dict] = ()):
+        self._lock = threading.Lock()
+        # Sorted distinct day ordinals; the trees have spare slots after them.
+        self._days: list[int] = []
+        self._size = 0
+        self._trees: dict[str, FenwickTree] = {}
+        # (category, day) -> bucket values for days not in the trees yet.
+        self._extra: dict[tuple[str, int], list[int]] = {}
+        self._extra_days: set[int] = set()
+        # ISO date -> ordinal; there are far fewer days than records.
+        self._ordinals: dict[str, int] = {}
+        self.add(records)
+
+    def _ordinal(self, day: str) -> int:
+        ordinal = self._ordinals.get(day)
+        if ordinal is None:
+            ordinal = self._ordinals[day] = date.fromisoformat(day).toordinal()
+        return ordinal
+
+    def add(self, records: Iterable[dict]) -> None:
+        points: dict[tuple[str, int], list[int]] = {}
+        for r in records:
+            key = (r["category"], self._ordinal(r["date"]))
+            values = points.get(key)
+            if values is None:
+                values = points[key] = [0, 0, 0, 0]
+            _tally(values, r["amount"])
+        if not points:
+            return
+        with self._lock:
+            days, extra_days = self._days, self._extra_days
+            new = sorted(
+                {day for _, day in points if day not in extra_days and not _contains(days, day)}
+            )
+            earlier = bisect_left(new, days[-1]) if days else 0
+            if (
+                len(days) + len(new) - earlier > self._size
+                or len(extra_days) + earlier > MAX_EXTRA_DAYS
+            ):
+                self._rebuild(new, points)
+                return
+            days.extend(new[earlier:])
+            extra_days.update(new[:earlier])
+            for (category, day), values in points.items():
+                if day in extra_days:
+                    bucket = self._extra.setdefault((category, day), [0, 0, 0, 0])
+                    for i, value in enumerate(values):
+                        bucket[i] += value
+                    continue
+                tree = self._trees.get(category)
+                if tree is None:
+                    tree = self._trees[category] = FenwickTree(self._size, 4)
+                tree.add(bisect_left(days, day), values)
+
+    def _rebuild(self, new: list[int], points: dict[tuple[str, int], list[int]]) -> None:
+        days = sorted([*self._days, *self._extra_days, *new])
+        # Leave room after the last day, where most new records land.
+        size = 2 * len(days)
+        slots = [bisect_left(days, day) for day in self._days]
+        columns = {}
+        for category, tree in self._trees.items():
+            columns[category] = []
+            for old in tree.points():
+                column = [0] * size
+                for slot, value in zip(slots, old):
+                    column[slot] = value
+                columns[category].append(column)
+        for (category, day), values in [*self._extra.items(), *points.items()]:
+            if category not in columns:
+                columns[category] = [[0] * size for _ in range(4)]
+            slot = bisect_left(days, day)
+            for column, value in zip(columns[category], values):
+                column[slot] += value
+        self._days, self._size = days, size
+        self._trees = {c: FenwickTree.from_points(cols) for c, cols in columns.items()}
+        self._extra, self._extra_days = {}, set()
+
+    def totals(self, lower: date, upper: date) -> dict[str, list[int]]:
+        """Bucket values per category for the days from ``lower`` to ``upper``."""
+        first, last = lower.toordinal(), upper.toordinal()
+        with self._lock:
+            start = bisect_left(self._days, first)
+            end = bisect_right(self._days, last)
+            totals = {}
+            if start < end:
+                totals = {c: tree.range(start, end) for c, tree in self._trees.items()}
+            for (category, day), values in self._extra.items():
+                if first <= day <= last:
+                    sums = totals.setdefault(category, [0, 0, 0, 0])
+                    for i, value in enumerate(values):
+                        sums[i] += value
+        return {c: values for c, values in totals.items() if values[ROWS]}
+
+    def buckets(self, lower: date, upper: date) -> list[Bucket]:
+        """Buckets for the days from ``lower`` to ``upper``, which must fall
+        in the same month."""
+        month = month_key(lower)
+        return [(month, c, values) for c, values in self.totals(lower, upper).items()]
+
+
+def summarize_range(
+    from_date: Optional[date],
+    to_date: Optional[date],
+    buckets: Callable[[Optional[str], Optional[str]], Iterable[Bucket]],
+    partial: Callable[[date, date], Iterable[Bucket]],
+) -> Summary:
+    """Summary of a date range from whole-month ``buckets`` plus the
+    ``partial`` buckets of the days in any partial months at its ends."""
+    edges, months = split_range(from_date, to_date)
+    totals = MonthlyAggregates()
+    for lower, upper in edges:
+        totals.merge(partial(lower, upper))
+    if months is not None:
+        totals.merge(buckets(*months))
+    return totals.summary()
+
@@ -0,0 +1,196 @@
+"""Async access to the configured store, for the route handlers.
+
+Reads, and any CPU-heavy work handed to ``offload``, run on a small
+dedicated thread pool, so a burst of slow queries queues up there instead
+of occupying Starlette's shared threadpool. Appends go through a queue to a
+single writer thread, which applies them in order and commits whatever has
+queued up as one batch. Either way the event loop only awaits the result
+and never touches the disk itself.
+"""
+
+import asyncio
+import contextvars
+import functools
+import itertools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from typing import AsyncIterator, Callable, Iterator, Optional, TypeVar
+
+from app import metrics, storage
+from app.concurrency import SingleWriter
+from app.dedupe import DuplicateCheck
+from app.models import Category, Goal, Granularity, Summary, Transaction
+
+T = TypeVar("T")
+
+READ_WORKERS = int(os.environ.get("COMPOUND_READ_WORKERS", "4"))
+
+_readers = ThreadPoolExecutor(READ_WORKERS, thread_name_prefix="compound-read")
+
+
+def _flush(entries: list[tuple[storage.Store, str, list[dict]]]) -> None:
+    for store, group in itertools.groupby(entries, key=lambda e: e[0]):
+        batch = [(kind, records) for _, kind, records in group]
+        store.append_many(batch)
+        storage.notify(batch, store.version())
+
+
+def _commit(
+    entries: list[tuple[storage.Store, str, list[dict], Optional[DuplicateCheck]]],
+) -> list[Optional[list[bool]]]:
+    # A checked entry is checked and appended in one step by the store, after
+    # the entries before it in this batch are written, so it sees them too.
+    pending: list[tuple[storage.Store, str, list[dict]]] = []
+    results: list[Optional[list[bool]]] = []
+    for store, kind, records, check in entries:
+        found = None
+        if check is not None:
+            _flush(pending)
+            pending = []
+            found = store.append_checked(records, check)
+            if check.skip:
+                records = [r for r, duplicate in zip(records, found) if not duplicate]
+            if records:
+                storage.notify([(kind, records)], store.version())
+        elif records:
+            pending.append((store, kind, records))
+        results.append(found)
+    _flush(pending)
+    return results
+
+
+_writer = SingleWriter(_commit, "compound-writer")
+
+
+async def offload(fn: Callable[..., T], *args) -> T:
+    """Run blocking or CPU-heavy ``fn`` on the reader pool."""
+    loop = asyncio.get_running_loop()
+    # Run in a copy of the caller's context, as asyncio.to_thread does, so
+    # metrics phases recorded on the pool count towards the request.
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(_readers, context.run, functools.partial(fn, *args))
+
+
+async def iterate(iterator: Iterator[T]) -> AsyncIterator[T]:
+    """Drive a blocking iterator on the reader pool, one item at a time."""
+    done = object()
+    try:
+        while (item := await offload(next, iterator, done)) is not done:
+            yield item
+    finally:
+        # Release what the iterator holds (e.g. a database cursor) if the
+        # consumer stops early.
+        close = getattr(iterator, "close", None)
+        if close is not None:
+            await offload(close)
+
+
+async def _append(
+    kind: str, records: list[dict], check: Optional[DuplicateCheck] = None
+) -> Optional[list[bool]]:
+    # The store is resolved here, at submission, so an append lands in the
+    # store that was configured when it was made.
+    with metrics.phase("write"):
+        entry = (storage.get_store(), kind, records, check)
+        return await asyncio.wrap_future(_writer.submit(entry))
+
+
+async def load_data() -> dict:
+    return await offload(storage.get_store().load)
+
+
+async def goals() -> list[dict]:
+    return await offload(storage.get_store().goals)
+
+
+async def store_version() -> int:
+    return await offload(storage.get_store().version)
+
+
+async def query_transactions(
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None,
+    category: Optional[Category] = None,
+    limit: Optional[int] = None,
+    before: Optional[tuple[str, str]] = None,
+) -> list[dict]:
+    return await offload(
+        storage.get_store().query_transactions, from_date, to_date, category, limit, before
+    )
+
+
+def iter_transactions(
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None,
+    category: Optional[Category] = None,
+) -> Iterator[dict]:
+    """Lazy, blocking iterator; consume it through ``iterate``."""
+    return storage.get_store().iter_transactions(from_date, to_date, category)
+
+
+async def changes(since: int, limit: Optional[int] = None) -> tuple[int, list[tuple[int, dict]]]:
+    return await offload(storage.get_store().changes, since, limit)
+
+
+async def suggest_merchants(prefix: str, limit: int = 10) -> list[tuple[str, int]]:
+    return await offload(storage.get_store().suggest_merchants, prefix, limit)
+
+
+def _versioned_summary(
+    store: storage.Store, from_date: Optional[date], to_date: Optional[date]
+) -> tuple[int, Summary]:
+    # Summarise between two reads of the version, again if a write landed in
+    # between, so the version says which writes the summary includes.
+    version = store.version()
+    for _ in range(3):
+        summary = store.summarize(from_date, to_date)
+        after = store.version()
+        if after == version:
+            break
+        version = after
+    return version, summary
+
+
+async def versioned_summary(
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None,
+) -> tuple[int, Summary]:
+    """The summary and the store version it was computed at."""
+    return await offload(_versioned_summary, storage.get_store(), from_date, to_date)
+
+
+async def summarize(
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None,
+) -> Summary:
+    return await offload(storage.get_store().summarize, from_date, to_date)
+
+
+async def timeseries(
+    granularity: Granularity,
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None,
+    by_category: bool = False,
+) -> dict:
+    return await offload(
+        storage.get_store().timeseries, granularity, from_date, to_date, by_category
+    )
+
+
+async def append_transaction(
+    tx: Transaction, check: Optional[DuplicateCheck] = None
+) -> Optional[list[bool]]:
+    """Append ``tx``; with ``check``, whether it duplicated a stored one."""
+    return await _append("transactions", [tx.model_dump(mode="json")], check)
+
+
+async def append_transactions(
+    txs: list[Transaction], check: Optional[DuplicateCheck] = None
+) -> Optional[list[bool]]:
+    """Append ``txs``; with ``check``, whether each duplicated a stored one."""
+    return await _append("transactions", [tx.model_dump(mode="json") for tx in txs], check)
+
+
+async def append_goal(goal: Goal) -> None:
+    await _append("goals", [goal.model_dump(mode="json")])
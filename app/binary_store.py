@@ -0,0 +1,249 @@
+"""Compact binary snapshot backend.
+
+Works like the JSON backend (see ``storage.JsonStore``): a snapshot plus an
+append-only record log, with the same caching, indexes and versioning. Only
+the snapshot differs: ``data/compound.bin`` holds fixed-width records and a
+string table instead of pretty-printed JSON::
+
+    magic        8 bytes, b"CMPDBIN1"
+    header       transactions, goals, strings, string bytes (4 x u64)
+    transactions id (16-byte UUID), date (i4 day ordinal), amount (f8),
+                 category (u1, see ``app.columnar``), merchant, notes (u4
+                 string indexes; notes may be ``NO_STRING``)
+    goals        id, name (u4), target_amount, monthly_contribution (f8),
+                 start_date (i4)
+    offsets      string start offsets, u64, one more than there are strings
+    strings      UTF-8, each distinct merchant, note and name stored once
+
+A transaction takes 37 bytes plus its share of the string table. Reading a
+snapshot maps the tables straight onto the file's bytes with NumPy and
+decodes them a column at a time, with no per-record parsing.
+
+Record ids must be UUIDs, as the app creates them.
+"""
+
+import mmap
+import os
+import struct
+import tempfile
+import uuid
+from pathlib import Path
+
+import numpy as np
+
+from app.columnar import CATEGORIES, CATEGORY_CODES
+from app.storage import JsonStore
+
+MAGIC = b"CMPDBIN1"
+HEADER = struct.Struct("<4Q")
+NO_STRING = 0xFFFFFFFF
+
+TRANSACTION = np.dtype(
+    [
+        ("id", "V16"),
+        ("date", "<i4"),
+        ("amount", "<f8"),
+        ("category", "u1"),
+        ("merchant", "<u4"),
+        ("notes", "<u4"),
+    ]
+)
+GOAL = np.dtype(
+    [
+        ("id", "V16"),
+        ("name", "<u4"),
+        ("target_amount", "<f8"),
+        ("monthly_contribution", "<f8"),
+        ("start_date", "<i4"),
+    ]
+)
+
+EPOCH = np.datetime64("1970-01-01", "D")
+EPOCH_ORDINAL = 719163  # date(1970, 1, 1).toordinal()
+
+_HEX_DIGITS = np.frombuffer(b"0123456789abcdef", "S1")
+# Where the 32 hex digits go in the 36-character form of a UUID.
+_HEX_POSITIONS = np.array([i for i in range(36) if i not in (8, 13, 18, 23)])
+
+
+class _Strings:
+    """String table under construction; each distinct string stored once."""
+
+    def __init__(self):
+        self.index: dict[str, int] = {}
+
+    def add(self, value: str | None) -> int:
+        if value is None:
+            return NO_STRING
+        i = self.index.get(value)
+        if i is None:
+            i = self.index[value] = len(self.index)
+        return i
+
+    def encode(self) -> tuple[np.ndarray, bytes]:
+        encoded = [s.encode() for s in self.index]
+        offsets = np.zeros(len(encoded) + 1, "<u8")
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        return offsets, b"".join(encoded)
+
+
+def _uuid_bytes(ids: list[str]) -> bytes:
+    try:
+        return b"".join(uuid.UUID(i).bytes for i in ids)
+    except ValueError as exc:
+        raise ValueError(f"The binary format needs UUID record ids: {exc}") from None
+
+
+def _uuid_strings(column: np.ndarray) -> list[str]:
+    """Canonical UUID strings, formatted for the whole column at once."""
+    raw = np.frombuffer(column.tobytes(), np.uint8).reshape(-1, 16)
+    chars = np.full((len(raw), 36), b"-", "S1")
+    chars[:, _HEX_POSITIONS[0::2]] = _HEX_DIGITS[raw >> 4]
+    chars[:, _HEX_POSITIONS[1::2]] = _HEX_DIGITS[raw & 15]
+    text = chars.tobytes().decode("ascii")
+    return [text[i : i + 36] for i in range(0, len(text), 36)]
+
+
+def _ordinals(days: list[str]) -> np.ndarray:
+    return (np.array(days, dtype="datetime64[D]") - EPOCH).astype("<i4") + EPOCH_ORDINAL
+
+
+def _iso_dates(ordinals: np.ndarray) -> list[str]:
+    # There are far fewer distinct days than records: format each once.
+    days, inverse = np.unique(ordinals, return_inverse=True)
+    labels = np.datetime_as_string((days.astype(np.int64) - EPOCH_ORDINAL) + EPOCH, unit="D")
+    return [labels[i] for i in inverse.tolist()] if len(days) else []
+
+
+def encode(data: dict) -> bytes:
+    """The binary snapshot of ``data``."""
+    strings = _Strings()
+    txns = data.get("transactions", [])
+    table = np.zeros(len(txns), TRANSACTION)
+    if txns:
+        table["id"] = np.frombuffer(_uuid_bytes([t["id"] for t in txns]), "V16")
+        table["date"] = _ordinals([t["date"] for t in txns])
+        table["amount"] = [t["amount"] for t in txns]
+        table["category"] = [CATEGORY_CODES[t["category"]] for t in txns]
+        table["merchant"] = [strings.add(t["merchant"]) for t in txns]
+        table["notes"] = [strings.add(t.get("notes")) for t in txns]
+    goals = data.get("goals", [])
+    goal_table = np.zeros(len(goals), GOAL)
+    if goals:
+        goal_table["id"] = np.frombuffer(_uuid_bytes([g["id"] for g in goals]), "V16")
+        goal_table["name"] = [strings.add(g["name"]) for g in goals]
+        goal_table["target_amount"] = [g["target_amount"] for g in goals]
+        goal_table["monthly_contribution"] = [g["monthly_contribution"] for g in goals]
+        goal_table["start_date"] = _ordinals([g["start_date"] for g in goals])
+    offsets, blob = strings.encode()
+    header = HEADER.pack(len(txns), len(goals), len(offsets) - 1, len(blob))
+    return b"".join(
+        [MAGIC, header, table.tobytes(), goal_table.tobytes(), offsets.tobytes(), blob]
+    )
+
+
+def decode(buffer) -> dict:
+    """Records from a binary snapshot in ``buffer`` (bytes or a mapping)."""
+    if bytes(buffer[: len(MAGIC)]) != MAGIC:
+        raise ValueError("Not a compound binary snapshot")
+    pos = len(MAGIC)
+    n_txns, n_goals, n_strings, blob_bytes = HEADER.unpack_from(buffer, pos)
+    pos += HEADER.size
+    # Views onto the buffer: nothing is copied until a column is decoded.
+    table = np.frombuffer(buffer, TRANSACTION, n_txns, pos)
+    pos += table.nbytes
+    goal_table = np.frombuffer(buffer, GOAL, n_goals, pos)
+    pos += goal_table.nbytes
+    offsets = np.frombuffer(buffer, "<u8", n_strings + 1, pos).tolist()
+    pos += 8 * (n_strings + 1)
+    blob = bytes(buffer[pos : pos + blob_bytes])
+    strings = [blob[a:b].decode() for a, b in zip(offsets, offsets[1:])]
+
+    def lookup(indexes: np.ndarray) -> list:
+        return [strings[i] if i != NO_STRING else None for i in indexes.tolist()]
+
+    names = [c.value for c in CATEGORIES]
+    transactions = [
+        {
+            "date": d,
+            "amount": a,
+            "merchant": m,
+            "category": names[c],
+            "notes": n,
+            "id": i,
+        }
+        for d, a, m, c, n, i in zip(
+            _iso_dates(table["date"]),
+            table["amount"].tolist(),
+            lookup(table["merchant"]),
+            table["category"].tolist(),
+            lookup(table["notes"]),
+            _uuid_strings(table["id"]),
+        )
+    ]
+    goals = [
+        {
+            "name": n,
+            "target_amount": t,
+            "monthly_contribution": m,
+            "start_date": s,
+            "id": i,
+        }
+        for n, t, m, s, i in zip(
+            lookup(goal_table["name"]),
+            goal_table["target_amount"].tolist(),
+            goal_table["monthly_contribution"].tolist(),
+            _iso_dates(goal_table["start_date"]),
+            _uuid_strings(goal_table["id"]),
+        )
+    ]
+    return {"transactions": transactions, "goals": goals}
+
+
+def read_snapshot(path: Path) -> dict:
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)
+            try:
+                return decode(view)
+            finally:
+                view.release()
+
+
+def write_snapshot(path: Path, data: dict) -> None:
+    """Atomically replace ``path`` with the binary snapshot of ``data``."""
+    payload = encode(data)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class BinaryStore(JsonStore):
+    """``JsonStore`` with a binary snapshot, ``compound.bin``.
+
+    Its log and version files are named after the snapshot, so a JSON and a
+    binary store can share a data directory.
+    """
+
+    def __init__(self, data_file: Path):
+        super().__init__(data_file)
+        self.log_file = data_file.with_suffix(".bin.log")
+        self.pending_log_file = data_file.with_suffix(".bin.log.compacting")
+        self.version_file = data_file.with_suffix(".bin.version")
+
+    def _read_snapshot(self) -> dict:
+        try:
+            return read_snapshot(self.data_file)
+        except FileNotFoundError:
+            return {"transactions": [], "goals": []}
+
+    def _write_snapshot(self, data: dict) -> None:
+        write_snapshot(self.data_file, data)
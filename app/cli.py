@@ -0,0 +1,170 @@
+"""Command-line maintenance tools.
+
+Usage::
+
+    python -m app.cli migrate --to sqlite
+    python -m app.cli convert data/compound.json data/compound.bin
+    python -m app.cli verify
+"""
+
+import argparse
+import math
+import sys
+from datetime import date
+from pathlib import Path
+
+from app import storage
+from app.models import Summary, Transaction, compute_summary
+
+BACKENDS = ["json", "sqlite", "partitioned", "binary"]
+
+
+def migrate(source: str, target: str, data_file: Path, force: bool = False) -> dict:
+    """Copy every record from one backend to another, replacing the target.
+
+    Raises ``FileNotFoundError`` if the source store does not exist, and,
+    unless ``force``, ``ValueError`` if it holds no records, before the
+    target is touched.
+    """
+    store = storage.open_store(source, data_file)
+    if not store.exists():
+        raise FileNotFoundError(f"no {source} store for {data_file}")
+    data = store.load()
+    if not force and not any(data.values()):
+        raise ValueError(f"the {source} store is empty; pass --force to replace {target} with it")
+    storage.open_store(target, data_file).save(data)
+    return {kind: len(records) for kind, records in data.items()}
+
+
+def _file_store(path: Path) -> storage.Store:
+    if path.suffix == ".bin":
+        from app.binary_store import BinaryStore
+
+        return BinaryStore(path)
+    return storage.JsonStore(path)
+
+
+def convert(source: Path, target: Path) -> dict:
+    """Copy a JSON or binary snapshot (with its log) to another file, the
+    format of each chosen by its suffix: ``.bin`` for binary, else JSON.
+
+    Raises ``FileNotFoundError``, before touching either file, if there is
+    no store at ``source``.
+    """
+    store = _file_store(source)
+    if not store.exists():
+        raise FileNotFoundError(f"no store at {source}")
+    data = store.load()
+    _file_store(target).save(data)
+    return {kind: len(records) for kind, records in data.items()}
+
+
+def _ranges(records: list[dict]) -> list[tuple[date | None, date | None]]:
+    """Everything, plus ranges with partial months at both ends in each year."""
+    ranges: list[tuple[date | None, date | None]] = [(None, None)]
+    for year in sorted({int(r["date"][:4]) for r in records}):
+        ranges.append((date(year, 1, 15), date(year, 12, 10)))
+        ranges.append((date(year, 2, 10), date(year, 2, 20)))
+    return ranges
+
+
+def _close(a: Summary, b: Summary) -> bool:
+    def same(x: float, y: float) -> bool:
+        return math.isclose(x, y, abs_tol=0.01)
+
+    def same_dict(x: dict, y: dict) -> bool:
+        return x.keys() == y.keys() and all(same(x[k], y[k]) for k in x)
+
+    return (
+        same(a.total_income, b.total_income)
+        and same(a.total_expense, b.total_expense)
+        and same(a.net, b.net)
+        and same_dict(a.spend_by_category, b.spend_by_category)
+        and same_dict(a.monthly_net, b.monthly_net)
+    )
+
+
+def verify(backend: str, data_file: Path) -> list[tuple[date | None, date | None]]:
+    """Check the store's summaries, from indexes rebuilt by opening it
+    afresh, against ``compute_summary``; return the ranges that differ."""
+    store = storage.open_store(backend, data_file)
+    transactions = [Transaction(**r) for r in store.load()["transactions"]]
+    records = [t.model_dump(mode="json") for t in transactions]
+    mismatches = []
+    for from_date, to_date in _ranges(records):
+        expected = compute_summary(
+            [
+                t
+                for t in transactions
+                if (from_date is None or t.date >= from_date)
+                and (to_date is None or t.date <= to_date)
+            ]
+        )
+        if not _close(store.summarize(from_date, to_date), expected):
+            mismatches.append((from_date, to_date))
+    return mismatches
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    mig = commands.add_parser("migrate", help="Copy the store between backends")
+    mig.add_argument("--from", dest="source", default="json", choices=BACKENDS)
+    mig.add_argument("--to", dest="target", default="sqlite", choices=BACKENDS)
+    mig.add_argument(
+        "--data-file",
+        type=Path,
+        default=storage.DATA_FILE,
+        help="Path of compound.json; other backends use the same stem",
+    )
+    mig.add_argument(
+        "--force", action="store_true", help="Replace the target even if the source is empty"
+    )
+
+    conv = commands.add_parser(
+        "convert", help="Convert between JSON and binary snapshot files"
+    )
+    conv.add_argument("source", type=Path)
+    conv.add_argument("target", type=Path)
+
+    ver = commands.add_parser(
+        "verify", help="Check stored summary indexes against compute_summary"
+    )
+    ver.add_argument("--backend", default=storage.STORAGE_BACKEND, choices=BACKENDS)
+    ver.add_argument("--data-file", type=Path, default=storage.DATA_FILE)
+
+    args = parser.parse_args(argv)
+    if args.command == "migrate":
+        if args.source == args.target:
+            parser.error("--from and --to must differ")
+        try:
+            counts = migrate(args.source, args.target, args.data_file, args.force)
+        except (FileNotFoundError, ValueError) as exc:
+            parser.error(str(exc))
+        print(
+            f"Migrated {counts['transactions']} transactions and "
+            f"{counts['goals']} goals from {args.source} to {args.target}"
+        )
+    elif args.command == "convert":
+        if args.source.resolve() == args.target.resolve():
+            parser.error("source and target must differ")
+        try:
+            counts = convert(args.source, args.target)
+        except FileNotFoundError as exc:
+            parser.error(str(exc))
+        print(
+            f"Converted {counts['transactions']} transactions and "
+            f"{counts['goals']} goals from {args.source} to {args.target}"
+        )
+    elif args.command == "verify":
+        mismatches = verify(args.backend, args.data_file)
+        for from_date, to_date in mismatches:
+            print(f"Summary mismatch for from={from_date} to={to_date}", file=sys.stderr)
+        if mismatches:
+            sys.exit(1)
+        print("Summaries match compute_summary")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+"""Column layout shared by the NumPy views of the transaction history.
+
+``indexes.Columns`` keeps each numeric field of the transactions as a flat
+array with these dtypes, and ``binary_store`` and ``timeseries`` use the same
+category codes:
+
+``date``      day ordinal (``date.toordinal()``)
+``amount``    amount in integer cents
+``category``  index into ``CATEGORIES``
+"""
+
+import numpy as np
+
+from app.models import Category
+
+CATEGORIES = list(Category)
+CATEGORY_CODES = {c.value: i for i, c in enumerate(CATEGORIES)}
+
+COLUMNS = {
+    "date": np.dtype("<i4"),
+    "amount": np.dtype("<i8"),
+    "category": np.dtype("<i1"),
+}
@@ -0,0 +1,100 @@
+"""Write-path coordination between threads and processes."""
+
+import fcntl
+import os
+import queue
+import threading
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Callable, Optional
+
+
+class FileLock:
+    """Exclusive advisory lock on ``path``, shared by threads and processes.
+
+    Re-entrant within a thread, so a locked method may call another one.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._fd: int | None = None
+
+    def __enter__(self) -> "FileLock":
+        self._thread_lock.acquire()
+        if self._depth == 0:
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+                except BaseException:
+                    os.close(fd)
+                    raise
+            except BaseException:
+                self._thread_lock.release()
+                raise
+            self._fd = fd
+        self._depth += 1
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._depth -= 1
+        if self._depth == 0:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+        self._thread_lock.release()
+
+
+class SingleWriter:
+    """Apply submitted entries in order on one dedicated thread.
+
+    Entries that queue up while a batch is being written are passed to
+    ``commit`` together, so a burst of writes shares one write and fsync
+    without waiting for a window. ``submit`` returns a
+    ``concurrent.futures.Future`` that resolves once the entry's batch is
+    committed, with the entry's result: its item of the list ``commit``
+    returns, or None if ``commit`` returns nothing. An error fails every
+    entry in the batch. The thread starts on first use (and again in a
+    forked child).
+    """
+
+    def __init__(self, commit: Callable[[list], Optional[list]], name: str):
+        self.commit = commit
+        self.name = name
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    def submit(self, entry) -> Future:
+        future: Future = Future()
+        self._queue.put((entry, future))
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+        return future
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            batch = [(e, f) for e, f in batch if f.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                results = self.commit([entry for entry, _ in batch])
+            except BaseException as exc:
+                for _, future in batch:
+                    future.set_exception(exc)
+            else:
+                if results is None:
+                    results = [None] * len(batch)
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
@@ -0,0 +1,46 @@
+"""Conditional GET support for the read endpoints.
+
+Responses carry a strong ETag built from the store version and the request's
+path and query string, so it changes whenever the data or the question does.
+A request whose ``If-None-Match`` already holds that tag gets a 304 before
+any data is loaded.
+"""
+
+import hashlib
+from typing import Optional
+
+from fastapi import HTTPException, Request
+
+from app import async_storage
+
+# Clients must revalidate before reusing a response; with an ETag that is a
+# cheap 304 when nothing has changed.
+CACHE_CONTROL = "no-cache"
+
+
+def etag_for(request: Request, version: int) -> str:
+    query = sorted(request.query_params.multi_items())
+    key = f"{request.url.path}?{query}".encode()
+    digest = hashlib.blake2b(key, digest_size=8).hexdigest()
+    return f'"{version:x}-{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if if_none_match is None:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison, which ignores a W/ prefix.
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+async def conditional_get(request: Request) -> dict[str, str]:
+    """Dependency: raise a 304 if the client's copy is current, otherwise
+    return the caching headers for the response."""
+    # Read the version before the handler loads anything, so a write landing
+    # in between can only make the tag look older than the data, never newer.
+    etag = etag_for(request, await async_storage.store_version())
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        raise HTTPException(status_code=304, headers=headers)
+    return headers
@@ -0,0 +1,97 @@
+"""Duplicate detection for transactions being added.
+
+Re-importing overlapping bank statements would otherwise store the same
+transactions twice. A transaction's fingerprint is its day, its amount in
+integer cents and its merchant normalised (case-folded, punctuation and
+repeated spaces dropped); a new transaction duplicates a stored one with the
+same fingerprint, or, with a window of N days, the same amount and merchant
+up to N days either side.
+
+Each stored transaction is matched at most once, so a statement with two
+identical coffees is only flagged for as many as are already stored. The
+backends keep a count of stored transactions per fingerprint (see
+``Store.duplicates``), which makes each check a few hash lookups.
+"""
+
+import re
+from datetime import date
+from functools import lru_cache
+from typing import Callable, Iterable, NamedTuple
+
+from app.aggregates import to_cents
+
+# Largest fuzzy window, in days, a request may ask for.
+MAX_WINDOW = 7
+
+Key = tuple[int, int, str]
+
+
+class DuplicateCheck(NamedTuple):
+    """Duplicate check made as part of an append (see
+    ``Store.append_checked``). With ``skip``, duplicates are left out of it."""
+
+    window: int = 0
+    skip: bool = False
+
+
+_SEPARATORS = re.compile(r"[\W_]+")
+
+
+@lru_cache(maxsize=1 << 16)
+def normalize_merchant(merchant: str) -> str:
+    return " ".join(_SEPARATORS.sub(" ", merchant.casefold()).split())
+
+
+@lru_cache(maxsize=1 << 16)
+def _day(iso: str) -> int:
+    return date.fromisoformat(iso).toordinal()
+
+
+def fingerprint(record: dict) -> Key:
+    """(day ordinal, amount in cents, normalised merchant) of a record."""
+    return _day(record["date"]), to_cents(record["amount"]), normalize_merchant(record["merchant"])
+
+
+def _offsets(window: int) -> list[int]:
+    # Nearest days first, so the closest stored transaction is matched.
+    offsets = [0]
+    for d in range(1, window + 1):
+        offsets += [-d, d]
+    return offsets
+
+
+def match(keys: list[Key], window: int, count: Callable[[Key], int]) -> list[bool]:
+    """Whether each fingerprint in ``keys`` matches a stored transaction,
+    given ``count``, the number stored per fingerprint."""
+    used: dict[Key, int] = {}
+    offsets = _offsets(window)
+    found = []
+    for day, cents, merchant in keys:
+        for offset in offsets:
+            key = (day + offset, cents, merchant)
+            taken = used.get(key, 0)
+            if count(key) > taken:
+                used[key] = taken + 1
+                found.append(True)
+                break
+        else:
+            found.append(False)
+    return found
+
+
+class Fingerprints:
+    """Count of stored transactions per fingerprint, kept current on append."""
+
+    def __init__(self, records: Iterable[dict] = ()):
+        self._counts: dict[Key, int] = {}
+        self.add(records)
+
+    def add(self, records: Iterable[dict]) -> None:
+        counts = self._counts
+        for r in records:
+            key = fingerprint(r)
+            counts[key] = counts.get(key, 0) + 1
+
+    def match(self, records: list[dict], window: int = 0) -> list[bool]:
+        counts = self._counts
+        return match([fingerprint(r) for r in records], window, lambda k: counts.get(k, 0))
@@ -0,0 +1,163 @@
+"""Live updates over Server-Sent Events.
+
+``GET /events`` streams an event for each append committed by this process
+(see ``storage.add_listener``)::
+
+    id: 12
+    event: transactions
+    data: {"records": [...], "summary": {...}, "version": "..."}
+
+Every event carries the ``version`` of the store its write is included in,
+as ``/summary`` does, so a client can drop events for writes its fetched
+data already has. ``transactions`` events carry the new records, their
+``count`` and ``summary``, what they add to the all-time ``Summary``; an
+append of more than ``EVENT_RECORDS`` records is sent with an empty
+``records`` list, and a client wanting them should refetch. ``goals`` events
+carry the new goals with their projections. Each event is built and encoded
+once, on the writing thread, and the same bytes are handed to every
+subscriber: subscribers never read the store.
+
+Recent events are kept, so a client that reconnects with ``Last-Event-ID``
+is sent what it missed. A client that has missed more than that, or falls
+too far behind, is sent a ``reset`` event and should refetch. With several
+uvicorn workers, each streams the writes made through it.
+"""
+
+import asyncio
+import threading
+from collections import deque
+from typing import AsyncIterator, Optional
+
+import orjson
+
+from app import storage
+from app.aggregates import MonthlyAggregates
+from app.models import GoalRecord
+from app.responses import OPTIONS
+
+# Events kept for clients resuming with Last-Event-ID.
+HISTORY = 256
+
+# Events queued for one subscriber before it is sent a reset instead.
+MAX_PENDING = 1024
+
+# Larger appends (bulk imports) are sent without their records.
+EVENT_RECORDS = 500
+
+# Seconds between keep-alive comments on an idle stream.
+KEEPALIVE = 15.0
+
+KEEPALIVE_COMMENT = b": keep-alive\n\n"
+
+
+def _frame(event_id: int, name: str, data: dict) -> bytes:
+    return b"id: %d\nevent: %s\ndata: %s\n\n" % (
+        event_id,
+        name.encode(),
+        orjson.dumps(data, option=OPTIONS),
+    )
+
+
+def _reset(event_id: int) -> bytes:
+    return _frame(event_id, "reset", {})
+
+
+class Subscription:
+    """One client's queue of encoded events, fed on its event loop."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.queue: asyncio.Queue[bytes] = asyncio.Queue()
+
+    def deliver(self, frame: bytes, event_id: int) -> None:
+        # Runs on the subscriber's loop.
+        if self.queue.qsize() >= MAX_PENDING:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            frame = _reset(event_id)
+        self.queue.put_nowait(frame)
+
+
+class Broadcaster:
+    """Fans committed appends out to every subscriber."""
+
+    def __init__(self, history: int = HISTORY):
+        self._lock = threading.Lock()
+        self._subscribers: set[Subscription] = set()
+        self._history: deque[tuple[int, bytes]] = deque(maxlen=history)
+        self._last_id = 0
+
+    def _events(
+        self, entries: list[tuple[str, list[dict]]], version: int
+    ) -> list[tuple[str, dict]]:
+        events = []
+        for kind, records in entries:
+            if kind == "transactions":
+                data = {
+                    "records": records if len(records) <= EVENT_RECORDS else [],
+                    "count": len(records),
+                    "summary": MonthlyAggregates(records).summary().model_dump(),
+                    "version": str(version),
+                }
+                events.append(("transactions", data))
+            elif kind == "goals":
+                goals = [GoalRecord.from_dict(g).with_projection() for g in records]
+                events.append(("goals", {"records": goals, "version": str(version)}))
+        return events
+
+    def publish(self, entries: list[tuple[str, list[dict]]], version: int) -> None:
+        """Send an event per entry to every subscriber; thread-safe."""
+        events = self._events(entries, version)
+        with self._lock:
+            for name, data in events:
+                self._last_id += 1
+                frame = _frame(self._last_id, name, data)
+                self._history.append((self._last_id, frame))
+                for sub in tuple(self._subscribers):
+                    try:
+                        sub.loop.call_soon_threadsafe(sub.deliver, frame, self._last_id)
+                    except RuntimeError:
+                        # Its event loop has closed.
+                        self._subscribers.discard(sub)
+
+    def subscribe(self, last_event_id: Optional[int] = None) -> Subscription:
+        """A new subscription, primed with the events after ``last_event_id``."""
+        sub = Subscription(asyncio.get_running_loop())
+        with self._lock:
+            if last_event_id is not None and last_event_id != self._last_id:
+                oldest = self._history[0][0] if self._history else self._last_id + 1
+                # Ahead of us (e.g. from before a restart) or too far behind.
+                if last_event_id > self._last_id or last_event_id + 1 < oldest:
+                    sub.queue.put_nowait(_reset(self._last_id))
+                else:
+                    for event_id, frame in self._history:
+                        if event_id > last_event_id:
+                            sub.queue.put_nowait(frame)
+            self._subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+    async def stream(self, last_event_id: Optional[int] = None) -> AsyncIterator[bytes]:
+        """Encoded events for one client, with keep-alives while idle."""
+        sub = self.subscribe(last_event_id)
+        try:
+            # Sent at once, so the client sees the stream open.
+            yield b"retry: 3000\n\n"
+            while True:
+                try:
+                    yield await asyncio.wait_for(sub.queue.get(), KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield KEEPALIVE_COMMENT
+        finally:
+            self.unsubscribe(sub)
+
+
+BROADCASTER = Broadcaster()
+storage.add_listener(BROADCASTER.publish)
@@ -0,0 +1,61 @@
+"""Streaming encoders for transaction exports."""
+
+import csv
+import io
+from enum import Enum
+from typing import Iterable, Iterator
+
+import orjson
+
+FIELDS = ("id", "date", "amount", "merchant", "category", "notes")
+
+# Rows encoded per chunk handed to the response.
+CHUNK_ROWS = 500
+
+
+class ExportFormat(str, Enum):
+    ndjson = "ndjson"
+    csv = "csv"
+
+
+MEDIA_TYPES = {
+    ExportFormat.ndjson: "application/x-ndjson",
+    ExportFormat.csv: "text/csv",
+}
+
+
+def _chunks(records: Iterable[dict]) -> Iterator[list[dict]]:
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= CHUNK_ROWS:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _ndjson(records: Iterable[dict]) -> Iterator[str]:
+    for chunk in _chunks(records):
+        lines = b"".join(orjson.dumps({f: r.get(f) for f in FIELDS}) + b"\n" for r in chunk)
+        yield lines.decode()
+
+
+def _csv(records: Iterable[dict]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(FIELDS)
+    for chunk in _chunks(records):
+        writer.writerows([r.get(f) for f in FIELDS] for r in chunk)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def encode(records: Iterable[dict], fmt: ExportFormat) -> Iterator[str]:
+    """Lazily encode ``records``, holding at most ``CHUNK_ROWS`` at a time."""
+    if fmt == ExportFormat.csv:
+        return _csv(records)
+    return _ndjson(records)
@@ -0,0 +1,169 @@
+"""In-memory indexes over the cached transaction records."""
+
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import date
+from typing import Iterable, Optional
+
+import numpy as np
+
+from app.aggregates import DailyTotals, MonthlyAggregates
+from app.columnar import CATEGORY_CODES, COLUMNS
+from app.dedupe import Fingerprints
+from app.merchants import MerchantIndex
+
+# Sorts after any transaction id, so (day, _MAX_ID) bounds a whole day.
+_MAX_ID = "\uffff"
+
+
+def sort_key(record: dict) -> tuple[str, str]:
+    """Ordering of transactions: by date, then id. ISO dates sort as strings."""
+    return (record["date"], record["id"])
+
+
+class _SortedRecords:
+    def __init__(self, records: list[dict]):
+        records = sorted(records, key=sort_key)
+        self.keys = [sort_key(r) for r in records]
+        self.records = records
+
+    def add(self, record: dict) -> None:
+        key = sort_key(record)
+        # New records are usually the most recent, so this is normally an
+        # append at the end of both lists.
+        i = bisect_right(self.keys, key)
+        self.keys.insert(i, key)
+        self.records.insert(i, record)
+
+    def range(
+        self,
+        lower: tuple,
+        upper: tuple,
+        before: Optional[tuple] = None,
+        limit: Optional[int] = None,
+    ) -> list[dict]:
+        lo = bisect_left(self.keys, lower)
+        hi = bisect_right(self.keys, upper)
+        if before is not None:
+            hi = min(hi, bisect_left(self.keys, before))
+        if limit is not None:
+            lo = max(lo, hi - limit)
+        return self.records[lo:hi]
+
+
+class DateIndex:
+    """Transactions sorted by (date, id), overall and per category.
+
+    Built once from the cached records and kept current on append, so a
+    date window is two binary searches plus a slice.
+    """
+
+    def __init__(self, records: Iterable[dict]):
+        records = list(records)
+        self._lock = threading.Lock()
+        self._all = _SortedRecords(records)
+        by_category: dict[str, list[dict]] = {}
+        for r in records:
+            by_category.setdefault(r["category"], []).append(r)
+        self._by_category = {c: _SortedRecords(rs) for c, rs in by_category.items()}
+
+    def __len__(self) -> int:
+        return len(self._all.records)
+
+    def add(self, records: Iterable[dict]) -> None:
+        with self._lock:
+            for r in records:
+                self._all.add(r)
+                if r["category"] not in self._by_category:
+                    self._by_category[r["category"]] = _SortedRecords([])
+                self._by_category[r["category"]].add(r)
+
+    def range(
+        self,
+        from_date: Optional[date] = None,
+        to_date: Optional[date] = None,
+        category: Optional[str] = None,
+        before: Optional[tuple[str, str]] = None,
+        limit: Optional[int] = None,
+    ) -> list[dict]:
+        """Matching records in ascending (date, id) order.
+
+        ``before`` keeps only keys strictly below it and ``limit`` keeps the
+        last ``limit`` of those, which is one page when read newest first.
+        """
+        lower = (from_date.isoformat(),) if from_date is not None else ()
+        upper = (to_date.isoformat(), _MAX_ID) if to_date is not None else (_MAX_ID,)
+        with self._lock:
+            if category is None:
+                return self._all.range(lower, upper, before, limit)
+            sub = self._by_category.get(category)
+            return sub.range(lower, upper, before, limit) if sub is not None else []
+
+
+class Columns:
+    """Day ordinal, amount in cents and category code of every transaction,
+    as NumPy arrays in the layout of ``app.columnar``, for vectorised
+    aggregation. Appends fill spare capacity, which doubles when full."""
+
+    def __init__(self, records: Iterable[dict]):
+        self._lock = threading.Lock()
+        self._rows = 0
+        self._arrays = {name: np.empty(0, COLUMNS[name]) for name in ("date", "amount", "category")}
+        self.add(records)
+
+    def __len__(self) -> int:
+        return self._rows
+
+    def add(self, records: Iterable[dict]) -> None:
+        records = list(records)
+        if not records:
+            return
+        days = np.array([r["date"] for r in records], dtype="datetime64[D]")
+        amounts = np.array([r["amount"] for r in records], dtype=np.float64)
+        new = {
+            "date": days.astype(np.int64) + date(1970, 1, 1).toordinal(),
+            # np.rint rounds half to even, as round() does in to_cents.
+            "amount": np.rint(amounts * 100),
+            "category": [CATEGORY_CODES[r["category"]] for r in records],
+        }
+        with self._lock:
+            rows = self._rows + len(records)
+            for name, values in new.items():
+                array = self._arrays[name]
+                if rows > len(array):
+                    grown = np.empty(max(rows, 2 * len(array)), array.dtype)
+                    grown[: self._rows] = array[: self._rows]
+                    array = self._arrays[name] = grown
+                array[self._rows : rows] = values
+            self._rows = rows
+
+    def arrays(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """``(ordinals, amounts, categories)`` views of the current rows.
+
+        Later appends only write past the end of these views, so they stay
+        valid without holding the lock.
+        """
+        with self._lock:
+            rows = self._rows
+            return tuple(self._arrays[name][:rows] for name in ("date", "amount", "category"))
+
+
+class Indexes:
+    """Every in-memory index over one version of the cached records."""
+
+    def __init__(self, records: Iterable[dict]):
+        records = list(records)
+        self.by_date = DateIndex(records)
+        self.monthly = MonthlyAggregates(records)
+        self.daily = DailyTotals(records)
+        self.columns = Columns(records)
+        self.fingerprints = Fingerprints(records)
+        self.merchants = MerchantIndex(records)
+
+    def add(self, records: list[dict]) -> None:
+        self.by_date.add(records)
+        self.monthly.add(records)
+        self.daily.add(records)
+        self.columns.add(records)
+        self.fingerprints.add(records)
+        self.merchants.add(records)
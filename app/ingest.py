@@ -0,0 +1,272 @@
+"""Streaming parsers for bulk transaction imports.
+
+Rows are read incrementally from the request body, validated in batches of
+``BATCH_SIZE`` and committed with one storage write per batch, so memory
+stays bounded however large the upload is: lines and CSV records are capped
+too (``MAX_ROW_BYTES``, ``MAX_RECORD_LINES``). Validation runs off the event
+loop.
+"""
+
+import codecs
+import csv
+import json
+from typing import AsyncIterator, Awaitable, Callable, NamedTuple, Optional
+
+from pydantic import TypeAdapter, ValidationError
+
+from app import metrics
+from app.async_storage import offload
+from app.dedupe import DuplicateCheck
+from app.models import BulkImportResult, RowError, Transaction, TransactionCreate
+
+BATCH_SIZE = 1000
+
+# Per-row errors beyond this many are counted but not reported individually.
+MAX_REPORTED_ERRORS = 100
+
+# Longest line in bytes, longest CSV record in characters, and most lines one
+# CSV record may span. Past these a row is reported as an error and reading
+# carries on from the next line.
+MAX_ROW_BYTES = 64 * 1024
+MAX_RECORD_LINES = 100
+
+CSV_TYPES = {"text/csv", "application/csv"}
+NDJSON_TYPES = {"application/x-ndjson", "application/ndjson", "application/jsonl"}
+
+_batch_adapter = TypeAdapter(list[TransactionCreate])
+
+
+class UnsupportedFormat(ValueError):
+    pass
+
+
+class InvalidRow(NamedTuple):
+    """A row of the body that could not be parsed, and why."""
+
+    message: str
+
+
+Row = dict | InvalidRow
+
+# How a JSON value that is not an object is described in its row's error.
+_JSON_TYPES = {
+    str: "a string",
+    int: "a number",
+    float: "a number",
+    bool: "a boolean",
+    list: "an array",
+}
+
+
+def _decode(line: bytes) -> str | InvalidRow:
+    if len(line) > MAX_ROW_BYTES:
+        return InvalidRow("row too long")
+    try:
+        return line.decode().rstrip("\r")
+    except UnicodeDecodeError:
+        return InvalidRow("not valid UTF-8")
+
+
+async def _lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str | InvalidRow]:
+    """Lines of the body, each decoded on its own, so a line that is not
+    UTF-8 costs only that line. A line longer than ``MAX_ROW_BYTES`` is
+    dropped without being buffered whole. Either comes back as an
+    ``InvalidRow``."""
+    buffer = b""
+    # Whether a leading byte order mark has been looked for yet.
+    started = False
+    # Inside a line too long to keep; its end is still to come.
+    skipping = False
+    async for chunk in chunks:
+        buffer += chunk
+        if not started and (len(buffer) >= len(codecs.BOM_UTF8) or b"\n" in buffer):
+            buffer = buffer.removeprefix(codecs.BOM_UTF8)
+            started = True
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if skipping:
+                skipping = False
+            else:
+                yield _decode(line)
+        if len(buffer) > MAX_ROW_BYTES:
+            if not skipping:
+                yield InvalidRow("row too long")
+            skipping = True
+            buffer = b""
+    if not started:
+        buffer = buffer.removeprefix(codecs.BOM_UTF8)
+    if buffer and not skipping:
+        yield _decode(buffer)
+
+
+_UNTERMINATED = InvalidRow("invalid CSV: unterminated quoted field")
+
+
+def _unterminated(parts: list[str]) -> list[InvalidRow]:
+    # Each line swallowed by the open field would have been a row of its own,
+    # so each is reported, and every line received is accounted for.
+    return [_UNTERMINATED for part in parts if part.strip()]
+
+
+async def _csv_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[Row]:
+    """CSV records keyed by the header row; quoted fields may span lines.
+
+    Whether a quoted field is still open is kept as the parity of the quotes
+    seen so far, so each line is counted once. A record that grows past
+    ``MAX_RECORD_LINES`` or ``MAX_ROW_BYTES``, or is still open at the end
+    of the body (usually an unbalanced quote), is reported as one invalid
+    row per line, and the next line starts a new record.
+    """
+    header = None
+    parts: list[str] = []
+    size = 0
+    open_quote = False
+    async for line in _lines(chunks):
+        if isinstance(line, InvalidRow):
+            for error in _unterminated(parts):
+                yield error
+            yield InvalidRow(f"invalid CSV: {line.message}")
+            parts, size, open_quote = [], 0, False
+            continue
+        parts.append(line)
+        size += len(line) + 1
+        open_quote ^= line.count('"') % 2 == 1
+        if open_quote:
+            if len(parts) >= MAX_RECORD_LINES or size > MAX_ROW_BYTES:
+                for error in _unterminated(parts):
+                    yield error
+                parts, size, open_quote = [], 0, False
+            continue
+        record = "\n".join(parts)
+        parts, size = [], 0
+        if not record.strip():
+            continue
+        try:
+            values = next(csv.reader([record]))
+        except csv.Error as exc:
+            yield InvalidRow(f"invalid CSV: {exc}")
+            continue
+        if header is None:
+            header = [h.strip() for h in values]
+            continue
+        yield {k: v for k, v in zip(header, values) if v != ""}
+    for error in _unterminated(parts):
+        yield error
+
+
+async def _ndjson_rows(chunks: AsyncIterator[bytes]) -> AsyncIterator[Row]:
+    async for line in _lines(chunks):
+        if isinstance(line, InvalidRow):
+            yield InvalidRow(f"invalid JSON: {line.message}")
+            continue
+        if not line.strip():
+            continue
+        try:
+            value = json.loads(line)
+        except json.JSONDecodeError as exc:
+            yield InvalidRow(f"invalid JSON: {exc.msg}")
+            continue
+        if isinstance(value, dict):
+            yield value
+        else:
+            found = _JSON_TYPES.get(type(value), "null")
+            yield InvalidRow(f"invalid JSON: expected an object, got {found}")
+
+
+def parse_rows(chunks: AsyncIterator[bytes], content_type: str | None) -> AsyncIterator[Row]:
+    """Raw rows from a CSV or NDJSON body; unparseable rows come back as ``InvalidRow``."""
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    if media_type in CSV_TYPES:
+        return _csv_rows(chunks)
+    if media_type in NDJSON_TYPES:
+        return _ndjson_rows(chunks)
+    raise UnsupportedFormat(
+        f"Unsupported content type {media_type!r}; "
+        f"use one of {sorted(CSV_TYPES | NDJSON_TYPES)}"
+    )
+
+
+def _error_message(errors: list[dict]) -> str:
+    return "; ".join(
+        f"{'.'.join(str(p) for p in e['loc'])}: {e['msg']}" if e["loc"] else e["msg"]
+        for e in errors
+    )
+
+
+def validate_batch(rows: list[dict]) -> tuple[list[Transaction], dict[int, str]]:
+    """Validate ``rows`` as one batch, returning the valid transactions and
+    an error message per invalid row index."""
+    with metrics.phase("validate"):
+        try:
+            valid = _batch_adapter.validate_python(rows)
+            return [Transaction(**tx.model_dump()) for tx in valid], {}
+        except ValidationError as exc:
+            by_row: dict[int, list[dict]] = {}
+            for err in exc.errors():
+                index, *loc = err["loc"]
+                by_row.setdefault(index, []).append({**err, "loc": loc})
+        good = [row for i, row in enumerate(rows) if i not in by_row]
+        valid = _batch_adapter.validate_python(good)
+        errors = {i: _error_message(errs) for i, errs in by_row.items()}
+        return [Transaction(**tx.model_dump()) for tx in valid], errors
+
+
+async def ingest(
+    rows: AsyncIterator[Row],
+    commit: Callable[
+        [list[Transaction], Optional[DuplicateCheck]], Awaitable[Optional[list[bool]]]
+    ],
+    check: Optional[DuplicateCheck] = None,
+) -> BulkImportResult:
+    """Validate ``rows`` in batches and ``commit`` each batch's valid rows.
+
+    With ``check``, ``commit`` (e.g. ``async_storage.append_transactions``)
+    checks each batch against the store as it writes it and returns which
+    rows were duplicates; they are counted and reported, and with
+    ``check.skip`` not imported.
+    """
+    result = BulkImportResult(inserted=0, failed=0, errors=[])
+    if check is not None:
+        result.duplicates = 0
+        result.duplicate_rows = []
+
+    def fail(row_number: int, message: str) -> None:
+        result.failed += 1
+        if len(result.errors) < MAX_REPORTED_ERRORS:
+            result.errors.append(RowError(row=row_number, message=message))
+
+    async def flush(batch: list[tuple[int, dict]]) -> None:
+        if not batch:
+            return
+        txs, errors = await offload(validate_batch, [row for _, row in batch])
+        for index, message in sorted(errors.items()):
+            fail(batch[index][0], message)
+        if not txs:
+            return
+        found = await commit(txs, check)
+        result.inserted += len(txs)
+        if check is None:
+            return
+        row_numbers = [n for i, (n, _) in enumerate(batch) if i not in errors]
+        for row_number, duplicate in zip(row_numbers, found):
+            if duplicate:
+                result.duplicates += 1
+                if check.skip:
+                    result.inserted -= 1
+                if len(result.duplicate_rows) < MAX_REPORTED_ERRORS:
+                    result.duplicate_rows.append(row_number)
+
+    batch: list[tuple[int, dict]] = []
+    row_number = 0
+    async for row in rows:
+        row_number += 1
+        if isinstance(row, InvalidRow):
+            fail(row_number, row.message)
+            continue
+        batch.append((row_number, row))
+        if len(batch) >= BATCH_SIZE:
+            await flush(batch)
+            batch = []
+    await flush(batch)
+    result.errors.sort(key=lambda e: e.row)
+    return result
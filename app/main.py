@@ -1,23 +1,67 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
+
+from app import metrics, warmup
+from app.responses import ORJSONResponse
+from app.routers import events, goals, merchants, summary, transactions, ui
+
 
-from app.routers import goals, summary, transactions, ui
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # In the background, so /health answers while /health/ready waits.
+    task = asyncio.create_task(warmup.warm_up())
+    yield
+    task.cancel()
 
-app = FastAPI(title="Compound", version="0.1.0")
+
+app = FastAPI(
+    title="Compound",
+    version="0.1.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
+)
 
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:3000", "http://localhost:5173"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Server-Timing", "X-Duplicate"],
 )
+# Outermost, so its timings cover CORS handling too.
+app.add_middleware(metrics.MetricsMiddleware)
 
 app.include_router(transactions.router)
 app.include_router(goals.router)
 app.include_router(summary.router)
+app.include_router(merchants.router)
+app.include_router(events.router)
 app.include_router(ui.router)
 
 
 @app.get("/health")
-def health():
+async def health():
     return {"status": "ok"}
+
+
+@app.get("/health/ready")
+async def health_ready() -> ORJSONResponse:
+    """200 once start-up warm-up has finished, 503 until then."""
+    state = warmup.READINESS
+    if not state.ready:
+        body = {"status": "starting" if state.error is None else "failed", "error": state.error}
+        return ORJSONResponse(body, status_code=503)
+    timings = {name: round(seconds, 4) for name, seconds in state.timings.items()}
+    return ORJSONResponse({"status": "ready", "warmup_seconds": timings})
+
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics() -> Response:
+    """Request counts and latency histograms in Prometheus text format."""
+    if not metrics.ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return Response(metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
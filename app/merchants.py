@@ -0,0 +1,146 @@
+"""Merchant suggestions for a typed prefix, most frequent first.
+
+Distinct merchants are grouped by their normalised name (see
+``dedupe.normalize_merchant``), shown as first recorded, and kept sorted by
+that key next to a NumPy array of their transaction counts. A prefix is two
+binary searches for its range of keys, and the most frequent of that range
+are found with ``np.argpartition``, which is linear in the range rather than
+a sort: a one-letter prefix over a few hundred thousand merchants is a
+partition of some thousands of counts.
+
+Appends bump the count of a known merchant in place. New merchants wait in a
+small unsorted batch, searched by scanning, and are merged into the sorted
+arrays once ``MERGE_AT`` have built up.
+"""
+
+import threading
+from bisect import bisect_left
+from typing import Iterable
+
+import numpy as np
+
+from app.dedupe import normalize_merchant
+
+# Most suggestions one request may ask for.
+MAX_SUGGESTIONS = 50
+
+# New merchants kept unsorted before they are merged into the sorted arrays.
+MERGE_AT = 1024
+
+# Sorts after any character that can follow a prefix.
+_LAST = "\U0010ffff"
+
+
+def prefix_key(prefix: str) -> str:
+    """``prefix`` normalised as merchants are. A trailing separator is kept
+    as a space, so "whole " matches "Whole Foods" but not "Wholesale"."""
+    key = normalize_merchant(prefix)
+    if key and prefix[-1:] and normalize_merchant(prefix[-1]) == "":
+        key += " "
+    return key
+
+
+class MerchantIndex:
+    """Distinct merchants by normalised name, with their transaction counts."""
+
+    def __init__(self, records: Iterable[dict] = ()):
+        named: dict[str, int] = {}
+        for r in records:
+            named[r["merchant"]] = named.get(r["merchant"], 0) + 1
+        self._build(named.items())
+
+    @classmethod
+    def from_counts(cls, counts: Iterable[tuple[str, int]]) -> "MerchantIndex":
+        """An index over ``(merchant, transactions)`` pairs, in the order the
+        merchants were first recorded."""
+        index = cls.__new__(cls)
+        index._build(counts)
+        return index
+
+    def _build(self, counts: Iterable[tuple[str, int]]) -> None:
+        self._lock = threading.Lock()
+        self._keys: list[str] = []
+        self._names: list[str] = []
+        self._counts = np.zeros(0, np.int64)
+        # key -> [name, count] for merchants not merged yet.
+        self._new: dict[str, list] = {}
+        for name, n in counts:
+            key = normalize_merchant(name)
+            entry = self._new.get(key)
+            if entry is None:
+                self._new[key] = [name, n]
+            else:
+                entry[1] += n
+        self._merge()
+
+    def __len__(self) -> int:
+        return len(self._keys) + len(self._new)
+
+    def add(self, records: Iterable[dict]) -> None:
+        with self._lock:
+            self._add(records)
+            if len(self._new) >= MERGE_AT:
+                self._merge()
+
+    def _add(self, records: Iterable[dict]) -> None:
+        keys, counts, new = self._keys, self._counts, self._new
+        for r in records:
+            name = r["merchant"]
+            key = normalize_merchant(name)
+            i = bisect_left(keys, key)
+            if i < len(keys) and keys[i] == key:
+                counts[i] += 1
+            elif key in new:
+                new[key][1] += 1
+            else:
+                new[key] = [name, 1]
+
+    def _merge(self) -> None:
+        # Builds new lists rather than inserting into the current ones, which
+        # readers may be holding.
+        if not self._new:
+            return
+        added = sorted(self._new)
+        if not self._keys:
+            self._keys = added
+            self._names = [self._new[key][0] for key in added]
+            self._counts = np.array([self._new[key][1] for key in added], np.int64)
+            self._new = {}
+            return
+        at = [bisect_left(self._keys, key) for key in added]
+        keys, names = [], []
+        start = 0
+        for i, key in zip(at, added):
+            keys += self._keys[start:i]
+            names += self._names[start:i]
+            keys.append(key)
+            names.append(self._new[key][0])
+            start = i
+        keys += self._keys[start:]
+        names += self._names[start:]
+        counts = np.insert(self._counts, at, [self._new[key][1] for key in added])
+        self._keys, self._names, self._counts = keys, names, counts
+        self._new = {}
+
+    def suggest(self, prefix: str, limit: int = 10) -> list[tuple[str, int]]:
+        """Up to ``limit`` ``(merchant, transactions)`` whose normalised
+        name starts with ``prefix``'s, most frequent first, then by name."""
+        key = prefix_key(prefix)
+        with self._lock:
+            keys, names, counts = self._keys, self._names, self._counts
+            lo = bisect_left(keys, key)
+            hi = bisect_left(keys, key + _LAST)
+            window = counts[lo:hi].copy()
+            pending = [(k, name, n) for k, (name, n) in self._new.items() if k.startswith(key)]
+        if len(window) > limit:
+            # Every count above the limit-th largest, then the first (by key)
+            # of those equal to it, so ties are cut deterministically.
+            kth = window[np.argpartition(window, len(window) - limit)[len(window) - limit]]
+            above = np.flatnonzero(window > kth)
+            equal = np.flatnonzero(window == kth)[: limit - len(above)]
+            picked = np.concatenate([above, equal])
+        else:
+            picked = np.arange(len(window))
+        found = [(keys[lo + i], names[lo + i], int(window[i])) for i in picked.tolist()]
+        found = sorted(found + pending, key=lambda f: (-f[2], f[0]))
+        return [(name, n) for _, name, n in found[:limit]]
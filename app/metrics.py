@@ -0,0 +1,199 @@
+"""Per-request timing, as a ``Server-Timing`` header and Prometheus metrics.
+
+Enabled with ``COMPOUND_METRICS=1``. Code on the request path wraps its
+phases in ``with metrics.phase("name"):``; the middleware collects the
+phases of each request, reports them in its ``Server-Timing`` response
+header and adds them, with the request's total latency, to the histograms
+served at ``/metrics``.
+
+Phases are kept in a context variable, so they follow the request onto the
+reader pool (see ``async_storage.offload``). Time spent on the single writer
+thread is not attributed; the handler's wait for it is, as ``write``. When
+disabled, ``phase`` returns a shared no-op context manager after one context
+variable lookup.
+"""
+
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import nullcontext
+from contextvars import ContextVar
+from typing import ContextManager, Optional
+
+ENABLED = os.environ.get("COMPOUND_METRICS", "") == "1"
+
+# Upper bounds, in seconds, of the latency histogram buckets.
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_timings: ContextVar[Optional[dict[str, float]]] = ContextVar("compound_timings", default=None)
+
+_NOOP = nullcontext()
+
+
+class _Phase:
+    __slots__ = ("name", "timings", "start")
+
+    def __init__(self, name: str, timings: dict[str, float]):
+        self.name = name
+        self.timings = timings
+
+    def __enter__(self) -> None:
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc) -> None:
+        elapsed = time.perf_counter() - self.start
+        # Repeated phases (e.g. one per import batch) add up.
+        self.timings[self.name] = self.timings.get(self.name, 0.0) + elapsed
+
+
+def phase(name: str) -> ContextManager[None]:
+    """Time the enclosed block as phase ``name`` of the current request."""
+    timings = _timings.get()
+    if timings is None:
+        return _NOOP
+    return _Phase(name, timings)
+
+
+def _labels(labels: tuple[tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        (k, v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")) for k, v in labels
+    )
+    return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, labels: tuple[tuple[str, str], ...], amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_labels(labels)} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets: tuple[float, ...] = BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        # Per label set: a count per bucket (plus +Inf), and the sum.
+        self._values: dict[tuple, tuple[list[int], list[float]]] = {}
+
+    def observe(self, labels: tuple[tuple[str, str], ...], value: float) -> None:
+        entry = self._values.get(labels)
+        if entry is None:
+            entry = self._values[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+        counts, total = entry
+        counts[bisect_left(self.buckets, value)] += 1
+        total[0] += value
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _number(bound)
+                lines.append(f"{self.name}_bucket{_labels(labels + (('le', le),))} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(labels)} {_number(total[0])}")
+            lines.append(f"{self.name}_count{_labels(labels)} {cumulative}")
+        return lines
+
+
+class Registry:
+    """The request metrics of this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = Counter("compound_requests_total", "HTTP requests handled.")
+        self.latency = Histogram(
+            "compound_request_duration_seconds", "HTTP request latency in seconds."
+        )
+        self.phases = Histogram(
+            "compound_request_phase_duration_seconds",
+            "Time spent in each phase of handling a request, in seconds.",
+        )
+
+    def observe(
+        self, method: str, route: str, status: int, elapsed: float, timings: dict[str, float]
+    ) -> None:
+        labels = (("method", method), ("route", route))
+        with self._lock:
+            self.requests.inc(labels + (("status", str(status)),))
+            self.latency.observe(labels, elapsed)
+            for name, seconds in timings.items():
+                self.phases.observe(labels + (("phase", name),), seconds)
+
+    def render(self) -> str:
+        with self._lock:
+            lines = [
+                *self.requests.render(),
+                *self.latency.render(),
+                *self.phases.render(),
+            ]
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def server_timing(timings: dict[str, float], total: float) -> str:
+    entries = [f"{name};dur={seconds * 1000:.3f}" for name, seconds in timings.items()]
+    entries.append(f"total;dur={total * 1000:.3f}")
+    return ", ".join(entries)
+
+
+def _route(scope: dict) -> str:
+    # The route template rather than the path, to keep label values bounded.
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording each request's phases and latency."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or not ENABLED:
+            await self.app(scope, receive, send)
+            return
+        timings: dict[str, float] = {}
+        token = _timings.set(timings)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                header = server_timing(timings, time.perf_counter() - start)
+                message = {
+                    **message,
+                    "headers": [*message.get("headers", []), (b"server-timing", header.encode())],
+                }
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _timings.reset(token)
+            REGISTRY.observe(
+                scope["method"], _route(scope), status, time.perf_counter() - start, timings
+            )
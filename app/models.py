@@ -2,7 +2,7 @@ import math
 from collections import defaultdict
 from datetime import date
 from enum import Enum
-from typing import Optional
+from typing import NamedTuple, Optional
 from uuid import UUID, uuid4
 
 from dateutil.relativedelta import relativedelta
@@ -30,6 +30,53 @@ class Transaction(TransactionCreate):
     id: UUID = Field(default_factory=uuid4)
 
 
+class TransactionChange(Transaction):
+    seq: int
+
+
+class TransactionChanges(BaseModel):
+    """Transactions recorded after ``since``, oldest first."""
+
+    changes: list[TransactionChange]
+    # Pass as ``since`` next time: the last change returned, or the store's
+    # high-water mark.
+    seq: int
+    # More changes remain past ``seq``.
+    more: bool
+    # ``since`` was ahead of the store, which must have been replaced;
+    # ``changes`` starts again from the beginning.
+    reset: bool
+
+
+class MerchantSuggestion(BaseModel):
+    merchant: str
+    # Stored transactions with this merchant.
+    transactions: int
+
+
+class RowError(BaseModel):
+    row: int
+    message: str
+
+
+class DuplicatePolicy(str, Enum):
+    """What to do with a transaction that duplicates a stored one."""
+
+    allow = "allow"
+    flag = "flag"
+    skip = "skip"
+
+
+class BulkImportResult(BaseModel):
+    inserted: int
+    failed: int
+    errors: list[RowError]
+    # Set when duplicates were checked for: how many rows duplicated a
+    # stored transaction (skipped or flagged) and which, the first hundred.
+    duplicates: Optional[int] = None
+    duplicate_rows: Optional[list[int]] = None
+
+
 class GoalCreate(BaseModel):
     name: str
     target_amount: float
@@ -50,18 +97,57 @@ class GoalWithProjection(Goal):
     projection: GoalProjection
 
 
+def _project(target_amount: float, monthly_contribution: float, start_date: date) -> tuple[int, date]:
+    if monthly_contribution <= 0:
+        return 0, start_date
+    months = math.ceil(target_amount / monthly_contribution)
+    return months, start_date + relativedelta(months=months)
+
+
 def compute_projection(goal: Goal) -> GoalProjection:
     """Compute simple projection for a goal."""
-    if goal.monthly_contribution <= 0:
-        return GoalProjection(
-            months_to_target=0,
-            target_date=goal.start_date,
-        )
-    months = math.ceil(goal.target_amount / goal.monthly_contribution)
-    target_date = goal.start_date + relativedelta(months=months)
+    months, target_date = _project(goal.target_amount, goal.monthly_contribution, goal.start_date)
     return GoalProjection(months_to_target=months, target_date=target_date)
 
 
+class GoalRecord(NamedTuple):
+    """A stored goal read without validation, for handlers that only compute
+    on it and return JSON."""
+
+    name: str
+    target_amount: float
+    monthly_contribution: float
+    start_date: date
+    id: str
+
+    @classmethod
+    def from_dict(cls, record: dict) -> "GoalRecord":
+        return cls(
+            record["name"],
+            record["target_amount"],
+            record["monthly_contribution"],
+            date.fromisoformat(record["start_date"]),
+            record["id"],
+        )
+
+    def with_projection(self) -> dict:
+        """The JSON shape of ``GoalWithProjection``."""
+        months, target_date = _project(
+            self.target_amount, self.monthly_contribution, self.start_date
+        )
+        return {
+            "name": self.name,
+            "target_amount": self.target_amount,
+            "monthly_contribution": self.monthly_contribution,
+            "start_date": self.start_date.isoformat(),
+            "id": self.id,
+            "projection": {
+                "months_to_target": months,
+                "target_date": target_date.isoformat(),
+            },
+        }
+
+
 class Summary(BaseModel):
     total_income: float
     total_expense: float
@@ -70,8 +156,42 @@ class Summary(BaseModel):
     monthly_net: dict[str, float]
 
 
+class VersionedSummary(Summary):
+    # Store version the summary was computed at, as a string: versions may
+    # be larger than a JavaScript number holds exactly.
+    version: str
+
+
+class Granularity(str, Enum):
+    day = "day"
+    week = "week"
+    month = "month"
+    year = "year"
+
+
+class PeriodTotals(BaseModel):
+    income: float
+    expense: float
+    net: float
+
+
+class TimeseriesPoint(PeriodTotals):
+    period: str
+    categories: Optional[dict[str, PeriodTotals]] = None
+
+
+class Timeseries(BaseModel):
+    granularity: Granularity
+    points: list[TimeseriesPoint]
+
+
 def compute_summary(transactions: list[Transaction]) -> Summary:
-    """Pure function: compute summary statistics from a list of transactions."""
+    """Pure function: compute summary statistics from a list of transactions.
+
+    The reference the stores are checked against (see ``cli verify``); they
+    answer ``/summary`` from the aggregates in ``app.aggregates`` instead,
+    and time series from the NumPy columns of ``indexes.Columns``.
+    """
     total_income = 0.0
     total_expense = 0.0
     spend_by_cat: dict[str, float] = defaultdict(float)
@@ -0,0 +1,109 @@
+"""In-memory, precompressed HTML pages.
+
+Each template is read once and kept as identity, gzip and, when the
+``brotli`` package is installed, brotli variants, each with its own
+content-hash ETag. Set ``COMPOUND_RELOAD_TEMPLATES=1`` while editing
+templates to pick up changes without restarting; pages are then re-read
+when their file changes and served with ``no-cache``.
+"""
+
+import gzip
+import hashlib
+import os
+import threading
+from pathlib import Path
+from typing import Collection, Optional
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+RELOAD = os.environ.get("COMPOUND_RELOAD_TEMPLATES", "") not in ("", "0")
+
+# Pages live at fixed URLs, so they are cached for a day and revalidated by
+# ETag after that rather than marked immutable.
+CACHE_CONTROL = "public, max-age=86400"
+RELOAD_CACHE_CONTROL = "no-cache"
+
+# Preference order when a client accepts several encodings equally.
+ENCODINGS = ("br", "gzip", "identity")
+
+
+def _compress(body: bytes) -> dict[str, bytes]:
+    variants = {"identity": body, "gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants["br"] = brotli.compress(body, quality=11)
+    return variants
+
+
+class Page:
+    def __init__(self, path: Path):
+        self.path = path
+        self.mtime_ns = os.stat(path).st_mtime_ns
+        body = path.read_bytes()
+        digest = hashlib.blake2b(body, digest_size=12).hexdigest()
+        self.variants = _compress(body)
+        # Strong ETags must differ between encodings of the same content.
+        self.etags = {
+            encoding: f'"{digest}"' if encoding == "identity" else f'"{digest}-{encoding}"'
+            for encoding in self.variants
+        }
+
+
+def _accepted(accept_encoding: Optional[str]) -> dict[str, float]:
+    accepted: dict[str, float] = {}
+    for item in (accept_encoding or "").split(","):
+        coding, _, params = item.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def choose_encoding(accept_encoding: Optional[str], available: Collection[str]) -> str:
+    """The best of ``available`` for an ``Accept-Encoding`` header."""
+    accepted = _accepted(accept_encoding)
+    wildcard = accepted.get("*")
+    best, best_q = "identity", -1.0
+    for encoding in ENCODINGS:
+        if encoding not in available:
+            continue
+        q = accepted.get(encoding, wildcard)
+        if q is None:
+            # identity is acceptable unless refused, but any encoding the
+            # client did list is preferred to it.
+            q = 0.001 if encoding == "identity" else 0.0
+        if q > best_q and q > 0:
+            best, best_q = encoding, q
+    return best
+
+
+class PageCache:
+    """Pages by template name, loaded eagerly from ``directory``."""
+
+    def __init__(self, directory: Path, reload: bool = False):
+        self.directory = directory
+        self.reload = reload
+        self._lock = threading.Lock()
+        self._pages = {path.name: Page(path) for path in directory.glob("*.html")}
+
+    @property
+    def cache_control(self) -> str:
+        return RELOAD_CACHE_CONTROL if self.reload else CACHE_CONTROL
+
+    def get(self, name: str) -> Page:
+        page = self._pages[name]
+        if self.reload and os.stat(page.path).st_mtime_ns != page.mtime_ns:
+            with self._lock:
+                page = self._pages[name] = Page(page.path)
+        return page
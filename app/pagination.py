@@ -0,0 +1,31 @@
+"""Opaque keyset cursors for paging through transactions."""
+
+import base64
+import json
+from datetime import date
+
+MAX_PAGE_SIZE = 1000
+
+
+def encode_cursor(record: dict) -> str:
+    """Cursor pointing just past ``record`` in (date, id) order."""
+    raw = json.dumps([record["date"], record["id"]], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[str, str]:
+    """The (date, id) key encoded in ``cursor``; raises ValueError if malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        day, tx_id = json.loads(raw)
+    except (ValueError, TypeError) as exc:
+        raise ValueError("Invalid cursor") from exc
+    if not isinstance(day, str) or not isinstance(tx_id, str):
+        raise ValueError("Invalid cursor")
+    try:
+        valid = date.fromisoformat(day).isoformat() == day
+    except ValueError:
+        valid = False
+    if not valid:
+        raise ValueError("Invalid cursor")
+    return day, tx_id
@@ -0,0 +1,436 @@
+"""Month-partitioned storage backend.
+
+Transactions live in one NDJSON file per month of their date, under
+``data/transactions/`` (``2024-05.3.jsonl``), and goals in
+``data/goals.1.jsonl``; the number is the store version that created the
+file, so a name is never reused for different contents. ``data/manifest.json``
+is the commit point: it names the file behind each partition with its
+committed size, row count and per-category buckets (see ``app.aggregates``),
+and holds the store version and the last transaction sequence number (see
+``Store.changes``)::
+
+    {"version": 7, "seq": 31,
+     "goals": {"file": "goals.1.jsonl", "bytes": 120, "rows": 1},
+     "partitions": {"2024-05": {"file": "2024-05.3.jsonl", "bytes": 4096,
+                                "rows": 31, "buckets": {"fun": [0, 5000, 1, 1]},
+                                "runs": [[1, 0, 30], [31, 30, 1]]}}}
+
+``runs`` maps sequence numbers to rows: ``[first seq, first row, count]``
+for each stretch of consecutive sequence numbers in the partition. Each
+append numbers its transactions month by month, so a run grows for as long
+as appends keep landing in the same month.
+
+Readers only read the bytes the manifest covers, so an append is committed
+once the manifest names it, and a torn write past that point is truncated by
+the next append. Range queries open only the partitions that overlap the
+range, summaries read only the partial months at either end of it, and an
+append writes to the partitions of its records' months (normally just the
+current one) and then the manifest. ``save`` writes fresh files and swaps
+them in with the manifest.
+
+Transactions come back month by month, in the order they were recorded
+within each month, rather than strictly in recorded order; ``changes``
+returns them in sequence order.
+"""
+
+import os
+import tempfile
+import threading
+from datetime import date
+from pathlib import Path
+from typing import Iterator, Optional
+
+import orjson
+
+from app import metrics
+from app.aggregates import MonthlyAggregates, month_key, summarize_range
+from app.concurrency import FileLock
+from app.dedupe import Fingerprints
+from app.indexes import sort_key
+from app.merchants import MerchantIndex
+from app.models import Category, Summary
+from app.storage import Store, _file_version, _unlink
+
+
+def _empty_manifest() -> dict:
+    return {
+        "version": 0,
+        "seq": 0,
+        "goals": {"file": None, "bytes": 0, "rows": 0},
+        "partitions": {},
+    }
+
+
+def _number(manifest: dict) -> dict:
+    """Give a manifest written before sequence numbers existed some, in
+    partition order."""
+    seq = 0
+    for month in sorted(manifest["partitions"]):
+        entry = manifest["partitions"][month]
+        entry["runs"] = [[seq + 1, 0, entry["rows"]]] if entry["rows"] else []
+        seq += entry["rows"]
+    manifest["seq"] = seq
+    return manifest
+
+
+def _extend_runs(runs: list[list[int]], seq: int, row: int, count: int) -> list[list[int]]:
+    """``runs`` plus ``count`` rows from ``row`` numbered from ``seq``."""
+    if runs:
+        first_seq, first_row, length = runs[-1]
+        if first_seq + length == seq and first_row + length == row:
+            return runs[:-1] + [[first_seq, first_row, length + count]]
+    return runs + [[seq, row, count]]
+
+
+def _encode(records: list[dict]) -> bytes:
+    return b"".join(orjson.dumps(r) + b"\n" for r in records)
+
+
+def _buckets(records: list[dict]) -> dict[str, list[int]]:
+    return {category: values for _, category, values in MonthlyAggregates(records).buckets()}
+
+
+def _write_file(path: Path, payload: bytes) -> None:
+    """Atomically create or replace ``path``."""
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class PartitionedStore(Store):
+    """One file per month of transactions, plus a manifest.
+
+    Writes hold an advisory lock on ``compound.lock``, as ``JsonStore``'s do.
+    Parsed partitions are cached by file and committed size, and a partition
+    that has grown is extended by reading only its new bytes.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.partition_dir = directory / "transactions"
+        self.manifest_file = directory / "manifest.json"
+        self.lock = FileLock(directory / "compound.lock")
+        # (stamp, manifest): the parsed manifest, valid while the file matches stamp.
+        self._manifest: tuple | None = None
+        # path -> (committed bytes, records)
+        self._files: dict[Path, tuple[int, list[dict]]] = {}
+        # (store version, fingerprints and merchants of every transaction at
+        # that version)
+        self._lookups: tuple[int, Fingerprints, MerchantIndex] | None = None
+        self._cache_lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0}
+
+    def cache_stats(self) -> dict:
+        return dict(self._stats)
+
+    def manifest(self) -> dict:
+        stamp = _file_version(self.manifest_file)
+        cached = self._manifest
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        try:
+            manifest = orjson.loads(self.manifest_file.read_bytes())
+        except FileNotFoundError:
+            manifest = _empty_manifest()
+        if "seq" not in manifest:
+            manifest = _number(manifest)
+        self._manifest = (stamp, manifest)
+        return manifest
+
+    def _write_manifest(self, manifest: dict) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        _write_file(self.manifest_file, orjson.dumps(manifest))
+
+    def _read(self, path: Path, size: int) -> list[dict]:
+        """The records in the first ``size`` bytes of ``path``."""
+        with self._cache_lock:
+            cached = self._files.get(path)
+        if cached is not None and cached[0] == size:
+            self._stats["hits"] += 1
+            return cached[1]
+        self._stats["misses"] += 1
+        start, records = cached if cached is not None and cached[0] < size else (0, [])
+        with metrics.phase("load"), open(path, "rb") as f:
+            f.seek(start)
+            chunk = f.read(size - start)
+        records = records + [orjson.loads(line) for line in chunk.splitlines()]
+        with self._cache_lock:
+            self._files[path] = (size, records)
+        return records
+
+    def _partition(self, entry: dict) -> list[dict]:
+        return self._read(self.partition_dir / entry["file"], entry["bytes"])
+
+    def _goals(self, manifest: dict) -> list[dict]:
+        entry = manifest["goals"]
+        if not entry["bytes"]:
+            return []
+        return self._read(self.directory / entry["file"], entry["bytes"])
+
+    def _months(
+        self,
+        manifest: dict,
+        from_date: Optional[date] = None,
+        to_date: Optional[date] = None,
+    ) -> list[str]:
+        """Partitions overlapping the date range, oldest first."""
+        first = month_key(from_date) if from_date is not None else ""
+        last = month_key(to_date) if to_date is not None else "9999-99"
+        return sorted(m for m in manifest["partitions"] if first <= m <= last)
+
+    def exists(self) -> bool:
+        return self.manifest_file.exists()
+
+    def load(self) -> dict:
+        manifest = self.manifest()
+        partitions = manifest["partitions"]
+        transactions = []
+        for month in sorted(partitions):
+            transactions.extend(self._partition(partitions[month]))
+        return {"transactions": transactions, "goals": list(self._goals(manifest))}
+
+    def goals(self) -> list[dict]:
+        return list(self._goals(self.manifest()))
+
+    def save(self, data: dict) -> None:
+        """Replace the store. Every file is written afresh, under a name
+        carrying the new version, and takes effect with the manifest."""
+        with self.lock:
+            old = self.manifest()
+            version = old["version"] + 1
+            self.partition_dir.mkdir(parents=True, exist_ok=True)
+            by_month: dict[str, list[dict]] = {}
+            for r in data.get("transactions", []):
+                by_month.setdefault(r["date"][:7], []).append(r)
+            manifest = {"version": version, "seq": 0, "partitions": {}}
+            for month, records in by_month.items():
+                payload = _encode(records)
+                name = f"{month}.{version}.jsonl"
+                _write_file(self.partition_dir / name, payload)
+                manifest["partitions"][month] = {
+                    "file": name,
+                    "bytes": len(payload),
+                    "rows": len(records),
+                    "buckets": _buckets(records),
+                    "runs": [[manifest["seq"] + 1, 0, len(records)]],
+                }
+                manifest["seq"] += len(records)
+            goals = data.get("goals", [])
+            payload = _encode(goals)
+            name = f"goals.{version}.jsonl"
+            _write_file(self.directory / name, payload)
+            manifest["goals"] = {"file": name, "bytes": len(payload), "rows": len(goals)}
+            self._write_manifest(manifest)
+            for entry in old["partitions"].values():
+                _unlink(self.partition_dir / entry["file"])
+            if old["goals"]["file"] is not None:
+                _unlink(self.directory / old["goals"]["file"])
+            with self._cache_lock:
+                self._files.clear()
+            self._lookups = None
+
+    def append(self, kind: str, records: list[dict]) -> None:
+        self.append_many([(kind, records)])
+
+    def append_many(self, entries: list[tuple[str, list[dict]]]) -> None:
+        """Append to the partitions of the records' months, then commit
+        them all with one manifest write."""
+        goals = [r for kind, records in entries if kind == "goals" for r in records]
+        by_month: dict[str, list[dict]] = {}
+        for kind, records in entries:
+            if kind == "transactions":
+                for r in records:
+                    by_month.setdefault(r["date"][:7], []).append(r)
+        with self.lock:
+            old = self.manifest()
+            version = old["version"] + 1
+            # Cached manifests are shared with readers, so build a new one.
+            manifest = {
+                "version": version,
+                "seq": old["seq"],
+                "goals": old["goals"],
+                "partitions": dict(old["partitions"]),
+            }
+            if goals:
+                entry = manifest["goals"]
+                if entry["file"] is None:
+                    entry = {**entry, "file": f"goals.{version}.jsonl"}
+                manifest["goals"] = self._append_file(self.directory / entry["file"], entry, goals)
+            for month, records in by_month.items():
+                entry = manifest["partitions"].get(month) or {
+                    "file": f"{month}.{version}.jsonl",
+                    "bytes": 0,
+                    "rows": 0,
+                    "buckets": {},
+                    "runs": [],
+                }
+                runs = _extend_runs(entry["runs"], manifest["seq"] + 1, entry["rows"], len(records))
+                manifest["seq"] += len(records)
+                entry = self._append_file(self.partition_dir / entry["file"], entry, records)
+                buckets = {c: list(v) for c, v in entry["buckets"].items()}
+                for category, values in _buckets(records).items():
+                    totals = buckets.setdefault(category, [0, 0, 0, 0])
+                    for i, value in enumerate(values):
+                        totals[i] += value
+                manifest["partitions"][month] = {**entry, "buckets": buckets, "runs": runs}
+            self._write_manifest(manifest)
+            cached = self._lookups
+            if cached is not None and cached[0] == old["version"]:
+                added = [r for records in by_month.values() for r in records]
+                cached[1].add(added)
+                cached[2].add(added)
+                self._lookups = (version, cached[1], cached[2])
+
+    def _append_file(self, path: Path, entry: dict, records: list[dict]) -> dict:
+        """Write ``records`` after the committed size of ``entry``'s file and
+        return the entry as it will be once committed."""
+        payload = _encode(records)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "ab") as f:
+            # Drop anything past the committed size, e.g. from a crash
+            # between writing a partition and the manifest.
+            f.truncate(entry["bytes"])
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        return {**entry, "bytes": entry["bytes"] + len(payload), "rows": entry["rows"] + len(records)}
+
+    def version(self) -> int:
+        return self.manifest()["version"]
+
+    def _scan(
+        self,
+        manifest: dict,
+        month: str,
+        lower: Optional[str],
+        upper: Optional[str],
+        category: Optional[str],
+    ) -> Iterator[dict]:
+        entry = manifest["partitions"][month]
+        if category is not None and category not in entry["buckets"]:
+            return
+        for t in self._partition(entry):
+            if lower is not None and t["date"] < lower:
+                continue
+            if upper is not None and t["date"] > upper:
+                continue
+            if category is not None and t["category"] != category:
+                continue
+            yield t
+
+    def iter_transactions(
+        self,
+        from_date: Optional[date] = None,
+        to_date: Optional[date] = None,
+        category: Optional[Category] = None,
+    ) -> Iterator[dict]:
+        manifest = self.manifest()
+        lower = from_date.isoformat() if from_date is not None else None
+        upper = to_date.isoformat() if to_date is not None else None
+        value = category.value if category is not None else None
+        for month in self._months(manifest, from_date, to_date):
+            yield from self._scan(manifest, month, lower, upper, value)
+
+    def query_transactions(
+        self,
+        from_date: Optional[date] = None,
+        to_date: Optional[date] = None,
+        category: Optional[Category] = None,
+        limit: Optional[int] = None,
+        before: Optional[tuple[str, str]] = None,
+    ) -> list[dict]:
+        """Reads partitions newest first, stopping once ``limit`` is met."""
+        if before is not None:
+            # Validated by decode_cursor.
+            before_date = date.fromisoformat(before[0])
+            to_date = before_date if to_date is None else min(to_date, before_date)
+        manifest = self.manifest()
+        lower = from_date.isoformat() if from_date is not None else None
+        upper = to_date.isoformat() if to_date is not None else None
+        value = category.value if category is not None else None
+        matches: list[dict] = []
+        for month in reversed(self._months(manifest, from_date, to_date)):
+            with metrics.phase("filter"):
+                rows = self._scan(manifest, month, lower, upper, value)
+                if before is not None:
+                    rows = (t for t in rows if sort_key(t) < before)
+                matches.extend(sorted(rows, key=sort_key, reverse=True))
+            if limit is not None and len(matches) >= limit:
+                break
+        return matches[:limit]
+
+    def changes(
+        self, since: int, limit: Optional[int] = None
+    ) -> tuple[int, list[tuple[int, dict]]]:
+        """Reads only the runs numbered after ``since``, newest first in
+        each partition, so the cost follows the number of changes."""
+        manifest = self.manifest()
+        picked: list[tuple[int, dict]] = []
+        with metrics.phase("query"):
+            for entry in manifest["partitions"].values():
+                runs = entry["runs"]
+                if not runs or runs[-1][0] + runs[-1][2] - 1 <= since:
+                    continue
+                records = self._partition(entry)
+                for first_seq, first_row, count in reversed(runs):
+                    if first_seq + count - 1 <= since:
+                        break
+                    skip = max(0, since + 1 - first_seq)
+                    rows = records[first_row + skip : first_row + count]
+                    picked.extend(zip(range(first_seq + skip, first_seq + count), rows))
+            picked.sort(key=lambda pair: pair[0])
+        return manifest["seq"], picked[:limit]
+
+    def _lookup(self) -> tuple[int, Fingerprints, MerchantIndex]:
+        """Fingerprints and merchants built once from every partition and
+        then extended by this process's appends."""
+        manifest = self.manifest()
+        cached = self._lookups
+        if cached is None or cached[0] != manifest["version"]:
+            partitions = manifest["partitions"]
+            with metrics.phase("index"):
+                records = [
+                    t for month in sorted(partitions) for t in self._partition(partitions[month])
+                ]
+                cached = (manifest["version"], Fingerprints(records), MerchantIndex(records))
+            self._lookups = cached
+        return cached
+
+    def duplicates(self, records: list[dict], window: int = 0) -> list[bool]:
+        fingerprints = self._lookup()[1]
+        with metrics.phase("filter"):
+            return fingerprints.match(records, window)
+
+    def suggest_merchants(self, prefix: str, limit: int = 10) -> list[tuple[str, int]]:
+        merchants = self._lookup()[2]
+        with metrics.phase("filter"):
+            return merchants.suggest(prefix, limit)
+
+    def summarize(
+        self,
+        from_date: Optional[date] = None,
+        to_date: Optional[date] = None,
+    ) -> Summary:
+        manifest = self.manifest()
+
+        def buckets(first: Optional[str], last: Optional[str]):
+            partitions = manifest["partitions"]
+            return [
+                (month, category, values)
+                for month in sorted(partitions)
+                if (first is None or month >= first) and (last is None or month <= last)
+                for category, values in partitions[month]["buckets"].items()
+            ]
+
+        def partial(lower: date, upper: date):
+            return MonthlyAggregates(self.iter_transactions(lower, upper)).buckets()
+
+        with metrics.phase("aggregate"):
+            return summarize_range(from_date, to_date, buckets, partial)
@@ -0,0 +1,40 @@
+"""JSON responses encoded with orjson.
+
+``ORJSONResponse`` is the app's default response class, so every JSON body
+goes through the same encoder. Handlers whose data is already in its JSON
+shape (records as stored) return one directly: FastAPI then skips validating
+the result against the route's ``response_model``, which stays declared for
+the OpenAPI schema.
+"""
+
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse, Response
+
+from app import metrics
+from app.async_storage import offload
+
+# Lists longer than this are encoded off the event loop.
+OFFLOAD_ITEMS = 1000
+
+OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+class ORJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        with metrics.phase("encode"):
+            return orjson.dumps(content, option=OPTIONS)
+
+
+def _encode(items: list) -> bytes:
+    with metrics.phase("encode"):
+        return orjson.dumps(items, option=OPTIONS)
+
+
+async def list_response(items: list, headers: dict[str, str] | None = None) -> Response:
+    """An ``ORJSONResponse`` for ``items``, encoded on the reader pool if long."""
+    if len(items) <= OFFLOAD_ITEMS:
+        return ORJSONResponse(items, headers=headers)
+    body = await offload(_encode, items)
+    return Response(body, media_type="application/json", headers=headers)
@@ -0,0 +1,23 @@
+from typing import Optional
+
+from fastapi import APIRouter, Header
+from fastapi.responses import StreamingResponse
+
+from app.events import BROADCASTER
+
+router = APIRouter(tags=["events"])
+
+
+@router.get("/events", response_class=StreamingResponse)
+async def stream_events(last_event_id: Optional[str] = Header(None)) -> StreamingResponse:
+    """Server-Sent Events for each transaction and goal created; see
+    ``app.events``."""
+    try:
+        resume = int(last_event_id) if last_event_id is not None else None
+    except ValueError:
+        resume = None
+    return StreamingResponse(
+        BROADCASTER.stream(resume),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,30 +1,33 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
 
+from app import async_storage, metrics
+from app.conditional import conditional_get
 from app.models import (
     Goal,
     GoalCreate,
+    GoalRecord,
     GoalWithProjection,
-    compute_projection,
 )
-from app.storage import append_goal, load_data
+from app.responses import ORJSONResponse
 
 router = APIRouter(prefix="/goals", tags=["goals"])
 
 
-def _goal_with_projection(goal: Goal) -> GoalWithProjection:
-    projection = compute_projection(goal)
-    return GoalWithProjection(**goal.model_dump(), projection=projection)
+def _with_projections(goals: list[dict]) -> list[dict]:
+    with metrics.phase("project"):
+        return [GoalRecord.from_dict(g).with_projection() for g in goals]
 
 
 @router.get("", response_model=list[GoalWithProjection])
-def list_goals() -> list[GoalWithProjection]:
-    data = load_data()
-    goals = [Goal.model_validate(g) for g in data["goals"]]
-    return [_goal_with_projection(g) for g in goals]
+async def list_goals(headers: dict[str, str] = Depends(conditional_get)) -> ORJSONResponse:
+    goals = await async_storage.offload(_with_projections, await async_storage.goals())
+    return ORJSONResponse(goals, headers=headers)
 
 
 @router.post("", status_code=201, response_model=GoalWithProjection)
-def create_goal(body: GoalCreate) -> GoalWithProjection:
-    goal = Goal(**body.model_dump())
-    append_goal(goal)
-    return _goal_with_projection(goal)
+async def create_goal(body: GoalCreate) -> ORJSONResponse:
+    with metrics.phase("validate"):
+        goal = Goal(**body.model_dump())
+        record = goal.model_dump(mode="json")
+    await async_storage.append_goal(goal)
+    return ORJSONResponse(GoalRecord.from_dict(record).with_projection(), status_code=201)
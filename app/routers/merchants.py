@@ -0,0 +1,22 @@
+from fastapi import APIRouter, Depends, Query
+
+from app import async_storage
+from app.conditional import conditional_get
+from app.merchants import MAX_SUGGESTIONS
+from app.models import MerchantSuggestion
+from app.responses import ORJSONResponse
+
+router = APIRouter(prefix="/merchants", tags=["merchants"])
+
+
+@router.get("/suggest", response_model=list[MerchantSuggestion])
+async def suggest_merchants(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(10, ge=1, le=MAX_SUGGESTIONS),
+    headers: dict[str, str] = Depends(conditional_get),
+) -> ORJSONResponse:
+    """Merchants starting with ``q``, ignoring case and punctuation, most
+    frequently used first."""
+    found = await async_storage.suggest_merchants(q, limit)
+    body = [{"merchant": merchant, "transactions": n} for merchant, n in found]
+    return ORJSONResponse(body, headers=headers)
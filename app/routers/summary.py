@@ -1,26 +1,38 @@
 from datetime import date
 from typing import Optional
 
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, Depends, Query
 
-from app.models import Summary, Transaction, compute_summary
-from app.storage import load_data
+from app.conditional import conditional_get
+from app.models import Granularity, Timeseries, VersionedSummary
+from app.responses import ORJSONResponse
+from app import async_storage
 
 router = APIRouter(prefix="/summary", tags=["summary"])
 
 
-@router.get("", response_model=Summary)
-def get_summary(
+@router.get("", response_model=VersionedSummary)
+async def get_summary(
     from_date: Optional[date] = Query(None, alias="from"),
     to_date: Optional[date] = Query(None, alias="to"),
-):
-    data = load_data()
-    txns = data["transactions"]
+    headers: dict[str, str] = Depends(conditional_get),
+) -> ORJSONResponse:
+    """With ``version``, the store version it includes the writes up to, as
+    ``/events`` events carry the version of their write."""
+    version, summary = await async_storage.versioned_summary(from_date, to_date)
+    return ORJSONResponse({**summary.model_dump(), "version": str(version)}, headers=headers)
 
-    if from_date is not None:
-        txns = [t for t in txns if date.fromisoformat(t["date"]) >= from_date]
-    if to_date is not None:
-        txns = [t for t in txns if date.fromisoformat(t["date"]) <= to_date]
 
-    transactions = [Transaction(**t) for t in txns]
-    return compute_summary(transactions)
+@router.get("/timeseries", response_model=Timeseries, response_model_exclude_none=True)
+async def get_timeseries(
+    granularity: Granularity = Granularity.month,
+    from_date: Optional[date] = Query(None, alias="from"),
+    to_date: Optional[date] = Query(None, alias="to"),
+    by_category: bool = False,
+    headers: dict[str, str] = Depends(conditional_get),
+) -> ORJSONResponse:
+    """Income, expense and net per period, oldest first; only periods with
+    transactions appear. With ``by_category``, each point also splits its
+    totals by category."""
+    series = await async_storage.timeseries(granularity, from_date, to_date, by_category)
+    return ORJSONResponse(series, headers=headers)
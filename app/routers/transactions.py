@@ -1,40 +1,132 @@
 from datetime import date
 from typing import Optional
 
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 
-from app.models import Category, Transaction
-from app.storage import load_data
-
-from app.models import Transaction, TransactionCreate
-from app.storage import append_transaction
-
-from app.models import Transaction, TransactionCreate
-from app.storage import append_transaction
+from app import async_storage, export, ingest, metrics
+from app.conditional import conditional_get
+from app.dedupe import MAX_WINDOW, DuplicateCheck
+from app.export import ExportFormat
+from app.models import (
+    BulkImportResult,
+    Category,
+    DuplicatePolicy,
+    Transaction,
+    TransactionChanges,
+    TransactionCreate,
+)
+from app.pagination import MAX_PAGE_SIZE, decode_cursor, encode_cursor
+from app.responses import ORJSONResponse, list_response
 
 router = APIRouter(prefix="/transactions", tags=["transactions"])
 
 @router.get("", response_model=list[Transaction])
-def list_transactions(
+async def list_transactions(
     from_date: Optional[date] = Query(None, alias="from"),
     to_date: Optional[date] = Query(None, alias="to"),
     category: Optional[Category] = None,
-) -> list[dict]:
-    data = load_data()
-    txns = data["transactions"]
-
-    if from_date is not None:
-        txns = [t for t in txns if date.fromisoformat(t["date"]) >= from_date]
-    if to_date is not None:
-        txns = [t for t in txns if date.fromisoformat(t["date"]) <= to_date]
-    if category is not None:
-        txns = [t for t in txns if t["category"] == category.value]
-
-    txns.sort(key=lambda t: t["date"], reverse=True)
-    return txns
-
-@router.post("", status_code=201)
-def create_transaction(body: TransactionCreate) -> Transaction:
-    tx = Transaction(**body.model_dump())
-    append_transaction(tx)
-    return tx
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    headers: dict[str, str] = Depends(conditional_get),
+) -> Response:
+    """Most recent first. With ``limit``, the ``X-Next-Cursor`` response
+    header holds the ``cursor`` for the following page, if there is one."""
+    before = None
+    if cursor is not None:
+        try:
+            before = decode_cursor(cursor)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+    fetch = limit + 1 if limit is not None else None
+    txns = await async_storage.query_transactions(from_date, to_date, category, fetch, before)
+    if limit is not None and len(txns) > limit:
+        txns = txns[:limit]
+        headers["X-Next-Cursor"] = encode_cursor(txns[-1])
+    # Stored records are already in the response shape.
+    return await list_response(txns, headers=headers)
+
+@router.get("/changes", response_model=TransactionChanges)
+async def list_changes(
+    since: int = Query(0, ge=0),
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    headers: dict[str, str] = Depends(conditional_get),
+) -> ORJSONResponse:
+    """Transactions recorded after sequence number ``since``, each with its
+    ``seq``; pass the returned ``seq`` as ``since`` to fetch what follows."""
+    high, changes = await async_storage.changes(since, limit)
+    reset = since > high
+    if reset:
+        high, changes = await async_storage.changes(0, limit)
+    seq = changes[-1][0] if changes else high
+    body = {
+        "changes": [{**record, "seq": n} for n, record in changes],
+        "seq": seq,
+        "more": seq < high,
+        "reset": reset,
+    }
+    return ORJSONResponse(body, headers=headers)
+
+@router.get("/export")
+async def export_transactions(
+    fmt: ExportFormat = Query(ExportFormat.ndjson, alias="format"),
+    from_date: Optional[date] = Query(None, alias="from"),
+    to_date: Optional[date] = Query(None, alias="to"),
+    category: Optional[Category] = None,
+) -> StreamingResponse:
+    """Stream matching transactions, in the order they were recorded."""
+    rows = async_storage.iter_transactions(from_date, to_date, category)
+    return StreamingResponse(
+        async_storage.iterate(export.encode(rows, fmt)),
+        media_type=export.MEDIA_TYPES[fmt],
+        headers={
+            "Content-Disposition": f'attachment; filename="transactions.{fmt.value}"'
+        },
+    )
+
+@router.post("", status_code=201, response_model=Transaction)
+async def create_transaction(
+    body: TransactionCreate,
+    on_duplicate: DuplicatePolicy = DuplicatePolicy.allow,
+    window: int = Query(0, ge=0, le=MAX_WINDOW),
+) -> ORJSONResponse:
+    """With ``on_duplicate=flag``, a transaction duplicating a stored one
+    (same day, or within ``window`` days, amount and merchant) is stored
+    with an ``X-Duplicate: true`` response header; with ``skip`` it is
+    refused with a 409."""
+    with metrics.phase("validate"):
+        tx = Transaction(**body.model_dump())
+        record = tx.model_dump(mode="json")
+    headers = {}
+    check = None
+    if on_duplicate != DuplicatePolicy.allow:
+        check = DuplicateCheck(window, skip=on_duplicate == DuplicatePolicy.skip)
+    found = await async_storage.append_transaction(tx, check)
+    if found is not None:
+        [duplicate] = found
+        if duplicate and check.skip:
+            raise HTTPException(status_code=409, detail="Duplicate of a stored transaction")
+        headers["X-Duplicate"] = "true" if duplicate else "false"
+    return ORJSONResponse(record, status_code=201, headers=headers)
+
+@router.post("/bulk", response_model=BulkImportResult, response_model_exclude_none=True)
+async def bulk_import(
+    request: Request,
+    on_duplicate: DuplicatePolicy = DuplicatePolicy.allow,
+    window: int = Query(0, ge=0, le=MAX_WINDOW),
+) -> BulkImportResult:
+    """Import a CSV (with a header row) or NDJSON body of transactions.
+
+    Invalid rows are reported and skipped; valid rows are committed in batches.
+    With ``on_duplicate=flag`` or ``skip``, rows duplicating a stored
+    transaction are reported, and with ``skip`` not imported.
+    """
+    try:
+        rows = ingest.parse_rows(request.stream(), request.headers.get("content-type"))
+    except ingest.UnsupportedFormat as exc:
+        raise HTTPException(status_code=415, detail=str(exc))
+
+    check = None
+    if on_duplicate != DuplicatePolicy.allow:
+        check = DuplicateCheck(window, skip=on_duplicate == DuplicatePolicy.skip)
+    return await ingest.ingest(rows, async_storage.append_transactions, check)
@@ -1,26 +1,44 @@
 from pathlib import Path
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Request, Response
 from fastapi.responses import HTMLResponse
 
+from app import pages
+from app.conditional import etag_matches
+
 router = APIRouter(tags=["ui"])
 
 TEMPLATES_DIR = Path(__file__).resolve().parent.parent / "templates"
 
+# Loaded once, when the app is imported.
+PAGES = pages.PageCache(TEMPLATES_DIR, reload=pages.RELOAD)
+
+
+def _serve(request: Request, name: str) -> Response:
+    page = PAGES.get(name)
+    encoding = pages.choose_encoding(request.headers.get("accept-encoding"), page.variants)
+    headers = {
+        "ETag": page.etags[encoding],
+        "Cache-Control": PAGES.cache_control,
+        "Vary": "Accept-Encoding",
+    }
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return HTMLResponse(content=page.variants[encoding], headers=headers)
+
 
 @router.get("/", response_class=HTMLResponse)
-def home():
-    html = (TEMPLATES_DIR / "transactions.html").read_text()
-    return HTMLResponse(content=html)
+async def home(request: Request):
+    return _serve(request, "transactions.html")
 
 
 @router.get("/summary-page", response_class=HTMLResponse)
-def summary_page():
-    html = (TEMPLATES_DIR / "summary.html").read_text()
-    return HTMLResponse(content=html)
+async def summary_page(request: Request):
+    return _serve(request, "summary.html")
 
 
 @router.get("/goals-page", response_class=HTMLResponse)
-def goals_page():
-    html = (TEMPLATES_DIR / "goals.html").read_text()
-    return HTMLResponse(content=html)
+async def goals_page(request: Request):
+    return _serve(request, "goals.html")
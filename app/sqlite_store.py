@@ -0,0 +1,419 @@
+"""SQLite storage backend.
+
+Transactions and goals live in one database in WAL mode. Transactions are
+indexed on (date, id) and on (category, date, id), so the ``from``/``to``/
+``category`` filters and keyset pages run in SQL rather than in Python.
+
+``monthly_totals`` holds per-month, per-category totals in integer cents,
+maintained by triggers on ``transactions``; summaries add up its rows for
+whole months and total the transactions of partial months in SQL.
+
+``fingerprints`` counts transactions per duplicate-detection fingerprint
+(see ``app.dedupe``). The merchant is normalised in Python, so it is kept up
+to date by ``SqliteStore`` rather than by triggers.
+
+``store_version`` is bumped in the same transaction as every write.
+
+Merchant suggestions come from an in-memory ``MerchantIndex`` built from a
+``GROUP BY merchant`` and extended by this process's appends; a write from
+elsewhere shows up as a version it did not expect, and the index is rebuilt.
+"""
+
+import sqlite3
+from contextlib import contextmanager
+from datetime import date
+from pathlib import Path
+from typing import Iterator, Optional
+
+from app import metrics, timeseries
+from app.aggregates import Bucket, summarize_range
+from app.dedupe import DuplicateCheck, fingerprint, match
+from app.merchants import MerchantIndex
+from app.models import Category, Granularity, Summary
+from app.storage import Store
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transactions (
+    id TEXT PRIMARY KEY,
+    date TEXT NOT NULL,
+    amount REAL NOT NULL,
+    merchant TEXT NOT NULL,
+    category TEXT NOT NULL,
+    notes TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_transactions_date ON transactions (date, id);
+CREATE INDEX IF NOT EXISTS ix_transactions_category_date
+    ON transactions (category, date, id);
+CREATE TABLE IF NOT EXISTS monthly_totals (
+    month TEXT NOT NULL,
+    category TEXT NOT NULL,
+    income INTEGER NOT NULL,
+    expense INTEGER NOT NULL,
+    expense_rows INTEGER NOT NULL,
+    rows INTEGER NOT NULL,
+    PRIMARY KEY (month, category)
+) WITHOUT ROWID;
+CREATE TRIGGER IF NOT EXISTS tr_transactions_insert AFTER INSERT ON transactions
+BEGIN
+    INSERT INTO monthly_totals VALUES (
+        substr(NEW.date, 1, 7),
+        NEW.category,
+        MAX(CAST(round(NEW.amount * 100) AS INTEGER), 0),
+        MAX(-CAST(round(NEW.amount * 100) AS INTEGER), 0),
+        NEW.amount <= 0,
+        1
+    )
+    ON CONFLICT (month, category) DO UPDATE SET
+        income = income + excluded.income,
+        expense = expense + excluded.expense,
+        expense_rows = expense_rows + excluded.expense_rows,
+        rows = rows + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS tr_transactions_delete AFTER DELETE ON transactions
+BEGIN
+    UPDATE monthly_totals SET
+        income = income - MAX(CAST(round(OLD.amount * 100) AS INTEGER), 0),
+        expense = expense - MAX(-CAST(round(OLD.amount * 100) AS INTEGER), 0),
+        expense_rows = expense_rows - (OLD.amount <= 0),
+        rows = rows - 1
+    WHERE month = substr(OLD.date, 1, 7) AND category = OLD.category;
+    DELETE FROM monthly_totals
+    WHERE month = substr(OLD.date, 1, 7) AND category = OLD.category AND rows = 0;
+END;
+CREATE TABLE IF NOT EXISTS store_version (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    version INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO store_version VALUES (0, 0);
+CREATE TABLE IF NOT EXISTS fingerprints (
+    cents INTEGER NOT NULL,
+    merchant TEXT NOT NULL,
+    day INTEGER NOT NULL,
+    rows INTEGER NOT NULL,
+    PRIMARY KEY (cents, merchant, day)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS goals (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    target_amount REAL NOT NULL,
+    monthly_contribution REAL NOT NULL,
+    start_date TEXT NOT NULL
+);
+"""
+
+# Fills monthly_totals for a database created before it existed.
+BACKFILL_MONTHLY_TOTALS = """
+INSERT INTO monthly_totals
+SELECT
+    substr(date, 1, 7),
+    category,
+    SUM(MAX(CAST(round(amount * 100) AS INTEGER), 0)),
+    SUM(MAX(-CAST(round(amount * 100) AS INTEGER), 0)),
+    SUM(amount <= 0),
+    COUNT(*)
+FROM transactions
+WHERE NOT EXISTS (SELECT 1 FROM monthly_totals)
+GROUP BY 1, 2
+"""
+
+ADD_FINGERPRINT = """
+INSERT INTO fingerprints VALUES (?, ?, ?, 1)
+ON CONFLICT (cents, merchant, day) DO UPDATE SET rows = rows + 1
+"""
+
+# Buckets, as in monthly_totals, for the transactions in a date range.
+RANGE_TOTALS = """
+SELECT
+    substr(date, 1, 7),
+    category,
+    SUM(MAX(CAST(round(amount * 100) AS INTEGER), 0)),
+    SUM(MAX(-CAST(round(amount * 100) AS INTEGER), 0)),
+    SUM(amount <= 0),
+    COUNT(*)
+FROM transactions
+WHERE date >= ? AND date <= ?
+GROUP BY 1, 2
+"""
+
+# SQL for the label of the period containing ``date``; see app.timeseries.
+PERIODS = {
+    Granularity.day: "date",
+    Granularity.week: "date(date, '-' || ((strftime('%w', date) + 6) % 7) || ' days')",
+    Granularity.month: "substr(date, 1, 7)",
+    Granularity.year: "substr(date, 1, 4)",
+}
+
+TRANSACTION_COLUMNS = ("date", "amount", "merchant", "category", "notes", "id")
+GOAL_COLUMNS = ("name", "target_amount", "monthly_contribution", "start_date", "id")
+
+COLUMNS = {"transactions": TRANSACTION_COLUMNS, "goals": GOAL_COLUMNS}
+
+
+def _where(
+    from_date: Optional[date],
+    to_date: Optional[date],
+    category: Optional[Category] = None,
+    before: Optional[tuple[str, str]] = None,
+) -> tuple[str, list]:
+    clauses, params = [], []
+    if before is not None:
+        clauses.append("(date, id) < (?, ?)")
+        params.extend(before)
+    if from_date is not None:
+        clauses.append("date >= ?")
+        params.append(from_date.isoformat())
+    if to_date is not None:
+        clauses.append("date <= ?")
+        params.append(to_date.isoformat())
+    if category is not None:
+        clauses.append("category = ?")
+        params.append(category.value)
+    if not clauses:
+        return "", params
+    return " WHERE " + " AND ".join(clauses), params
+
+
+class SqliteStore(Store):
+    def __init__(self, path: Path):
+        self.path = path
+        self._initialised = False
+        # (store version, merchants of every transaction at that version)
+        self._merchants: tuple[int, MerchantIndex] | None = None
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        if not self._initialised:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Streaming exports resume the cursor from threadpool workers.
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        try:
+            if not self._initialised:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(SCHEMA)
+                with conn:
+                    conn.execute(BACKFILL_MONTHLY_TOTALS)
+                    if conn.execute(
+                        "SELECT NOT EXISTS (SELECT 1 FROM fingerprints)"
+                        " AND EXISTS (SELECT 1 FROM transactions)"
+                    ).fetchone()[0]:
+                        # A database from before fingerprints existed.
+                        self._add_fingerprints(conn, self._select(conn, "transactions"))
+                self._initialised = True
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _select(self, conn: sqlite3.Connection, kind: str, sql: str = "", params=()) -> list[dict]:
+        cols = COLUMNS[kind]
+        rows = conn.execute(f"SELECT {', '.join(cols)} FROM {kind}{sql}", params)
+        return [dict(zip(cols, row)) for row in rows]
+
+    def _insert(self, conn: sqlite3.Connection, kind: str, records: list[dict]) -> None:
+        cols = COLUMNS[kind]
+        conn.executemany(
+            f"INSERT INTO {kind} ({', '.join(cols)}) "
+            f"VALUES ({', '.join('?' for _ in cols)})",
+            ([r.get(c) for c in cols] for r in records),
+        )
+        if kind == "transactions":
+            self._add_fingerprints(conn, records)
+
+    def _add_fingerprints(self, conn: sqlite3.Connection, records: list[dict]) -> None:
+        conn.executemany(
+            ADD_FINGERPRINT,
+            ((cents, merchant, day) for day, cents, merchant in map(fingerprint, records)),
+        )
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def load(self) -> dict:
+        with self._connect() as conn, metrics.phase("load"):
+            return {
+                "transactions": self._select(conn, "transactions", " ORDER BY rowid"),
+                "goals": self._select(conn, "goals", " ORDER BY rowid"),
+            }
+
+    def goals(self) -> list[dict]:
+        with self._connect() as conn, metrics.phase("load"):
+            return self._select(conn, "goals", " ORDER BY rowid")
+
+    def _bump_version(self, conn: sqlite3.Connection) -> int:
+        conn.execute("UPDATE store_version SET version = version + 1")
+        return conn.execute("SELECT version FROM store_version").fetchone()[0]
+
+    def save(self, data: dict) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM fingerprints")
+            for kind in COLUMNS:
+                conn.execute(f"DELETE FROM {kind}")
+                self._insert(conn, kind, data.get(kind, []))
+            self._bump_version(conn)
+
+    def append(self, kind: str, records: list[dict]) -> None:
+        self.append_many([(kind, records)])
+
+    def append_many(self, entries: list[tuple[str, list[dict]]]) -> None:
+        with self._connect() as conn:
+            for kind, records in entries:
+                self._insert(conn, kind, records)
+            version = self._bump_version(conn)
+        self._extend_merchants(
+            version, [r for kind, records in entries if kind == "transactions" for r in records]
+        )
+
+    def append_checked(self, records: list[dict], check: DuplicateCheck) -> list[bool]:
+        with self._connect() as conn:
+            # Take the write lock before checking, so no other connection can
+            # insert between the check and the insert.
+            conn.execute("BEGIN IMMEDIATE")
+            found = self._duplicates(conn, records, check.window)
+            if check.skip:
+                records = [r for r, duplicate in zip(records, found) if not duplicate]
+            if not records:
+                return found
+            self._insert(conn, "transactions", records)
+            version = self._bump_version(conn)
+        self._extend_merchants(version, records)
+        return found
+
+    def _extend_merchants(self, version: int, records: list[dict]) -> None:
+        # Keep a merchant index from just before this append current.
+        cached = self._merchants
+        if cached is not None and cached[0] == version - 1:
+            cached[1].add(records)
+            self._merchants = (version, cached[1])
+
+    def version(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT version FROM store_version").fetchone()[0]
+
+    def warm(self) -> None:
+        # Creates the schema and backfills monthly totals on first use, and
+        # pulls the summary tables into the page cache.
+        self.summarize()
+
+    def changes(
+        self, since: int, limit: Optional[int] = None
+    ) -> tuple[int, list[tuple[int, dict]]]:
+        # Rows are never deleted singly, so the rowid is the position in
+        # recorded order, and the rowid index makes this a range scan.
+        cols = ", ".join(TRANSACTION_COLUMNS)
+        with self._connect() as conn, metrics.phase("query"):
+            high = conn.execute("SELECT coalesce(max(rowid), 0) FROM transactions").fetchone()[0]
+            rows = conn.execute(
+                f"SELECT rowid, {cols} FROM transactions WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                (since, limit if limit is not None else -1),
+            )
+            return high, [(row[0], dict(zip(TRANSACTION_COLUMNS, row[1:]))) for row in rows]
+
+    def duplicates(self, records: list[dict], window: int = 0) -> list[bool]:
+        with self._connect() as conn:
+            return self._duplicates(conn, records, window)
+
+    def _duplicates(self, conn: sqlite3.Connection, records: list[dict], window: int) -> list[bool]:
+        keys = [fingerprint(r) for r in records]
+        counts = {}
+        with metrics.phase("query"):
+            for day, cents, merchant in set(keys):
+                rows = conn.execute(
+                    "SELECT day, rows FROM fingerprints"
+                    " WHERE cents = ? AND merchant = ? AND day BETWEEN ? AND ?",
+                    (cents, merchant, day - window, day + window),
+                )
+                for other, count in rows:
+                    counts[(other, cents, merchant)] = count
+        return match(keys, window, lambda k: counts.get(k, 0))
+
+    def suggest_merchants(self, prefix: str, limit: int = 10) -> list[tuple[str, int]]:
+        version = self.version()
+        cached = self._merchants
+        if cached is None or cached[0] != version:
+            with self._connect() as conn, metrics.phase("index"):
+                # Read in one transaction with the version it belongs to.
+                conn.execute("BEGIN")
+                version = conn.execute("SELECT version FROM store_version").fetchone()[0]
+                counts = conn.execute(
+                    "SELECT merchant, COUNT(*) FROM transactions"
+                    " GROUP BY merchant ORDER BY MIN(rowid)"
+                )
+                cached = self._merchants = (version, MerchantIndex.from_counts(counts))
+        with metrics.phase("filter"):
+            return cached[1].suggest(prefix, limit)
+
+    def compact(self) -> None:
+        with self._connect() as conn:
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def query_transactions(
+        self,
+        from_date: Optional[date] = None,
+        to_date: Optional[date] = None,
+        category: Optional[Category] = None,
+        limit: Optional[int] = None,
+        before: Optional[tuple[str, str]] = None,
+    ) -> list[dict]:
+        where, params = _where(from_date, to_date, category, before)
+        sql = where + " ORDER BY date DESC, id DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._connect() as conn, metrics.phase("query"):
+            return self._select(conn, "transactions", sql, params)
+
+    def iter_transactions(
+        self,
+        from_date: Optional[date] = None,
+        to_date: Optional[date] = None,
+        category: Optional[Category] = None,
+    ) -> Iterator[dict]:
+        where, params = _where(from_date, to_date, category)
+        cols = TRANSACTION_COLUMNS
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT {', '.join(cols)} FROM transactions{where} ORDER BY rowid",
+                params,
+            )
+            for row in rows:
+                yield dict(zip(cols, row))
+
+    def summarize(
+        self,
+        from_date: Optional[date] = None,
+        to_date: Optional[date] = None,
+    ) -> Summary:
+        with self._connect() as conn:
+
+            def buckets(first: Optional[str], last: Optional[str]) -> list[Bucket]:
+                rows = conn.execute(
+                    "SELECT month, category, income, expense, expense_rows, rows"
+                    " FROM monthly_totals"
+                    " WHERE month >= coalesce(?, '') AND month <= coalesce(?, '9999-99')",
+                    (first, last),
+                )
+                return [(month, category, values) for month, category, *values in rows]
+
+            def partial(lower: date, upper: date) -> list[Bucket]:
+                rows = conn.execute(RANGE_TOTALS, (lower.isoformat(), upper.isoformat()))
+                return [(month, category, values) for month, category, *values in rows]
+
+            with metrics.phase("aggregate"):
+                return summarize_range(from_date, to_date, buckets, partial)
+
+    def timeseries(
+        self,
+        granularity: Granularity,
+        from_date: Optional[date] = None,
+        to_date: Optional[date] = None,
+        by_category: bool = False,
+    ) -> dict:
+        where, params = _where(from_date, to_date)
+        sql = (
+            f"SELECT {PERIODS[granularity]}, category,"
+            " SUM(MAX(CAST(round(amount * 100) AS INTEGER), 0)),"
+            " SUM(MAX(-CAST(round(amount * 100) AS INTEGER), 0))"
+            f" FROM transactions{where} GROUP BY 1, 2"
+        )
+        with self._connect() as conn, metrics.phase("aggregate"):
+            return timeseries.from_buckets(granularity, conn.execute(sql, params), by_category)
@@ -1,49 +1,683 @@
+"""Persistence for transactions and goals.
+
+The backend is chosen with the ``COMPOUND_STORAGE`` environment variable:
+
+``json`` (default)
+    A snapshot (``data/compound.json``) plus an append-only record log
+    (``data/compound.log``). Appends write one line to the log; once the log
+    grows past ``COMPACT_THRESHOLD_BYTES`` it is folded back into the
+    snapshot. Reads replay the log on top of the snapshot; the parsed result
+    is cached in-process and reused until the files change on disk, along
+    with indexes over it (see ``app.indexes``) that are updated on append.
+    ``data/compound.version`` tracks the store version.
+
+``sqlite``
+    ``data/compound.db``, see ``app.sqlite_store``.
+
+``binary``
+    ``data/compound.bin`` plus ``compound.bin.log``: the JSON layout with a
+    compact binary snapshot, see ``app.binary_store``.
+
+``partitioned``
+    One file per month under ``data/transactions/`` plus
+    ``data/manifest.json``, see ``app.partitioned_store``.
+
+The module-level functions operate on the configured backend.
+"""
+
 import json
+import logging
 import os
 import tempfile
+import time
+from datetime import date
 from pathlib import Path
+from typing import Callable, Iterator, Optional
 
-from app.models import Goal, Transaction
+from app import metrics, timeseries
+from app.aggregates import MonthlyAggregates, summarize_range
+from app.concurrency import FileLock
+from app.dedupe import DuplicateCheck, Fingerprints
+from app.indexes import Indexes, sort_key
+from app.merchants import MerchantIndex
+from app.models import Category, Goal, Granularity, Summary, Transaction
 
 DATA_DIR = Path("data")
 DATA_FILE = DATA_DIR / "compound.json"
 
 EMPTY_DATA = {"transactions": [], "goals": []}
 
+STORAGE_BACKEND = os.environ.get("COMPOUND_STORAGE", "json")
 
-def load_data() -> dict:
-    """Load data from JSON file, creating it if missing."""
-    if not DATA_FILE.exists():
-        DATA_DIR.mkdir(parents=True, exist_ok=True)
-        save_data(EMPTY_DATA)
-        return {"transactions": [], "goals": []}
-    with open(DATA_FILE) as f:
-        return json.load(f)
+logger = logging.getLogger("uvicorn.error")
 
+# Fold the record log into the snapshot once it reaches this size.
+COMPACT_THRESHOLD_BYTES = 1 << 20
 
-def save_data(data: dict) -> None:
-    """Atomically write data to JSON file."""
-    DATA_DIR.mkdir(parents=True, exist_ok=True)
-    fd, tmp_path = tempfile.mkstemp(dir=DATA_DIR, suffix=".tmp")
+Listener = Callable[[list[tuple[str, list[dict]]], int], None]
+
+# Called with the (kind, records) entries of every append made in this
+# process once it is committed, on the thread that made it.
+_listeners: list[Listener] = []
+
+
+class Store:
+    """Interface implemented by every storage backend.
+
+    Records are plain dicts in the JSON shape of ``Transaction`` and ``Goal``.
+    The query methods have generic implementations on top of ``load`` that
+    backends override to push filtering and aggregation down.
+    """
+
+    def exists(self) -> bool:
+        """Whether the store's files are there, checked without creating them."""
+        raise NotImplementedError
+
+    def load(self) -> dict:
+        raise NotImplementedError
+
+    def goals(self) -> list[dict]:
+        """Every goal, in the order recorded, without reading the transactions
+        where the backend keeps them apart."""
+        return self.load()["goals"]
+
+    def save(self, data: dict) -> None:
+        raise NotImplementedError
+
+    def append(self, kind: str, records: list[dict]) -> None:
+        raise NotImplementedError
+
+    def append_many(self, entries: list[tuple[str, list[dict]]]) -> None:
+        """Apply several ``(kind, records)`` appends, as one write if possible."""
+        for kind, records in entries:
+            self.append(kind, records)
+
+    def append_checked(self, records: list[dict], check: DuplicateCheck) -> list[bool]:
+        """Append transactions after checking them for duplicates, as one step
+        under the write lock, so no other writer (in any process) can store
+        one between the check and the append; this version holds the
+        backend's ``lock``. Returns whether each of ``records`` was a
+        duplicate; with ``check.skip`` those are left out."""
+        with self.lock:
+            found = self.duplicates(records, check.window)
+            if check.skip:
+                records = [r for r, duplicate in zip(records, found) if not duplicate]
+            if records:
+                self.append("transactions", records)
+        return found
+
+    def compact(self) -> None:
+        pass
+
+    def warm(self) -> None:
+        """Do the work a cold first request would otherwise pay for."""
+        self.load()
+
+    def cache_stats(self) -> dict:
+        return {"hits": 0, "misses": 0}
+
+    def version(self) -> int:
+        """A number that increases whenever the store's contents change.
+
+        Cheap to read: it never loads the data.
+        """
+        raise NotImplementedError
+
+    def query_transactions(
+        self,
+        from_date: Optional[date] = None,
+        to_date: Optional[date] = None,
+        category: Optional[Category] = None,
+        limit: Optional[int] = None,
+        before: Optional[tuple[str, str]] = None,
+    ) -> list[dict]:
+        """Transactions matching the filters, most recent first.
+
+        ``before`` is a (date, id) key whose date is an ISO date, as
+        ``pagination.decode_cursor`` guarantees; only transactions ordered
+        strictly before it are returned, at most ``limit`` of them.
+        """
+        txns = self.iter_transactions(from_date, to_date, category)
+        if before is not None:
+            txns = (t for t in txns if sort_key(t) < before)
+        return sorted(txns, key=sort_key, reverse=True)[:limit]
+
+    def iter_transactions(
+        self,
+        from_date: Optional[date] = None,
+        to_date: Optional[date] = None,
+        category: Optional[Category] = None,
+    ) -> Iterator[dict]:
+        """Lazily yield matching transactions in the order they were recorded."""
+        lower = from_date.isoformat() if from_date is not None else None
+        upper = to_date.isoformat() if to_date is not None else None
+        for t in self.load()["transactions"]:
+            if lower is not None and t["date"] < lower:
+                continue
+            if upper is not None and t["date"] > upper:
+                continue
+            if category is not None and t["category"] != category.value:
+                continue
+            yield t
+
+    def changes(
+        self, since: int, limit: Optional[int] = None
+    ) -> tuple[int, list[tuple[int, dict]]]:
+        """The high-water sequence number, and up to ``limit`` transactions
+        recorded after sequence number ``since`` as ``(seq, record)`` pairs,
+        oldest first.
+
+        A transaction's sequence number is its position, from 1, in the order
+        transactions were recorded; records are only ever appended, so it
+        never changes. Replacing the whole store with ``save`` starts the
+        sequence again.
+        """
+        records = self.load()["transactions"]
+        end = since + limit if limit is not None else None
+        return len(records), list(enumerate(records[since:end], since + 1))
+
+    def duplicates(self, records: list[dict], window: int = 0) -> list[bool]:
+        """Whether each of ``records`` duplicates a stored transaction, by
+        fingerprint and within ``window`` days (see ``app.dedupe``)."""
+        return Fingerprints(self.load()["transactions"]).match(records, window)
+
+    def suggest_merchants(self, prefix: str, limit: int = 10) -> list[tuple[str, int]]:
+        """Up to ``limit`` ``(merchant, transactions)`` starting with
+        ``prefix``, most frequent first (see ``app.merchants``)."""
+        return MerchantIndex(self.load()["transactions"]).suggest(prefix, limit)
+
+    def summarize(
+        self,
+        from_date: Optional[date] = None,
+        to_date: Optional[date] = None,
+    ) -> Summary:
+        return MonthlyAggregates(self.iter_transactions(from_date, to_date)).summary()
+
+    def timeseries(
+        self,
+        granularity: Granularity,
+        from_date: Optional[date] = None,
+        to_date: Optional[date] = None,
+        by_category: bool = False,
+    ) -> dict:
+        """Totals per period, in the JSON shape of ``Timeseries``."""
+        return timeseries.from_records(
+            self.iter_transactions(from_date, to_date), granularity, by_category
+        )
+
+
+def _file_version(path: Path) -> tuple | None:
     try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+def _unlink(path: Path) -> None:
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def _trim_torn_tail(path: Path) -> None:
+    """Cut a torn final line (a write interrupted by a crash) off a record
+    log, so the next append starts on a line of its own; hold the lock."""
+    try:
+        f = open(path, "rb+")
+    except FileNotFoundError:
+        return
+    with f:
+        end = f.seek(0, os.SEEK_END)
+        pos = end
+        while pos > 0:
+            start = max(0, pos - 65536)
+            f.seek(start)
+            newline = f.read(pos - start).rfind(b"\n")
+            if newline >= 0:
+                pos = start + newline + 1
+                break
+            pos = start
+        if pos < end:
+            f.truncate(pos)
+            f.flush()
+            os.fsync(f.fileno())
+
+
+class JsonStore(Store):
+    """Snapshot file plus append-only record log.
+
+    Every write, and every read that has to go to disk, holds an advisory
+    lock on ``compound.lock`` so several workers can share the files.
+    """
+
+    def __init__(self, data_file: Path):
+        self.data_file = data_file
+        self.data_dir = data_file.parent
+        self.log_file = data_file.with_suffix(".log")
+        # Log being folded into the snapshot by an unfinished compaction.
+        self.pending_log_file = data_file.with_suffix(".log.compacting")
+        self.lock = FileLock(data_file.with_suffix(".lock"))
+        # {"version": n, "stamp": [...]}: the version of the files at stamp.
+        self.version_file = data_file.with_suffix(".version")
+        # (stamp, data): the parsed store, valid while the files match stamp.
+        self._cached: tuple | None = None
+        self._stats = {"hits": 0, "misses": 0}
+        # (data, indexes): indexes over the cached data they were built from.
+        self._indexes: tuple | None = None
+
+    def _stamp(self) -> tuple:
+        """Identify the on-disk state of the store, including other processes' writes."""
+        return (
+            _file_version(self.data_file),
+            _file_version(self.log_file),
+            _file_version(self.pending_log_file),
+        )
+
+    def _cached_data(self) -> dict | None:
+        cached = self._cached
+        if cached is not None and cached[0] == self._stamp():
+            return cached[1]
+        return None
+
+    def cache_stats(self) -> dict:
+        return dict(self._stats)
+
+    def _read_version(self) -> tuple[int, list | None]:
+        try:
+            state = json.loads(self.version_file.read_text())
+            return state["version"], state["stamp"]
+        except (FileNotFoundError, ValueError, KeyError):
+            return 0, None
+
+    def _current_version(self) -> int | None:
+        """The recorded version if it belongs to the files as they are now."""
+        version, stamp = self._read_version()
+        current = [list(v) if v is not None else None for v in self._stamp()]
+        return version if stamp == current else None
+
+    def _write_version(self, version: int) -> int:
+        """Record ``version`` for the files as they are now; hold the lock."""
+        stamp = [list(v) if v is not None else None for v in self._stamp()]
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.data_dir, suffix=".tmp")
         with os.fdopen(fd, "w") as f:
-            json.dump(data, f, indent=2, default=str)
-            f.write("\n")
-        os.replace(tmp_path, DATA_FILE)
-    except BaseException:
-        os.unlink(tmp_path)
-        raise
+            json.dump({"version": version, "stamp": stamp}, f)
+        os.replace(tmp_path, self.version_file)
+        return version
+
+    def _bump_version(self) -> int:
+        # Nanosecond clock rather than a plain counter, so the version still
+        # moves forward if the (unsynced) version file is lost in a crash.
+        version, _ = self._read_version()
+        return self._write_version(max(version + 1, time.time_ns()))
+
+    def version(self) -> int:
+        """Version of the store, bumped by every write.
+
+        The version file records which on-disk state it belongs to, so a
+        change it does not account for (an external edit, or a crash between
+        a write and its bump) is caught here and given a new version.
+        """
+        version = self._current_version()
+        if version is not None:
+            return version
+        with self.lock:
+            self._prepare()
+            version = self._current_version()
+            return version if version is not None else self._bump_version()
+
+    def _replay(self, path: Path, data: dict) -> None:
+        """Apply log records from ``path`` to ``data`` in place.
+
+        Records whose id is already in the store are skipped, which makes
+        replay idempotent if a crash lands between a snapshot write and the
+        log being removed. A torn final line (no trailing newline) is ignored;
+        ``_prepare`` trims it before the log is appended to.
+        """
+        try:
+            with open(path) as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return
+        if not lines:
+            return
+        seen = {
+            kind: {r.get("id") for r in data[kind] if isinstance(r, dict)}
+            for kind in ("transactions", "goals")
+        }
+        for line in lines:
+            if not line.endswith("\n"):
+                break
+            entry = json.loads(line)
+            kind, record = entry["kind"], entry["record"]
+            if record["id"] in seen[kind]:
+                continue
+            seen[kind].add(record["id"])
+            data[kind].append(record)
+
+    def _read_snapshot(self) -> dict:
+        try:
+            with open(self.data_file) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"transactions": [], "goals": []}
+
+    def _write_snapshot(self, data: dict) -> None:
+        """Atomically replace the snapshot file."""
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.data_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(data, f, indent=2, default=str)
+                f.write("\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.data_file)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def _prepare(self) -> None:
+        """Create a missing store, finish an interrupted compaction and trim a
+        torn log tail; hold the lock."""
+        if not self.data_file.exists() and not self.log_file.exists():
+            self.save(EMPTY_DATA)
+        elif self.pending_log_file.exists():
+            self._finish_compaction()
+        _trim_torn_tail(self.log_file)
+
+    def exists(self) -> bool:
+        return self.data_file.exists() or self.log_file.exists()
+
+    def load(self) -> dict:
+        data = self._cached_data()
+        if data is not None:
+            self._stats["hits"] += 1
+            return data
+        self._stats["misses"] += 1
+        with self.lock:
+            self._prepare()
+            stamp = self._stamp()
+            with metrics.phase("load"):
+                data = self._read_snapshot()
+                self._replay(self.log_file, data)
+            self._cached = (stamp, data)
+        return data
+
+    def save(self, data: dict) -> None:
+        with self.lock:
+            self._cached = None
+            self._write_snapshot(data)
+            _unlink(self.log_file)
+            _unlink(self.pending_log_file)
+            self._bump_version()
+
+    def compact(self) -> None:
+        """Fold the record log into the snapshot.
+
+        The live log is first renamed aside so new appends start a fresh file;
+        an interrupted compaction is finished by the next ``load`` call.
+        """
+        with self.lock:
+            if not self.pending_log_file.exists() and not self.log_file.exists():
+                return
+            cached = self._cached_data()
+            version = self._current_version()
+            if not self.pending_log_file.exists():
+                os.replace(self.log_file, self.pending_log_file)
+            self._finish_compaction()
+            # The store's contents are unchanged, so a current cache and
+            # version stay current.
+            if cached is not None:
+                self._cached = (self._stamp(), cached)
+            if version is not None:
+                self._write_version(version)
+
+    def _finish_compaction(self) -> None:
+        data = self._read_snapshot()
+        self._replay(self.pending_log_file, data)
+        self._write_snapshot(data)
+        _unlink(self.pending_log_file)
+
+    def append(self, kind: str, records: list[dict]) -> None:
+        """Durably append records to the log."""
+        self._commit([(kind, records)])
+
+    def append_many(self, entries: list[tuple[str, list[dict]]]) -> None:
+        self._commit(entries)
+
+    def _commit(self, entries: list[tuple[str, list[dict]]]) -> None:
+        """Write a batch of appends, compacting if the log has grown large.
+
+        A cache that was current before the write is updated in place rather
+        than dropped, so reads after a write stay cheap.
+        """
+        lines = "".join(
+            json.dumps({"kind": kind, "record": r}, separators=(",", ":")) + "\n"
+            for kind, records in entries
+            for r in records
+        )
+        with self.lock:
+            if not self.data_file.exists():
+                self._write_snapshot(EMPTY_DATA)
+            cached = self._cached_data()
+            if cached is None:
+                # The log may have changed since this process last wrote it.
+                _trim_torn_tail(self.log_file)
+            with open(self.log_file, "a") as f:
+                f.write(lines)
+                f.flush()
+                os.fsync(f.fileno())
+                size = f.tell()
+            if cached is not None:
+                indexes = self._indexes
+                for kind, records in entries:
+                    cached[kind].extend(records)
+                    if kind == "transactions" and indexes is not None and indexes[0] is cached:
+                        indexes[1].add(records)
+                self._cached = (self._stamp(), cached)
+            else:
+                self._cached = None
+            self._bump_version()
+            if size >= COMPACT_THRESHOLD_BYTES:
+                self.compact()
+
+    def warm(self) -> None:
+        self.indexes()
+
+    def indexes(self) -> Indexes:
+        """Indexes over the current cached records, built on first use."""
+        data = self.load()
+        indexes = self._indexes
+        if indexes is None or indexes[0] is not data:
+            # Built under the write lock so no append can slip in between
+            # copying the records and publishing the indexes.
+            with self.lock:
+                data = self.load()
+                indexes = self._indexes
+                if indexes is None or indexes[0] is not data:
+                    with metrics.phase("index"):
+                        indexes = (data, Indexes(data["transactions"]))
+                    self._indexes = indexes
+        return indexes[1]
+
+    def query_transactions(
+        self,
+        from_date: Optional[date] = None,
+        to_date: Optional[date] = None,
+        category: Optional[Category] = None,
+        limit: Optional[int] = None,
+        before: Optional[tuple[str, str]] = None,
+    ) -> list[dict]:
+        value = category.value if category is not None else None
+        by_date = self.indexes().by_date
+        with metrics.phase("filter"):
+            matches = by_date.range(from_date, to_date, value, before, limit)
+            matches.reverse()
+        return matches
+
+    def duplicates(self, records: list[dict], window: int = 0) -> list[bool]:
+        fingerprints = self.indexes().fingerprints
+        with metrics.phase("filter"):
+            return fingerprints.match(records, window)
+
+    def suggest_merchants(self, prefix: str, limit: int = 10) -> list[tuple[str, int]]:
+        merchants = self.indexes().merchants
+        with metrics.phase("filter"):
+            return merchants.suggest(prefix, limit)
+
+    def summarize(
+        self,
+        from_date: Optional[date] = None,
+        to_date: Optional[date] = None,
+    ) -> Summary:
+        indexes = self.indexes()
+        with metrics.phase("aggregate"):
+            return summarize_range(
+                from_date, to_date, indexes.monthly.buckets, indexes.daily.buckets
+            )
+
+    def timeseries(
+        self,
+        granularity: Granularity,
+        from_date: Optional[date] = None,
+        to_date: Optional[date] = None,
+        by_category: bool = False,
+    ) -> dict:
+        columns = self.indexes().columns.arrays()
+        with metrics.phase("aggregate"):
+            return timeseries.from_columns(
+                *columns, granularity, from_date, to_date, by_category
+            )
+
+
+_stores: dict[tuple, Store] = {}
+
+
+def open_store(backend: str, data_file: Path) -> Store:
+    """Create a backend whose files share the stem of ``data_file``."""
+    if backend == "json":
+        return JsonStore(data_file)
+    if backend == "sqlite":
+        from app.sqlite_store import SqliteStore
+
+        return SqliteStore(data_file.with_suffix(".db"))
+    if backend == "binary":
+        from app.binary_store import BinaryStore
+
+        return BinaryStore(data_file.with_suffix(".bin"))
+    if backend == "partitioned":
+        from app.partitioned_store import PartitionedStore
+
+        return PartitionedStore(data_file.parent)
+    raise ValueError(f"Unknown storage backend: {backend!r}")
+
+
+def get_store() -> Store:
+    """The configured backend for the current ``DATA_FILE``."""
+    key = (STORAGE_BACKEND, DATA_FILE)
+    if key not in _stores:
+        _stores[key] = open_store(STORAGE_BACKEND, DATA_FILE)
+    return _stores[key]
+
+
+def load_data() -> dict:
+    """Load the store, creating it if missing.
+
+    The returned dict may be shared with a cache and must not be mutated.
+    """
+    return get_store().load()
+
+
+def save_data(data: dict) -> None:
+    """Atomically replace the whole store with ``data``."""
+    get_store().save(data)
+
+
+def compact() -> None:
+    """Fold any pending log records into the backend's primary file."""
+    get_store().compact()
+
+
+def cache_stats() -> dict:
+    """Hit and miss counters for the ``load_data`` cache."""
+    return get_store().cache_stats()
+
+
+def store_version() -> int:
+    """Current version of the store; changes whenever its contents do."""
+    return get_store().version()
+
+
+def query_transactions(
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None,
+    category: Optional[Category] = None,
+    limit: Optional[int] = None,
+    before: Optional[tuple[str, str]] = None,
+) -> list[dict]:
+    """Transactions matching the filters, most recent first.
+
+    ``limit`` and ``before`` (a (date, id) key) select one keyset page.
+    """
+    return get_store().query_transactions(from_date, to_date, category, limit, before)
+
+
+def iter_transactions(
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None,
+    category: Optional[Category] = None,
+) -> Iterator[dict]:
+    """Lazily yield matching transactions in the order they were recorded."""
+    return get_store().iter_transactions(from_date, to_date, category)
+
+
+def summarize(
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None,
+) -> Summary:
+    """Summary statistics for transactions in the date range."""
+    return get_store().summarize(from_date, to_date)
+
+
+def add_listener(listener: Listener) -> None:
+    """Have ``listener`` called with the entries of each committed append."""
+    _listeners.append(listener)
+
+
+def remove_listener(listener: Listener) -> None:
+    _listeners.remove(listener)
+
+
+def notify(entries: list[tuple[str, list[dict]]], version: int) -> None:
+    """Tell the listeners about committed ``(kind, records)`` entries and the
+    store version they are included in. The entries are durable by now, so a
+    listener that fails is logged rather than failing the append."""
+    for listener in tuple(_listeners):
+        try:
+            listener(entries, version)
+        except Exception:
+            logger.exception("Storage listener %r failed", listener)
+
+
+def _append(kind: str, records: list[dict]) -> None:
+    store = get_store()
+    store.append(kind, records)
+    notify([(kind, records)], store.version())
 
 
 def append_transaction(tx: Transaction) -> None:
     """Add a transaction to the store."""
-    data = load_data()
-    data["transactions"].append(tx.model_dump(mode="json"))
-    save_data(data)
+    _append("transactions", [tx.model_dump(mode="json")])
+
+
+def append_transactions(txs: list[Transaction]) -> None:
+    """Add several transactions to the store in one write."""
+    _append("transactions", [tx.model_dump(mode="json") for tx in txs])
 
 
 def append_goal(goal: Goal) -> None:
     """Add a goal to the store."""
-    data = load_data()
-    data["goals"].append(goal.model_dump(mode="json"))
-    save_data(data)
+    _append("goals", [goal.model_dump(mode="json")])
@@ -0,0 +1,176 @@
+"""Income, expense and net per day, week, month or year.
+
+A period is labelled by its first day in ISO form, truncated to the
+granularity: ``2025-03-14`` (a day, or the Monday starting a week),
+``2025-03`` or ``2025``. Only periods with at least one transaction are
+returned, oldest first. Results are plain dicts in the JSON shape of
+``Timeseries``.
+"""
+
+from datetime import date, timedelta
+from typing import Iterable, Optional
+
+import numpy as np
+
+from app.aggregates import to_cents
+from app.columnar import CATEGORIES
+from app.models import Granularity
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+_UNITS = {
+    Granularity.day: "D",
+    Granularity.week: "D",
+    Granularity.month: "M",
+    Granularity.year: "Y",
+}
+
+_LABEL_LENGTH = {Granularity.month: 7, Granularity.year: 4}
+
+
+def period_label(day: str, granularity: Granularity) -> str:
+    """The label of the period containing the ISO date ``day``."""
+    if granularity is Granularity.week:
+        d = date.fromisoformat(day)
+        return (d - timedelta(days=d.weekday())).isoformat()
+    return day[: _LABEL_LENGTH.get(granularity, 10)]
+
+
+def _totals(income: int, expense: int) -> dict:
+    return {
+        "income": round(income / 100, 2),
+        "expense": round(expense / 100, 2),
+        "net": round((income - expense) / 100, 2),
+    }
+
+
+def _rounded(cents: np.ndarray) -> list:
+    # Cents are exact in float64 up to 2**53, so rounding in bulk is safe.
+    return np.round(cents / 100, 2).tolist()
+
+
+def from_buckets(
+    granularity: Granularity,
+    buckets: Iterable[tuple[str, str, int, int]],
+    by_category: bool = False,
+) -> dict:
+    """Assemble ``(period, category, income, expense)`` buckets, in cents."""
+    periods: dict[str, list] = {}
+    for period, category, income, expense in buckets:
+        entry = periods.get(period)
+        if entry is None:
+            entry = periods[period] = [0, 0, {}]
+        entry[0] += income
+        entry[1] += expense
+        if by_category:
+            split = entry[2].setdefault(category, [0, 0])
+            split[0] += income
+            split[1] += expense
+    points = []
+    for period in sorted(periods):
+        income, expense, split = periods[period]
+        point = {"period": period, **_totals(income, expense)}
+        if by_category:
+            point["categories"] = {c: _totals(*v) for c, v in sorted(split.items())}
+        points.append(point)
+    return {"granularity": granularity.value, "points": points}
+
+
+def from_records(
+    records: Iterable[dict],
+    granularity: Granularity,
+    by_category: bool = False,
+) -> dict:
+    """Timeseries of ``records``, one at a time; the reference for the
+    vectorised version."""
+    buckets: dict[tuple[str, str], list[int]] = {}
+    for r in records:
+        key = (period_label(r["date"], granularity), r["category"])
+        bucket = buckets.get(key)
+        if bucket is None:
+            bucket = buckets[key] = [0, 0]
+        cents = to_cents(r["amount"])
+        if cents > 0:
+            bucket[0] += cents
+        else:
+            bucket[1] -= cents
+    return from_buckets(
+        granularity, ((p, c, i, e) for (p, c), (i, e) in buckets.items()), by_category
+    )
+
+
+def from_columns(
+    ordinals: np.ndarray,
+    amounts: np.ndarray,
+    categories: np.ndarray,
+    granularity: Granularity,
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None,
+    by_category: bool = False,
+) -> dict:
+    """Vectorised timeseries over day ordinals, amounts in cents and
+    category codes (see ``app.columnar``)."""
+    mask = None
+    if from_date is not None:
+        mask = ordinals >= from_date.toordinal()
+    if to_date is not None:
+        upper = ordinals <= to_date.toordinal()
+        mask = upper if mask is None else mask & upper
+    if mask is not None:
+        ordinals, amounts, categories = ordinals[mask], amounts[mask], categories[mask]
+    if not len(ordinals):
+        return {"granularity": granularity.value, "points": []}
+
+    # Total each day with rows first, bucketed by the day's rank among the
+    # distinct days, so the work follows the rows rather than the calendar
+    # span they cover. Only then group the days into periods.
+    day_ordinals, ranks = np.unique(ordinals.astype(np.int64), return_inverse=True)
+    days = len(day_ordinals)
+    width = len(CATEGORIES) if by_category else 1
+    slots = ranks * width + categories if by_category else ranks
+    income = np.where(amounts > 0, amounts, 0)
+    size = days * width
+    counts = np.bincount(slots, minlength=size).reshape(days, width)
+    incomes = np.bincount(slots, weights=income, minlength=size).reshape(days, width)
+    expenses = np.bincount(slots, weights=income - amounts, minlength=size).reshape(days, width)
+
+    if granularity is Granularity.week:
+        # Ordinal 1 (0001-01-01) is a Monday.
+        day_ordinals -= (day_ordinals - 1) % 7
+    unit = _UNITS[granularity]
+    keys = (day_ordinals - EPOCH_ORDINAL).astype("datetime64[D]").astype(f"datetime64[{unit}]")
+    # Days are in order, so each period is a run of equal keys, and every
+    # period has rows.
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    labels = np.datetime_as_string(keys[starts], unit=unit).tolist()
+    counts = np.add.reduceat(counts, starts)
+    incomes = np.add.reduceat(incomes, starts)
+    expenses = np.add.reduceat(expenses, starts)
+
+    period_income = incomes.sum(axis=1)
+    period_expense = expenses.sum(axis=1)
+    points = [
+        {"period": label, "income": i, "expense": e, "net": n}
+        for label, i, e, n in zip(
+            labels,
+            _rounded(period_income),
+            _rounded(period_expense),
+            _rounded(period_income - period_expense),
+        )
+    ]
+    if by_category:
+        names = [c.value for c in CATEGORIES]
+        rows = zip(
+            points,
+            counts.tolist(),
+            _rounded(incomes),
+            _rounded(expenses),
+            _rounded(incomes - expenses),
+        )
+        for point, row_counts, row_income, row_expense, row_net in rows:
+            point["categories"] = {
+                names[c]: {"income": row_income[c], "expense": row_expense[c], "net": row_net[c]}
+                for c in range(width)
+                if row_counts[c]
+            }
+    return {"granularity": granularity.value, "points": points}
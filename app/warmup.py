@@ -0,0 +1,90 @@
+"""Start-up warm-up, so the first request after a deploy is not a cold one.
+
+On start-up the app loads the configured store and builds its in-memory
+indexes and aggregates (``Store.warm``), then runs the summary, timeseries,
+transaction and goal paths once and encodes their results, so lazily built
+state (NumPy columns, first-use imports, the encoders' own caches) is in
+place. It runs on the reader pool while the app already answers ``/health``;
+``/health/ready`` reports 503 until it has finished. Set
+``COMPOUND_WARMUP=0`` to skip it and report ready at once.
+"""
+
+import logging
+import os
+import time
+from typing import Optional
+
+import orjson
+
+from app import async_storage, storage
+from app.models import GoalRecord, Granularity
+from app.responses import OPTIONS
+
+ENABLED = os.environ.get("COMPOUND_WARMUP", "1") != "0"
+
+logger = logging.getLogger("uvicorn.error")
+
+
+class Readiness:
+    """Progress of this process's warm-up."""
+
+    def __init__(self):
+        self.ready = False
+        self.error: Optional[str] = None
+        # Seconds per warm-up step, plus "total".
+        self.timings: dict[str, float] = {}
+
+    def reset(self) -> None:
+        self.__init__()
+
+
+READINESS = Readiness()
+
+
+def _store() -> None:
+    storage.get_store().warm()
+
+
+def _encoders() -> None:
+    store = storage.get_store()
+    payloads = [
+        store.summarize().model_dump(),
+        store.timeseries(Granularity.month),
+        store.query_transactions(limit=50),
+        [GoalRecord.from_dict(g).with_projection() for g in store.goals()[:50]],
+    ]
+    for payload in payloads:
+        orjson.dumps(payload, option=OPTIONS)
+
+
+def run() -> dict[str, float]:
+    """Warm the configured store and response paths; the seconds each took."""
+    timings = {}
+    start = time.perf_counter()
+    for name, step in (("store", _store), ("encoders", _encoders)):
+        step_start = time.perf_counter()
+        step()
+        timings[name] = time.perf_counter() - step_start
+    timings["total"] = time.perf_counter() - start
+    return timings
+
+
+async def warm_up() -> None:
+    """Run the warm-up off the event loop and mark the process ready."""
+    READINESS.reset()
+    if not ENABLED:
+        READINESS.ready = True
+        return
+    try:
+        READINESS.timings = await async_storage.offload(run)
+    except Exception as exc:
+        # Not ready: the same failure would hit the first requests.
+        READINESS.error = f"{type(exc).__name__}: {exc}"
+        logger.exception("Warm-up failed")
+        return
+    READINESS.ready = True
+    logger.info(
+        "Warm-up finished in %.3fs (%s)",
+        READINESS.timings["total"],
+        ", ".join(f"{k} {v:.3f}s" for k, v in READINESS.timings.items() if k != "total"),
+    )
@@ -0,0 +1,55 @@
+"""Compare two ``benchmarks.suite`` reports.
+
+    python -m benchmarks.compare before.json after.json --threshold 0.2
+
+Prints the median time of every benchmark present in both reports and the
+ratio after/before. Exits with status 1 if any ratio exceeds
+``1 + threshold``.
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+
+def _key(result: dict) -> tuple:
+    return (result["backend"], result["rows"], result["name"])
+
+
+def compare(before: dict, after: dict) -> list[tuple[tuple, float, float]]:
+    """``(key, before_median, after_median)`` for benchmarks in both reports."""
+    old = {_key(r): r["median"] for r in before["results"]}
+    return [
+        (_key(r), old[_key(r)], r["median"])
+        for r in after["results"]
+        if _key(r) in old
+    ]
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("before", type=Path)
+    parser.add_argument("after", type=Path)
+    parser.add_argument("--threshold", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    before = json.loads(args.before.read_text())
+    after = json.loads(args.after.read_text())
+    print(f"before: {before['meta'].get('commit')}  after: {after['meta'].get('commit')}")
+    regressed = False
+    for (backend, rows, name), old, new in compare(before, after):
+        ratio = new / old if old else float("inf")
+        flag = ""
+        if ratio > 1 + args.threshold:
+            flag = "  REGRESSION"
+            regressed = True
+        print(
+            f"{backend:<7}{rows:>10}  {name:<40}"
+            f"{old * 1e3:10.3f} ms {new * 1e3:10.3f} ms {ratio:6.2f}x{flag}"
+        )
+    sys.exit(1 if regressed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Synthetic transaction histories for benchmarks.
+
+Each simulated month has a salary payment, rent and a few bills on fixed
+days. Groceries and discretionary spending are spread over the rest of the
+days. Amounts follow per-category ranges, and merchants are drawn from a
+Zipf-like distribution, so a few merchants dominate as they do in real
+statements. Output is deterministic for a given seed.
+"""
+
+import json
+import random
+import uuid
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Iterator, Optional
+
+# (category, merchants, amount range) for the day-to-day spending mix.
+SPENDING = [
+    ("groceries", ["Whole Foods", "Trader Joe's", "Safeway", "Costco", "Aldi", "Kroger"], (-180.0, -8.0)),
+    ("fun", ["Netflix", "Cinema City", "Steam", "Local Bar", "Concert Hall", "Bookshop"], (-120.0, -5.0)),
+    ("other", ["Amazon", "Pharmacy", "Hardware Store", "Post Office", "Gas Station"], (-250.0, -3.0)),
+]
+SPENDING_WEIGHTS = [0.55, 0.25, 0.20]
+
+# (day of month, category, merchant, amount range) repeated every month.
+MONTHLY = [
+    (1, "rent", "Landlord", (-2200.0, -1800.0)),
+    (5, "bills", "Electric Co", (-140.0, -60.0)),
+    (12, "bills", "Water Utility", (-60.0, -25.0)),
+    (18, "bills", "Internet Provider", (-80.0, -80.0)),
+    (25, "salary", "Employer", (4200.0, 4800.0)),
+]
+
+START = date(2015, 1, 1)
+HISTORY_DAYS = 20 * 365
+
+# Zipf exponent for merchant popularity within a category.
+MERCHANT_SKEW = 1.2
+
+
+def _zipf_weights(n: int) -> list[float]:
+    return [1 / (rank ** MERCHANT_SKEW) for rank in range(1, n + 1)]
+
+
+def _record(rng: random.Random, day: date, category: str, merchant: str, bounds) -> dict:
+    return {
+        "date": day.isoformat(),
+        "amount": round(rng.uniform(*bounds), 2),
+        "merchant": merchant,
+        "category": category,
+        "notes": "receipt" if rng.random() < 0.05 else None,
+        "id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+    }
+
+
+def transactions(n: int, seed: int = 0, per_day: Optional[float] = None) -> Iterator[dict]:
+    """Yield ``n`` transactions in date order, about ``per_day`` a day.
+
+    By default large histories get busier days rather than more years, so
+    they span at most about ``HISTORY_DAYS``.
+    """
+    if per_day is None:
+        per_day = max(6.0, n / HISTORY_DAYS)
+    rng = random.Random(seed)
+    weights = {category: _zipf_weights(len(merchants)) for category, merchants, _ in SPENDING}
+    day = START
+    produced = 0
+    while produced < n:
+        todays = [_record(rng, day, c, m, b) for d, c, m, b in MONTHLY if d == day.day]
+        for _ in range(max(0, round(rng.gauss(per_day, per_day / 3)))):
+            category, merchants, bounds = rng.choices(SPENDING, SPENDING_WEIGHTS)[0]
+            merchant = rng.choices(merchants, weights[category])[0]
+            todays.append(_record(rng, day, category, merchant, bounds))
+        for record in todays[: n - produced]:
+            yield record
+        produced += min(len(todays), n - produced)
+        day += timedelta(days=1)
+
+
+def goals(n: int, seed: int = 0) -> list[dict]:
+    rng = random.Random(seed)
+    return [
+        {
+            "name": f"Goal {i}",
+            "target_amount": float(rng.randrange(1_000, 100_000)),
+            "monthly_contribution": float(rng.randrange(50, 3_000)),
+            "start_date": (START + timedelta(days=rng.randrange(3_650))).isoformat(),
+            "id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+        }
+        for i in range(n)
+    ]
+
+
+def write_snapshot(path: Path, n: int, n_goals: int = 20, seed: int = 0) -> None:
+    """Write a JSON store snapshot without holding every record in memory."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        f.write('{"transactions": [')
+        for i, record in enumerate(transactions(n, seed)):
+            if i:
+                f.write(",")
+            f.write(json.dumps(record))
+        f.write('], "goals": ')
+        f.write(json.dumps(goals(n_goals, seed)))
+        f.write("}\n")
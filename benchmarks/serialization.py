@@ -0,0 +1,117 @@
+"""Per-row cost of serving transactions, goals and summaries.
+
+Compares the pydantic round-trips the handlers used to make ("before") with
+the record-based paths they use now ("after"):
+
+    python -m benchmarks.serialization --rows 10000
+"""
+
+import argparse
+import json
+import random
+import timeit
+from datetime import date, timedelta
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from app.aggregates import MonthlyAggregates
+from app.models import (
+    Category,
+    Goal,
+    GoalRecord,
+    GoalWithProjection,
+    Transaction,
+    compute_projection,
+    compute_summary,
+)
+
+_transactions = TypeAdapter(list[Transaction])
+_goals = TypeAdapter(list[GoalWithProjection])
+
+
+def make_transactions(n: int) -> list[dict]:
+    rng = random.Random(0)
+    start = date(2023, 1, 1)
+    return [
+        Transaction(
+            date=start + timedelta(days=rng.randrange(730)),
+            amount=round(rng.uniform(-500, 500), 2),
+            merchant=f"Merchant {rng.randrange(200)}",
+            category=rng.choice(list(Category)),
+        ).model_dump(mode="json")
+        for _ in range(n)
+    ]
+
+
+def make_goals(n: int) -> list[dict]:
+    rng = random.Random(0)
+    return [
+        Goal(
+            name=f"Goal {i}",
+            target_amount=rng.randrange(1000, 50000),
+            monthly_contribution=rng.randrange(50, 2000),
+            start_date=date(2025, 1, 1) + timedelta(days=rng.randrange(365)),
+        ).model_dump(mode="json")
+        for i in range(n)
+    ]
+
+
+def transactions_before(records: list[dict]) -> bytes:
+    # response_model validation, then jsonable_encoder and json.dumps.
+    validated = _transactions.validate_python(records)
+    return json.dumps(jsonable_encoder(validated)).encode()
+
+
+def transactions_after(records: list[dict]) -> bytes:
+    return orjson.dumps(records)
+
+
+def goals_before(records: list[dict]) -> bytes:
+    goals = [Goal.model_validate(g) for g in records]
+    items = [GoalWithProjection(**g.model_dump(), projection=compute_projection(g)) for g in goals]
+    validated = _goals.validate_python([item.model_dump() for item in items])
+    return json.dumps(jsonable_encoder(validated)).encode()
+
+
+def goals_after(records: list[dict]) -> bytes:
+    return orjson.dumps([GoalRecord.from_dict(g).with_projection() for g in records])
+
+
+def summary_before(records: list[dict]) -> bytes:
+    return json.dumps(compute_summary([Transaction(**t) for t in records]).model_dump()).encode()
+
+
+def summary_after(records: list[dict]) -> bytes:
+    return orjson.dumps(MonthlyAggregates(records).summary().model_dump())
+
+
+CASES = {
+    "transactions": (make_transactions, transactions_before, transactions_after),
+    "goals": (make_goals, goals_before, goals_after),
+    "summary": (make_transactions, summary_before, summary_after),
+}
+
+
+def per_row_us(fn, records: list[dict], repeat: int) -> float:
+    best = min(timeit.repeat(lambda: fn(records), number=1, repeat=repeat))
+    return best / len(records) * 1e6
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    print(f"{'case':<14}{'before us/row':>15}{'after us/row':>15}{'speedup':>10}")
+    for name, (make, before, after) in CASES.items():
+        records = make(args.rows)
+        slow = per_row_us(before, records, args.repeat)
+        fast = per_row_us(after, records, args.repeat)
+        print(f"{name:<14}{slow:>15.2f}{fast:>15.2f}{slow / fast:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+"""Storage and endpoint benchmarks over synthetic data.
+
+Times the storage functions, the pure computations and every HTTP endpoint
+(through the in-process ASGI test client) against generated histories of
+each requested size, and writes the timings as JSON::
+
+    python -m benchmarks.suite --rows 10000 100000 --backend json sqlite \\
+        --output bench.json
+    python -m benchmarks.compare before.json bench.json
+
+Every result records ``n``, the number of items one call handles, so
+per-item costs can be compared across sizes.
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Optional
+
+from fastapi.testclient import TestClient
+
+from app import storage
+from app.cli import BACKENDS, migrate
+from app.main import app
+from app.models import Goal, Transaction, compute_projection, compute_summary
+from benchmarks import datagen
+
+# Endpoints that return every row are skipped above this many rows.
+FULL_SCAN_ROWS = 100_000
+
+# compute_summary takes pydantic models; build at most this many of them.
+MODEL_ROWS = 1_000_000
+
+APPENDS_PER_RUN = 50
+BULK_ROWS = 1_000
+GOALS = 20
+
+
+def _time(
+    fn: Callable[[], object],
+    repeat: int,
+    setup: Optional[Callable[[], None]] = None,
+) -> list[float]:
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+class Suite:
+    def __init__(self, backend: str, rows: int, data_dir: Path, repeat: int):
+        self.backend = backend
+        self.rows = rows
+        self.data_dir = data_dir
+        self.repeat = repeat
+        self.results: list[dict] = []
+        self.client = TestClient(app)
+
+    def record(self, name: str, timings: list[float], n: int = 1) -> None:
+        self.results.append(
+            {
+                "backend": self.backend,
+                "rows": self.rows,
+                "name": name,
+                "n": n,
+                "repeat": len(timings),
+                "min": min(timings),
+                "median": statistics.median(timings),
+                "mean": statistics.fmean(timings),
+                "max": max(timings),
+            }
+        )
+        print(
+            f"  {name:<40} median {statistics.median(timings) * 1e3:10.3f} ms"
+            f"  ({len(timings)} runs)",
+            file=sys.stderr,
+        )
+
+    def bench(
+        self,
+        name: str,
+        fn: Callable[[], object],
+        n: int = 1,
+        repeat: Optional[int] = None,
+        setup: Optional[Callable[[], None]] = None,
+        warm: bool = True,
+    ) -> None:
+        """Time ``fn``, after one untimed call unless ``warm`` is false."""
+        if warm:
+            if setup is not None:
+                setup()
+            fn()
+        self.record(name, _time(fn, repeat or self.repeat, setup), n)
+
+    def seed(self) -> None:
+        data_file = self.data_dir / "compound.json"
+        storage.DATA_DIR = self.data_dir
+        storage.DATA_FILE = data_file
+        storage.STORAGE_BACKEND = self.backend
+        storage._stores.clear()
+        start = time.perf_counter()
+        datagen.write_snapshot(data_file, self.rows, GOALS)
+        if self.backend != "json":
+            migrate("json", self.backend, data_file)
+        self.record("seed", [time.perf_counter() - start], self.rows)
+
+    def get(self, url: str, **kwargs) -> Callable[[], object]:
+        def request():
+            resp = self.client.get(url, **kwargs)
+            assert resp.status_code in (200, 304), (url, resp.status_code)
+
+        return request
+
+    def run(self) -> list[dict]:
+        print(f"{self.backend} with {self.rows} rows", file=sys.stderr)
+        self.seed()
+        heavy = max(1, min(self.repeat, 3))
+
+        # A fresh store object has an empty cache.
+        self.bench(
+            "load_data cold",
+            storage.load_data,
+            self.rows,
+            heavy,
+            setup=storage._stores.clear,
+            warm=False,
+        )
+        self.bench("load_data warm", storage.load_data, self.rows)
+        data = storage.load_data()
+        self.bench("save_data", lambda: storage.save_data(data), self.rows, heavy)
+        del data
+
+        template = next(datagen.transactions(1, seed=1))
+        del template["id"]
+
+        def appends():
+            for _ in range(APPENDS_PER_RUN):
+                storage.append_transaction(Transaction(**template))
+
+        self.bench("append_transaction", appends, APPENDS_PER_RUN)
+
+        records = storage.load_data()["transactions"]
+        models = [Transaction(**r) for r in records[:MODEL_ROWS]]
+        self.bench("compute_summary", lambda: compute_summary(models), len(models), heavy)
+        del models
+        goals = [Goal(**g) for g in datagen.goals(1_000)]
+        self.bench(
+            "compute_projection", lambda: [compute_projection(g) for g in goals], len(goals)
+        )
+        self.bench("summarize", storage.summarize, len(records))
+        first, last = records[0]["date"], records[-1]["date"]
+        del records
+
+        self.bench("GET /health", self.get("/health"))
+        self.bench("GET /", self.get("/", headers={"Accept-Encoding": "gzip"}))
+        self.bench("GET /transactions?limit=50", self.get("/transactions?limit=50"), 50)
+        self.bench("GET /transactions?limit=1000", self.get("/transactions?limit=1000"), 1000)
+        self.bench("GET /transactions?category=rent", self.get("/transactions?category=rent"))
+        month = last[:7]
+        self.bench(
+            "GET /transactions (one month)",
+            self.get(f"/transactions?from={month}-01&to={month}-28"),
+        )
+        if self.rows <= FULL_SCAN_ROWS:
+            self.bench("GET /transactions (all)", self.get("/transactions"), self.rows)
+            self.bench("GET /transactions/export", self.get("/transactions/export"), self.rows)
+        self.bench("GET /summary", self.get("/summary"), self.rows)
+        self.bench(
+            "GET /summary (partial months)",
+            self.get(f"/summary?from={first[:7]}-15&to={month}-10"),
+            self.rows,
+        )
+        self.bench(
+            "GET /summary/timeseries (daily)",
+            self.get("/summary/timeseries?granularity=day&by_category=true"),
+            self.rows,
+        )
+        etag = self.client.get("/summary").headers["etag"]
+        self.bench("GET /summary (304)", self.get("/summary", headers={"If-None-Match": etag}))
+        self.bench("GET /goals", self.get("/goals"), GOALS)
+
+        body = {"date": last, "amount": -12.5, "merchant": "Bench", "category": "fun"}
+        self.bench("POST /transactions", lambda: self.client.post("/transactions", json=body))
+        ndjson = "".join(
+            json.dumps({k: v for k, v in r.items() if k != "id"}) + "\n"
+            for r in datagen.transactions(BULK_ROWS, seed=2)
+        )
+        self.bench(
+            "POST /transactions/bulk",
+            lambda: self.client.post(
+                "/transactions/bulk",
+                content=ndjson,
+                headers={"Content-Type": "application/x-ndjson"},
+            ),
+            BULK_ROWS,
+            heavy,
+        )
+        return self.results
+
+
+def _commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000])
+    parser.add_argument("--backend", nargs="+", choices=BACKENDS, default=["json"])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", type=Path, help="Write JSON here instead of stdout")
+    args = parser.parse_args(argv)
+
+    report = {
+        "meta": {
+            "commit": _commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+        },
+        "results": [],
+    }
+    for backend in args.backend:
+        for rows in args.rows:
+            with tempfile.TemporaryDirectory(prefix="compound-bench-") as tmp:
+                suite = Suite(backend, rows, Path(tmp) / "data", args.repeat)
+                report["results"].extend(suite.run())
+
+    output = json.dumps(report, indent=2)
+    if args.output is None:
+        print(output)
+    else:
+        args.output.write_text(output + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+import pytest
+
+from app import storage
+
+BACKENDS = ["json", "sqlite", "partitioned", "binary"]
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """An empty data directory in place of ``data/``."""
+    data_dir = tmp_path / "data"
+    monkeypatch.setattr(storage, "DATA_DIR", data_dir)
+    monkeypatch.setattr(storage, "DATA_FILE", data_dir / "compound.json")
+    return data_dir
+
+
+@pytest.fixture(params=BACKENDS)
+def backend(request, data_dir, monkeypatch):
+    """Each storage backend in turn, over an empty ``data_dir``; parametrize
+    it indirectly to pick some."""
+    monkeypatch.setattr(storage, "STORAGE_BACKEND", request.param)
+    return request.param
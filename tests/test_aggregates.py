@@ -0,0 +1,247 @@
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from app import aggregates
+from app.aggregates import (
+    DailyTotals,
+    FenwickTree,
+    MonthlyAggregates,
+    split_range,
+    summarize_range,
+)
+from app.indexes import DateIndex
+from app.models import Category, Transaction, compute_summary
+
+
+def _records(n: int, seed: int = 0) -> list[dict]:
+    rng = random.Random(seed)
+    start = date(2024, 1, 1)
+    return [
+        Transaction(
+            date=start + timedelta(days=rng.randrange(400)),
+            amount=round(rng.uniform(-500, 500), 2),
+            merchant=f"Merchant {rng.randrange(20)}",
+            category=rng.choice(list(Category)),
+        ).model_dump(mode="json")
+        for _ in range(n)
+    ]
+
+
+def _expected(records, from_date=None, to_date=None):
+    return compute_summary(
+        [
+            Transaction(**r)
+            for r in records
+            if (from_date is None or r["date"] >= from_date.isoformat())
+            and (to_date is None or r["date"] <= to_date.isoformat())
+        ]
+    )
+
+
+def _assert_close(actual, expected):
+    assert actual.total_income == pytest.approx(expected.total_income)
+    assert actual.total_expense == pytest.approx(expected.total_expense)
+    assert actual.net == pytest.approx(expected.net)
+    assert actual.spend_by_category == pytest.approx(expected.spend_by_category)
+    assert actual.monthly_net == pytest.approx(expected.monthly_net)
+
+
+RANGES = [
+    (None, None),
+    (date(2024, 3, 1), date(2024, 5, 31)),
+    (date(2024, 3, 15), None),
+    (None, date(2024, 6, 10)),
+    (date(2024, 2, 10), date(2024, 2, 20)),
+    (date(2024, 2, 10), date(2024, 3, 5)),
+    (date(2024, 1, 31), date(2024, 12, 1)),
+    (date(2026, 1, 1), None),
+]
+
+
+class TestSplitRange:
+    def test_unbounded(self):
+        assert split_range(None, None) == ([], (None, None))
+
+    def test_month_aligned(self):
+        assert split_range(date(2024, 3, 1), date(2024, 5, 31)) == ([], ("2024-03", "2024-05"))
+
+    def test_partial_ends(self):
+        edges, months = split_range(date(2024, 1, 15), date(2024, 4, 10))
+        assert edges == [
+            (date(2024, 1, 15), date(2024, 1, 31)),
+            (date(2024, 4, 1), date(2024, 4, 10)),
+        ]
+        assert months == ("2024-02", "2024-03")
+
+    def test_within_one_month(self):
+        assert split_range(date(2024, 2, 10), date(2024, 2, 20)) == (
+            [(date(2024, 2, 10), date(2024, 2, 20))],
+            None,
+        )
+
+    def test_adjacent_partial_months(self):
+        edges, months = split_range(date(2024, 2, 10), date(2024, 3, 5))
+        assert len(edges) == 2
+        assert months is None
+
+    def test_leap_day_ends_month(self):
+        assert split_range(None, date(2024, 2, 29)) == ([], (None, "2024-02"))
+
+    def test_empty_range(self):
+        assert split_range(date(2024, 3, 1), date(2024, 2, 1)) == ([], None)
+
+
+class TestMonthlyAggregates:
+    def test_empty(self):
+        assert MonthlyAggregates().summary() == compute_summary([])
+
+    def test_summary_matches_compute_summary(self):
+        records = _records(500)
+        _assert_close(MonthlyAggregates(records).summary(), _expected(records))
+
+    def test_add_matches_build(self):
+        records = _records(500, seed=1)
+        aggregates = MonthlyAggregates(records[:200])
+        aggregates.add(records[200:])
+        assert aggregates.buckets() == MonthlyAggregates(records).buckets()
+
+    def test_buckets_by_month(self):
+        records = _records(500, seed=2)
+        buckets = MonthlyAggregates(records).buckets("2024-03", "2024-04")
+        assert {month for month, _, _ in buckets} == {"2024-03", "2024-04"}
+        assert sum(b[3] for _, _, b in buckets) == sum(
+            r["date"][:7] in ("2024-03", "2024-04") for r in records
+        )
+
+    @pytest.mark.parametrize("from_date, to_date", RANGES)
+    def test_summarize_range(self, from_date, to_date):
+        records = _records(500, seed=3)
+        aggregates = MonthlyAggregates(records)
+        index = DateIndex(records)
+
+        def partial(lower, upper):
+            return MonthlyAggregates(index.range(lower, upper)).buckets()
+
+        _assert_close(
+            summarize_range(from_date, to_date, aggregates.buckets, partial),
+            _expected(records, from_date, to_date),
+        )
+
+    def test_partial_months_read_only_edges(self):
+        records = _records(500, seed=4)
+        aggregates = MonthlyAggregates(records)
+        index = DateIndex(records)
+        read = []
+
+        def edge_buckets(lower, upper):
+            read.append((lower, upper))
+            return MonthlyAggregates(index.range(lower, upper)).buckets()
+
+        summarize_range(date(2024, 1, 20), date(2024, 9, 10), aggregates.buckets, edge_buckets)
+        assert read == [
+            (date(2024, 1, 20), date(2024, 1, 31)),
+            (date(2024, 9, 1), date(2024, 9, 10)),
+        ]
+
+
+class TestFenwickTree:
+    def test_prefix_and_range_sums(self):
+        rng = random.Random(5)
+        points = [[rng.randrange(-50, 50) for _ in range(37)] for _ in range(2)]
+        tree = FenwickTree.from_points(points)
+        for start in range(38):
+            for end in range(start, 38):
+                assert tree.range(start, end) == [sum(col[start:end]) for col in points]
+
+    def test_add_matches_build(self):
+        rng = random.Random(6)
+        points = [[0] * 20]
+        tree = FenwickTree(20, 1)
+        for _ in range(100):
+            slot, amount = rng.randrange(20), rng.randrange(-9, 10)
+            points[0][slot] += amount
+            tree.add(slot, [amount])
+        assert tree.points() == points
+        assert tree.prefix(20) == [sum(points[0])]
+
+
+class TestDailyTotals:
+    @pytest.mark.parametrize("from_date, to_date", RANGES)
+    def test_summarize_range_matches_compute_summary(self, from_date, to_date):
+        records = _records(500, seed=7)
+        daily = DailyTotals(records)
+        _assert_close(
+            summarize_range(
+                from_date, to_date, MonthlyAggregates(records).buckets, daily.buckets
+            ),
+            _expected(records, from_date, to_date),
+        )
+
+    def test_any_day_range(self):
+        records = _records(300, seed=8)
+        daily = DailyTotals(records)
+        rng = random.Random(9)
+        for _ in range(50):
+            lower = date(2024, 1, 1) + timedelta(days=rng.randrange(400))
+            upper = lower + timedelta(days=rng.randrange(60))
+            expected = _expected(records, lower, upper)
+            totals = daily.totals(lower, upper)
+            assert sum(v[0] for v in totals.values()) / 100 == pytest.approx(
+                expected.total_income
+            )
+            assert sum(v[1] for v in totals.values()) / 100 == pytest.approx(
+                expected.total_expense
+            )
+            spend = {c: v[1] / 100 for c, v in totals.items() if v[2]}
+            assert spend == pytest.approx(expected.spend_by_category)
+
+    def test_add_matches_build_and_grows(self):
+        records = _records(300, seed=10)
+        daily = DailyTotals(records[:100])
+        # Later, earlier and in-range days, one record at a time and in bulk.
+        extra = [
+            {**records[0], "id": "late", "date": "2031-06-30"},
+            {**records[1], "id": "early", "date": "2019-02-03"},
+        ]
+        for r in records[100:200] + extra:
+            daily.add([r])
+        daily.add(records[200:])
+        rebuilt = DailyTotals(records + extra)
+        lower, upper = date(2019, 1, 1), date(2031, 12, 31)
+        assert daily.totals(lower, upper) == rebuilt.totals(lower, upper)
+        assert list(daily.totals(date(2031, 6, 30), date(2031, 6, 30))) == [extra[0]["category"]]
+
+    def test_sized_by_days_with_records(self):
+        daily = DailyTotals()
+        far = [{**r, "date": d} for r, d in zip(_records(2), ["0001-01-01", "9999-12-31"])]
+        for r in far:
+            daily.add([r])
+        assert daily._size <= 4
+        assert daily.totals(date(1, 1, 1), date(9999, 12, 31)) == DailyTotals(far).totals(
+            date(1, 1, 1), date(9999, 12, 31)
+        )
+        assert list(daily.totals(date(9999, 12, 31), date(9999, 12, 31))) == [far[1]["category"]]
+
+    def test_earlier_days_kept_aside_until_rebuild(self, monkeypatch):
+        monkeypatch.setattr(aggregates, "MAX_EXTRA_DAYS", 2)
+        records = _records(50, seed=12)
+        daily = DailyTotals(records)
+        trees = daily._trees
+        early = [{**r, "date": d} for r, d in zip(records, ["2020-01-01", "2020-01-02"])]
+        daily.add(early[:1])
+        daily.add(early[1:])
+        assert daily._trees is trees and len(daily._extra_days) == 2
+        lower, upper = date(2019, 1, 1), date(2026, 1, 1)
+        assert daily.totals(lower, upper) == DailyTotals(records + early).totals(lower, upper)
+        later = {**records[2], "date": "2020-01-03"}
+        daily.add([later])
+        assert daily._trees is not trees and not daily._extra_days
+        expected = DailyTotals(records + early + [later]).totals(lower, upper)
+        assert daily.totals(lower, upper) == expected
+
+    def test_outside_covered_days(self):
+        daily = DailyTotals(_records(50, seed=11))
+        assert daily.totals(date(2000, 1, 1), date(2000, 12, 31)) == {}
+        assert DailyTotals().totals(date(2024, 1, 1), date(2024, 1, 31)) == {}
@@ -0,0 +1,144 @@
+import asyncio
+import threading
+from concurrent.futures import wait
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import async_storage, responses, storage
+from app.concurrency import SingleWriter
+from app.main import app
+
+client = TestClient(app)
+
+TX = {"date": "2025-01-10", "amount": -50.0, "merchant": "Whole Foods", "category": "groceries"}
+
+
+@pytest.fixture(autouse=True)
+def isolated_data_dir(tmp_path, monkeypatch):
+    data_dir = tmp_path / "data"
+    data_file = data_dir / "compound.json"
+    monkeypatch.setattr(storage, "DATA_DIR", data_dir)
+    monkeypatch.setattr(storage, "DATA_FILE", data_file)
+    return data_dir
+
+
+class TestSingleWriter:
+    def test_commits_in_order_on_one_thread(self):
+        seen = []
+
+        def commit(entries):
+            seen.extend((e, threading.current_thread().name) for e in entries)
+
+        writer = SingleWriter(commit, "test-writer")
+        wait([writer.submit(i) for i in range(50)])
+        assert [e for e, _ in seen] == list(range(50))
+        assert {name for _, name in seen} == {"test-writer"}
+
+    def test_batches_entries_queued_during_a_commit(self):
+        started, release = threading.Event(), threading.Event()
+        batches = []
+
+        def commit(entries):
+            batches.append(entries)
+            started.set()
+            release.wait()
+
+        writer = SingleWriter(commit, "test-writer")
+        first = writer.submit("a")
+        started.wait()
+        rest = [writer.submit(e) for e in "bcd"]
+        release.set()
+        wait([first, *rest])
+        assert batches == [["a"], ["b", "c", "d"]]
+
+    def test_errors_reach_every_submitter_in_the_batch(self):
+        def commit(entries):
+            if "bad" in entries:
+                raise RuntimeError("disk full")
+
+        writer = SingleWriter(commit, "test-writer")
+        with pytest.raises(RuntimeError, match="disk full"):
+            writer.submit("bad").result()
+        assert writer.submit("good").result() is None
+
+    def test_each_submitter_gets_its_result(self):
+        writer = SingleWriter(lambda entries: [e * 2 for e in entries], "test-writer")
+        futures = [writer.submit(i) for i in range(10)]
+        assert [f.result() for f in futures] == [i * 2 for i in range(10)]
+
+
+class TestThreads:
+    def _record_thread(self, monkeypatch, name):
+        store = storage.get_store()
+        original = getattr(store, name)
+        threads = []
+
+        def wrapper(*args):
+            threads.append(threading.current_thread().name)
+            return original(*args)
+
+        monkeypatch.setattr(store, name, wrapper)
+        return threads
+
+    def test_writes_go_through_the_writer(self, monkeypatch):
+        threads = self._record_thread(monkeypatch, "append_many")
+        client.post("/transactions", json=TX)
+        client.post("/goals", json={
+            "name": "Fund",
+            "target_amount": 1000.0,
+            "monthly_contribution": 100.0,
+            "start_date": "2025-01-01",
+        })
+        assert threads == ["compound-writer", "compound-writer"]
+
+    def test_reads_run_on_reader_pool(self, monkeypatch):
+        threads = self._record_thread(monkeypatch, "summarize")
+        client.get("/summary")
+        assert threads and threads[0].startswith("compound-read")
+
+    def test_health_not_starved_by_slow_reads(self):
+        release = threading.Event()
+        blocked = [
+            async_storage._readers.submit(release.wait)
+            for _ in range(async_storage.READ_WORKERS)
+        ]
+        try:
+            assert client.get("/health").json() == {"status": "ok"}
+        finally:
+            release.set()
+            wait(blocked)
+
+
+class TestIterate:
+    def test_closes_iterator_when_stopped_early(self):
+        closed = threading.Event()
+
+        def rows():
+            try:
+                yield from range(10)
+            finally:
+                closed.set()
+
+        async def first_two():
+            items = []
+            stream = async_storage.iterate(rows())
+            async for item in stream:
+                items.append(item)
+                if len(items) == 2:
+                    break
+            await stream.aclose()
+            return items
+
+        assert asyncio.run(first_two()) == [0, 1]
+        assert closed.is_set()
+
+
+def test_long_lists_encoded_off_loop(monkeypatch):
+    monkeypatch.setattr(responses, "OFFLOAD_ITEMS", 1)
+    client.post("/transactions", json=TX)
+    client.post("/transactions", json={**TX, "date": "2025-01-11"})
+    resp = client.get("/transactions")
+    assert resp.headers["content-type"] == "application/json"
+    assert [t["date"] for t in resp.json()] == ["2025-01-11", "2025-01-10"]
+    assert "etag" in resp.headers
@@ -0,0 +1,62 @@
+import json
+
+import pytest
+
+from app import storage
+from benchmarks import compare, datagen, suite
+
+
+class TestDatagen:
+    def test_count_order_and_determinism(self):
+        records = list(datagen.transactions(2_000, seed=3))
+        assert len(records) == 2_000
+        assert [r["date"] for r in records] == sorted(r["date"] for r in records)
+        assert records == list(datagen.transactions(2_000, seed=3))
+        assert len({r["id"] for r in records}) == 2_000
+
+    def test_realistic_mix(self):
+        records = list(datagen.transactions(5_000))
+        salaries = [r for r in records if r["category"] == "salary"]
+        assert salaries and all(r["amount"] > 0 and r["date"].endswith("-25") for r in salaries)
+        groceries = [r["merchant"] for r in records if r["category"] == "groceries"]
+        # Zipf-like: the most popular merchant clearly leads.
+        assert groceries.count("Whole Foods") > 2 * groceries.count("Aldi")
+
+    def test_large_histories_stay_within_bounds(self):
+        last = None
+        for last in datagen.transactions(200_000):
+            pass
+        assert last["date"] < "2036-01-01"
+
+    def test_snapshot_loads(self, tmp_path):
+        path = tmp_path / "compound.json"
+        datagen.write_snapshot(path, 100, n_goals=3)
+        data = json.loads(path.read_text())
+        assert len(data["transactions"]) == 100
+        assert len(data["goals"]) == 3
+
+
+@pytest.mark.parametrize("backend", ["json", "sqlite"])
+def test_suite_smoke(tmp_path, monkeypatch, backend):
+    for name in ("DATA_DIR", "DATA_FILE", "STORAGE_BACKEND"):
+        monkeypatch.setattr(storage, name, getattr(storage, name))
+    monkeypatch.setattr(suite, "BULK_ROWS", 10)
+    results = suite.Suite(backend, 200, tmp_path / "data", repeat=1).run()
+    names = {r["name"] for r in results}
+    assert {"load_data cold", "save_data", "append_transaction", "compute_summary",
+            "compute_projection", "GET /summary", "POST /transactions/bulk"} <= names
+    assert all(r["median"] >= 0 and r["backend"] == backend for r in results)
+
+
+def test_compare_flags_regressions(tmp_path):
+    def report(median):
+        return {"meta": {}, "results": [
+            {"backend": "json", "rows": 10, "name": "x", "median": median},
+        ]}
+
+    assert compare.compare(report(1.0), report(1.5)) == [(("json", 10, "x"), 1.0, 1.5)]
+    (tmp_path / "a.json").write_text(json.dumps(report(1.0)))
+    (tmp_path / "b.json").write_text(json.dumps(report(1.5)))
+    with pytest.raises(SystemExit) as exc:
+        compare.main([str(tmp_path / "a.json"), str(tmp_path / "b.json")])
+    assert exc.value.code == 1
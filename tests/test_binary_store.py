@@ -0,0 +1,171 @@
+import json
+from datetime import date
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import binary_store, cli, storage
+from app.main import app
+from app.models import Category, Goal, Transaction, compute_summary
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def isolated_data_dir(tmp_path, monkeypatch):
+    data_dir = tmp_path / "data"
+    data_file = data_dir / "compound.json"
+    monkeypatch.setattr(storage, "DATA_DIR", data_dir)
+    monkeypatch.setattr(storage, "DATA_FILE", data_file)
+    monkeypatch.setattr(storage, "STORAGE_BACKEND", "binary")
+    return data_dir
+
+
+TXNS = [
+    Transaction(
+        date=date(2025, 1, 10),
+        amount=-50.0,
+        merchant="Whole Foods",
+        category=Category.groceries,
+    ),
+    Transaction(
+        date=date(2025, 1, 20),
+        amount=-1200.0,
+        merchant="Landlord",
+        category=Category.rent,
+        notes="Ünïcode ✓",
+    ),
+    Transaction(
+        date=date(2025, 2, 5),
+        amount=3000.0,
+        merchant="Employer",
+        category=Category.salary,
+        notes="",
+    ),
+    Transaction(
+        date=date(1999, 12, 31),
+        amount=-0.01,
+        merchant="Whole Foods",
+        category=Category.other,
+    ),
+]
+
+GOAL = Goal(
+    name="Emergency Fund",
+    target_amount=10000.0,
+    monthly_contribution=500.0,
+    start_date=date(2025, 1, 1),
+)
+
+
+def _data() -> dict:
+    return {
+        "transactions": [t.model_dump(mode="json") for t in TXNS],
+        "goals": [GOAL.model_dump(mode="json")],
+    }
+
+
+class TestFormat:
+    def test_round_trip(self):
+        data = _data()
+        assert binary_store.decode(binary_store.encode(data)) == data
+
+    def test_empty(self):
+        empty = {"transactions": [], "goals": []}
+        assert binary_store.decode(binary_store.encode(empty)) == empty
+
+    def test_strings_stored_once(self):
+        payload = binary_store.encode(_data())
+        assert payload.count(b"Whole Foods") == 1
+
+    def test_smaller_than_json(self):
+        data = _data()
+        data["transactions"] *= 100
+        assert len(binary_store.encode(data)) < len(json.dumps(data, indent=2)) / 4
+
+    def test_rejects_non_uuid_ids(self):
+        data = _data()
+        data["transactions"][0]["id"] = "not-a-uuid"
+        with pytest.raises(ValueError, match="UUID"):
+            binary_store.encode(data)
+
+    def test_rejects_other_files(self):
+        with pytest.raises(ValueError, match="binary snapshot"):
+            binary_store.decode(b'{"transactions": []}')
+
+
+class TestBinaryStore:
+    def test_selected_by_configuration(self, isolated_data_dir):
+        storage.save_data(_data())
+        assert (isolated_data_dir / "compound.bin").exists()
+        assert not (isolated_data_dir / "compound.json").exists()
+
+    def test_appends_and_compaction(self, isolated_data_dir):
+        for tx in TXNS:
+            storage.append_transaction(tx)
+        storage.append_goal(GOAL)
+        assert (isolated_data_dir / "compound.bin.log").exists()
+        assert storage.load_data() == _data()
+
+        storage.get_store().compact()
+        storage._stores.clear()
+        assert storage.load_data() == _data()
+        assert (isolated_data_dir / "compound.bin").exists()
+
+    def test_summary_matches_compute_summary(self):
+        storage.save_data(_data())
+        assert storage.summarize() == compute_summary(TXNS)
+
+    def test_shares_directory_with_json_store(self):
+        json_store = storage.open_store("json", storage.DATA_FILE)
+        json_store.append("transactions", [TXNS[0].model_dump(mode="json")])
+        storage.append_transaction(TXNS[1])
+        assert [t["merchant"] for t in json_store.load()["transactions"]] == ["Whole Foods"]
+        assert [t["merchant"] for t in storage.load_data()["transactions"]] == ["Landlord"]
+
+    def test_endpoints(self):
+        resp = client.post(
+            "/transactions",
+            json={"date": "2025-03-01", "amount": -9.5, "merchant": "Cafe", "category": "fun"},
+        )
+        assert resp.status_code == 201
+        assert client.get("/transactions").json()[0]["merchant"] == "Cafe"
+
+
+class TestCli:
+    def test_migrate_json_to_binary_and_back(self, isolated_data_dir):
+        storage.open_store("json", storage.DATA_FILE).save(_data())
+        cli.main(["migrate", "--to", "binary", "--data-file", str(storage.DATA_FILE)])
+        assert storage.load_data() == _data()
+
+        storage.open_store("json", storage.DATA_FILE).save({"transactions": [], "goals": []})
+        cli.main([
+            "migrate", "--from", "binary", "--to", "json",
+            "--data-file", str(storage.DATA_FILE),
+        ])
+        assert json.loads((isolated_data_dir / "compound.json").read_text()) == _data()
+
+    def test_convert_both_ways(self, tmp_path, capsys):
+        source = tmp_path / "in.json"
+        source.write_text(json.dumps(_data()))
+        cli.main(["convert", str(source), str(tmp_path / "out.bin")])
+        assert "Converted 4 transactions and 1 goals" in capsys.readouterr().out
+        assert binary_store.read_snapshot(tmp_path / "out.bin") == _data()
+
+        cli.main(["convert", str(tmp_path / "out.bin"), str(tmp_path / "back.json")])
+        assert json.loads((tmp_path / "back.json").read_text()) == _data()
+
+    def test_convert_refuses_missing_source(self, tmp_path):
+        target = tmp_path / "out.bin"
+        binary_store.write_snapshot(target, _data())
+        with pytest.raises(SystemExit) as exc:
+            cli.main(["convert", str(tmp_path / "typo.json"), str(target)])
+        assert exc.value.code != 0
+        assert binary_store.read_snapshot(target) == _data()
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["out.bin"]
+
+    def test_convert_includes_logged_records(self, tmp_path):
+        storage.append_transaction(TXNS[0])
+        cli.main(["convert", str(storage.DATA_DIR / "compound.bin"), str(tmp_path / "out.json")])
+        raw = json.loads((tmp_path / "out.json").read_text())
+        assert raw["transactions"] == [TXNS[0].model_dump(mode="json")]
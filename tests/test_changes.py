@@ -0,0 +1,121 @@
+import json
+from datetime import date
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import storage
+from app.main import app
+from app.models import Category, Transaction
+
+client = TestClient(app)
+
+
+def _tx(day: str, merchant: str) -> Transaction:
+    return Transaction(
+        date=date.fromisoformat(day), amount=-1.0, merchant=merchant, category=Category.fun
+    )
+
+
+def _changes(**params) -> dict:
+    resp = client.get("/transactions/changes", params=params)
+    assert resp.status_code == 200
+    return resp.json()
+
+
+def _merchants(body: dict) -> list[str]:
+    return [c["merchant"] for c in body["changes"]]
+
+
+class TestChanges:
+    def test_empty(self, backend):
+        assert _changes() == {"changes": [], "seq": 0, "more": False, "reset": False}
+
+    def test_since(self, backend):
+        for day, merchant in [("2025-01-10", "a"), ("2025-02-10", "b"), ("2025-01-20", "c")]:
+            storage.append_transaction(_tx(day, merchant))
+
+        body = _changes()
+        assert _merchants(body) == ["a", "b", "c"]
+        assert [c["seq"] for c in body["changes"]] == [1, 2, 3]
+        assert body["seq"] == 3 and not body["more"]
+
+        assert _merchants(_changes(since=2)) == ["c"]
+        assert _changes(since=3) == {"changes": [], "seq": 3, "more": False, "reset": False}
+
+    def test_pages(self, backend):
+        storage.append_transactions([_tx("2025-01-10", m) for m in "abcde"])
+        first = _changes(limit=2)
+        assert _merchants(first) == ["a", "b"]
+        assert first["seq"] == 2 and first["more"]
+        last = _changes(since=4, limit=2)
+        assert _merchants(last) == ["e"]
+        assert last["seq"] == 5 and not last["more"]
+
+    def test_reset_after_store_replaced(self, backend):
+        storage.append_transactions([_tx("2025-01-10", m) for m in "abc"])
+        storage.save_data({"transactions": [_tx("2025-01-10", "z").model_dump(mode="json")]})
+        body = _changes(since=3)
+        assert body["reset"]
+        assert _merchants(body) == ["z"]
+        assert body["seq"] == 1
+
+    def test_numbers_survive_reopening(self, backend):
+        storage.append_transaction(_tx("2025-03-10", "a"))
+        storage.append_transaction(_tx("2025-01-10", "b"))
+        storage.get_store().compact()
+        storage._stores.clear()
+        storage.append_transaction(_tx("2025-03-11", "c"))
+        body = _changes(since=1)
+        assert [(c["seq"], c["merchant"]) for c in body["changes"]] == [(2, "b"), (3, "c")]
+
+    def test_not_modified(self, backend):
+        storage.append_transaction(_tx("2025-01-10", "a"))
+        etag = client.get("/transactions/changes?since=1").headers["etag"]
+        resp = client.get("/transactions/changes?since=1", headers={"If-None-Match": etag})
+        assert resp.status_code == 304
+
+    def test_rejects_negative_since(self, backend):
+        assert client.get("/transactions/changes?since=-1").status_code == 422
+
+
+@pytest.mark.parametrize("backend", ["partitioned"], indirect=True)
+class TestPartitionedRuns:
+    def test_runs_grow_while_appends_stay_in_one_month(self, backend):
+        for merchant in "abc":
+            storage.append_transaction(_tx("2025-01-10", merchant))
+        storage.append_transaction(_tx("2024-12-10", "d"))
+        storage.append_transaction(_tx("2025-01-11", "e"))
+        partitions = storage.get_store().manifest()["partitions"]
+        assert partitions["2025-01"]["runs"] == [[1, 0, 3], [5, 3, 1]]
+        assert partitions["2024-12"]["runs"] == [[4, 0, 1]]
+
+    def test_reads_only_partitions_with_changes(self, backend, monkeypatch):
+        storage.append_transactions([_tx("2024-11-10", "old"), _tx("2024-12-10", "old")])
+        storage.append_transaction(_tx("2025-01-10", "new"))
+        store = storage.get_store()
+        read = store._read
+        names = []
+
+        def recording_read(path, size):
+            names.append(path.name)
+            return read(path, size)
+
+        monkeypatch.setattr(store, "_read", recording_read)
+        assert _merchants(_changes(since=2)) == ["new"]
+        assert [n.split(".")[0] for n in names] == ["2025-01"]
+
+    def test_manifest_without_sequence_numbers(self, backend, data_dir):
+        storage.append_transactions([_tx("2025-02-10", "b"), _tx("2025-01-10", "a")])
+        manifest_file = data_dir / "manifest.json"
+        manifest = json.loads(manifest_file.read_text())
+        del manifest["seq"]
+        for entry in manifest["partitions"].values():
+            del entry["runs"]
+        manifest_file.write_text(json.dumps(manifest))
+        storage._stores.clear()
+
+        # Numbered in partition order.
+        assert _merchants(_changes()) == ["a", "b"]
+        storage.append_transaction(_tx("2025-01-11", "c"))
+        assert _merchants(_changes(since=2)) == ["c"]
@@ -0,0 +1,74 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app import storage
+from app.main import app
+
+client = TestClient(app)
+
+ENDPOINTS = ["/transactions", "/summary", "/goals"]
+
+TX = {"date": "2025-01-10", "amount": -50.0, "merchant": "Whole Foods", "category": "groceries"}
+
+
+@pytest.fixture(autouse=True)
+def isolated_data_dir(tmp_path, monkeypatch):
+    data_dir = tmp_path / "data"
+    data_file = data_dir / "compound.json"
+    monkeypatch.setattr(storage, "DATA_DIR", data_dir)
+    monkeypatch.setattr(storage, "DATA_FILE", data_file)
+    return data_dir
+
+
+@pytest.mark.parametrize("path", ENDPOINTS)
+class TestConditionalGet:
+    def test_emits_strong_etag(self, backend, path):
+        resp = client.get(path)
+        assert resp.status_code == 200
+        assert resp.headers["etag"].startswith('"')
+        assert resp.headers["cache-control"] == "no-cache"
+        assert client.get(path).headers["etag"] == resp.headers["etag"]
+
+    def test_matching_etag_returns_304(self, backend, path):
+        etag = client.get(path).headers["etag"]
+        resp = client.get(path, headers={"If-None-Match": etag})
+        assert resp.status_code == 304
+        assert resp.content == b""
+        assert resp.headers["etag"] == etag
+
+    def test_write_changes_etag(self, backend, path):
+        etag = client.get(path).headers["etag"]
+        client.post("/transactions", json=TX)
+        resp = client.get(path, headers={"If-None-Match": etag})
+        assert resp.status_code == 200
+        assert resp.headers["etag"] != etag
+
+    def test_304_does_not_load_data(self, backend, path, monkeypatch):
+        etag = client.get(path).headers["etag"]
+        store = storage.get_store()
+
+        def fail(*args, **kwargs):
+            raise AssertionError("data was read")
+
+        for name in ("load", "query_transactions", "summarize"):
+            monkeypatch.setattr(store, name, fail)
+        assert client.get(path, headers={"If-None-Match": etag}).status_code == 304
+
+
+class TestEtagMatching:
+    def test_query_params_change_etag(self):
+        plain = client.get("/transactions").headers["etag"]
+        filtered = client.get("/transactions", params={"category": "rent"}).headers["etag"]
+        assert plain != filtered
+        resp = client.get("/transactions", params={"category": "rent"}, headers={"If-None-Match": plain})
+        assert resp.status_code == 200
+
+    def test_param_order_does_not_matter(self):
+        a = client.get("/transactions?from=2025-01-01&to=2025-02-01").headers["etag"]
+        b = client.get("/transactions?to=2025-02-01&from=2025-01-01").headers["etag"]
+        assert a == b
+
+    def test_list_weak_and_wildcard(self):
+        etag = client.get("/goals").headers["etag"]
+        for header in (f'"other", {etag}', f"W/{etag}", "*"):
+            assert client.get("/goals", headers={"If-None-Match": header}).status_code == 304
@@ -0,0 +1,206 @@
+import asyncio
+import multiprocessing
+import sqlite3
+from datetime import date
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import async_storage, dedupe, storage
+from app.main import app
+from app.models import Transaction
+
+client = TestClient(app)
+
+
+def _record(day: str, amount: float, merchant: str) -> dict:
+    return {"date": day, "amount": amount, "merchant": merchant, "category": "fun"}
+
+
+def _store(*records: dict) -> None:
+    storage.append_transactions([Transaction(**r) for r in records])
+
+
+def _ndjson(*records: dict) -> str:
+    return "".join(Transaction(**r).model_dump_json(exclude={"id"}) + "\n" for r in records)
+
+
+def _post_skip(backend: str, times: int) -> None:
+    # A fresh store instance, as another worker process would have.
+    store = storage.open_store(backend, storage.DATA_FILE)
+    for _ in range(times):
+        tx = Transaction(**_record("2025-01-10", -3.5, "Cafe"))
+        store.append_checked([tx.model_dump(mode="json")], dedupe.DuplicateCheck(skip=True))
+
+
+class TestFingerprint:
+    def test_normalizes_merchant(self):
+        assert dedupe.normalize_merchant("  WHOLE-Foods  Market, #12 ") == "whole foods market 12"
+
+    def test_amount_in_cents(self):
+        assert dedupe.fingerprint(_record("2025-01-10", -3.4999999, "A"))[1] == -350
+        assert dedupe.fingerprint(_record("2025-01-10", -0.1 - 0.2, "A"))[1] == -30
+
+    def test_each_stored_transaction_matches_once(self):
+        fingerprints = dedupe.Fingerprints([_record("2025-01-10", -3.5, "Cafe")])
+        coffee = _record("2025-01-10", -3.5, "CAFE")
+        assert fingerprints.match([coffee, coffee]) == [True, False]
+
+    def test_window(self):
+        fingerprints = dedupe.Fingerprints([_record("2025-01-10", -3.5, "Cafe")])
+        later = _record("2025-01-12", -3.5, "Cafe")
+        assert fingerprints.match([later]) == [False]
+        assert fingerprints.match([later], window=1) == [False]
+        assert fingerprints.match([later], window=2) == [True]
+
+    def test_amount_and_merchant_must_match(self):
+        fingerprints = dedupe.Fingerprints([_record("2025-01-10", -3.5, "Cafe")])
+        assert fingerprints.match(
+            [_record("2025-01-10", -3.51, "Cafe"), _record("2025-01-10", -3.5, "Bakery")],
+            window=3,
+        ) == [False, False]
+
+
+class TestCreate:
+    def test_allowed_by_default(self, backend):
+        _store(_record("2025-01-10", -3.5, "Cafe"))
+        resp = client.post("/transactions", json=_record("2025-01-10", -3.5, "Cafe"))
+        assert resp.status_code == 201
+        assert "x-duplicate" not in resp.headers
+        assert len(storage.load_data()["transactions"]) == 2
+
+    def test_flag(self, backend):
+        _store(_record("2025-01-10", -3.5, "Cafe"))
+        resp = client.post(
+            "/transactions?on_duplicate=flag", json=_record("2025-01-10", -3.5, "cafe.")
+        )
+        assert resp.status_code == 201
+        assert resp.headers["x-duplicate"] == "true"
+        resp = client.post(
+            "/transactions?on_duplicate=flag", json=_record("2025-01-11", -3.5, "Cafe")
+        )
+        assert resp.headers["x-duplicate"] == "false"
+        assert len(storage.load_data()["transactions"]) == 3
+
+    def test_skip(self, backend):
+        _store(_record("2025-01-10", -3.5, "Cafe"))
+        resp = client.post(
+            "/transactions?on_duplicate=skip&window=1", json=_record("2025-01-11", -3.5, "Cafe")
+        )
+        assert resp.status_code == 409
+        assert len(storage.load_data()["transactions"]) == 1
+
+    def test_sees_new_appends(self, backend):
+        client.post("/transactions?on_duplicate=skip", json=_record("2025-01-10", -3.5, "Cafe"))
+        resp = client.post(
+            "/transactions?on_duplicate=skip", json=_record("2025-01-10", -3.5, "Cafe")
+        )
+        assert resp.status_code == 409
+
+    def test_concurrent_identical_posts_store_one(self, backend):
+        tx = Transaction(**_record("2025-01-10", -3.5, "Cafe"))
+        check = dedupe.DuplicateCheck(skip=True)
+
+        async def post_twice():
+            return await asyncio.gather(
+                async_storage.append_transaction(tx, check),
+                async_storage.append_transaction(tx, check),
+            )
+
+        assert sorted(asyncio.run(post_twice())) == [[False], [True]]
+        assert len(storage.load_data()["transactions"]) == 1
+
+    def test_checked_atomically_across_processes(self, backend):
+        storage.load_data()
+        ctx = multiprocessing.get_context("fork")
+        procs = [ctx.Process(target=_post_skip, args=(backend, 10)) for _ in range(4)]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join()
+        assert all(p.exitcode == 0 for p in procs)
+        storage._stores.clear()
+        assert len(storage.load_data()["transactions"]) == 1
+
+    def test_checked_against_earlier_entries_of_a_batch(self, backend):
+        store = storage.get_store()
+
+        def records(n):
+            return [
+                Transaction(**_record("2025-01-10", -3.5, "Cafe")).model_dump(mode="json")
+                for _ in range(n)
+            ]
+
+        results = async_storage._commit([
+            (store, "transactions", records(1), None),
+            (store, "transactions", records(1), dedupe.DuplicateCheck(skip=True)),
+            (store, "transactions", records(2), dedupe.DuplicateCheck()),
+        ])
+        assert results == [None, [True], [True, False]]
+        assert len(storage.load_data()["transactions"]) == 3
+
+    def test_window_limit(self, backend):
+        resp = client.post(
+            f"/transactions?on_duplicate=skip&window={dedupe.MAX_WINDOW + 1}",
+            json=_record("2025-01-10", -3.5, "Cafe"),
+        )
+        assert resp.status_code == 422
+
+
+class TestBulk:
+    def test_reimporting_overlapping_statement(self, backend):
+        january = [_record("2025-01-10", -3.5, "Cafe"), _record("2025-01-20", -3.5, "Cafe")]
+        overlap = [
+            _record("2025-01-20", -3.5, "Cafe"),
+            _record("2025-01-20", -3.5, "Cafe"),  # A second coffee that day is new.
+            _record("2025-02-01", -60.0, "Grocer"),
+        ]
+        _store(*january)
+        resp = client.post(
+            "/transactions/bulk?on_duplicate=skip",
+            content=_ndjson(*overlap),
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+        assert resp.json() == {
+            "inserted": 2,
+            "failed": 0,
+            "errors": [],
+            "duplicates": 1,
+            "duplicate_rows": [1],
+        }
+        assert len(storage.load_data()["transactions"]) == 4
+
+    def test_flag_imports_everything(self, backend):
+        _store(_record("2025-01-10", -3.5, "Cafe"))
+        resp = client.post(
+            "/transactions/bulk?on_duplicate=flag&window=2",
+            content=_ndjson(_record("2025-01-08", -3.5, "Cafe"), _record("2025-01-01", -1.0, "A")),
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+        result = resp.json()
+        assert result["inserted"] == 2
+        assert result["duplicate_rows"] == [1]
+        assert len(storage.load_data()["transactions"]) == 3
+
+
+@pytest.mark.parametrize("backend", ["sqlite"], indirect=True)
+class TestSqliteFingerprints:
+    def test_persisted_and_rebuilt_on_save(self, backend, data_dir):
+        _store(_record("2025-01-10", -3.5, "Cafe"), _record("2025-01-10", -3.5, "Cafe"))
+        conn = sqlite3.connect(data_dir / "compound.db")
+        assert conn.execute("SELECT * FROM fingerprints").fetchall() == [
+            (-350, "cafe", date(2025, 1, 10).toordinal(), 2)
+        ]
+        replacement = Transaction(**_record("2025-01-11", -1.0, "B")).model_dump(mode="json")
+        storage.save_data({"transactions": [replacement]})
+        assert conn.execute("SELECT cents, merchant, rows FROM fingerprints").fetchall() == [
+            (-100, "b", 1)
+        ]
+
+    def test_backfilled_for_older_databases(self, backend, data_dir):
+        _store(_record("2025-01-10", -3.5, "Cafe"))
+        conn = sqlite3.connect(data_dir / "compound.db")
+        with conn:
+            conn.execute("DELETE FROM fingerprints")
+        storage._stores.clear()
+        assert storage.get_store().duplicates([_record("2025-01-10", -3.5, "Cafe")]) == [True]
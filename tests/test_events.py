@@ -0,0 +1,250 @@
+import asyncio
+import json
+from datetime import date
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import async_storage, events, storage
+from app.main import app
+from app.models import Category, Goal, Transaction
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def isolated_data_dir(tmp_path, monkeypatch):
+    data_dir = tmp_path / "data"
+    monkeypatch.setattr(storage, "DATA_DIR", data_dir)
+    monkeypatch.setattr(storage, "DATA_FILE", data_dir / "compound.json")
+    monkeypatch.setattr(storage, "STORAGE_BACKEND", "json")
+    return data_dir
+
+
+@pytest.fixture
+def broadcaster(monkeypatch):
+    """A fresh broadcaster in place of the app's."""
+    fresh = events.Broadcaster(history=4)
+    monkeypatch.setattr(events, "BROADCASTER", fresh)
+    storage.add_listener(fresh.publish)
+    yield fresh
+    storage.remove_listener(fresh.publish)
+
+
+def _tx(day: str, amount: float, category: Category = Category.fun) -> Transaction:
+    return Transaction(
+        date=date.fromisoformat(day), amount=amount, merchant="Cafe", category=category
+    )
+
+
+def _parse(frame: bytes) -> dict:
+    fields = dict(line.split(": ", 1) for line in frame.decode().strip().split("\n"))
+    return {"id": int(fields["id"]), "event": fields["event"], "data": json.loads(fields["data"])}
+
+
+async def _drain(sub: events.Subscription) -> list[dict]:
+    await asyncio.sleep(0)  # Let call_soon_threadsafe deliveries run.
+    frames = []
+    while not sub.queue.empty():
+        frames.append(_parse(sub.queue.get_nowait()))
+    return frames
+
+
+class TestBroadcaster:
+    def test_transactions_event_with_summary_delta(self, broadcaster):
+        async def run():
+            sub = broadcaster.subscribe()
+            storage.append_transactions([_tx("2025-01-10", -20.0), _tx("2025-02-01", 100.0)])
+            return await _drain(sub)
+
+        [event] = asyncio.run(run())
+        assert event["event"] == "transactions"
+        assert [r["amount"] for r in event["data"]["records"]] == [-20.0, 100.0]
+        assert event["data"]["count"] == 2
+        assert event["data"]["summary"] == {
+            "total_income": 100.0,
+            "total_expense": 20.0,
+            "net": 80.0,
+            "spend_by_category": {"fun": 20.0},
+            "monthly_net": {"2025-01": -20.0, "2025-02": 100.0},
+        }
+
+    def test_events_carry_the_version_of_their_write(self, broadcaster):
+        storage.append_transactions([_tx("2025-01-10", -20.0)])
+        shown = client.get("/summary").json()["version"]
+
+        async def run():
+            sub = broadcaster.subscribe()
+            await async_storage.append_transaction(_tx("2025-01-11", -5.0))
+            return _parse(await asyncio.wait_for(sub.queue.get(), 5))
+
+        event = asyncio.run(run())
+        # Newer than the summary fetched before the write, and included in
+        # one fetched after it.
+        assert int(event["data"]["version"]) > int(shown)
+        assert client.get("/summary").json()["version"] == event["data"]["version"]
+
+    def test_failing_listener_does_not_fail_the_write(self, broadcaster, caplog):
+        def fail(entries, version):
+            raise RuntimeError("listener broke")
+
+        # Ahead of the broadcaster, which should still be told.
+        storage._listeners.insert(0, fail)
+        body = {"date": "2025-01-10", "amount": -5.0, "merchant": "Cafe"}
+
+        async def run():
+            sub = broadcaster.subscribe()
+            resp = client.post("/transactions", json=body)
+            return resp, await _drain(sub)
+
+        try:
+            resp, frames = asyncio.run(run())
+        finally:
+            storage.remove_listener(fail)
+        assert resp.status_code == 201
+        assert [f["event"] for f in frames] == ["transactions"]
+        assert "listener broke" in caplog.text
+
+    def test_goals_event_has_projection(self, broadcaster):
+        goal = Goal(
+            name="Bike",
+            target_amount=600.0,
+            monthly_contribution=100.0,
+            start_date=date(2025, 1, 1),
+        )
+
+        async def run():
+            sub = broadcaster.subscribe()
+            storage.append_goal(goal)
+            return await _drain(sub)
+
+        [event] = asyncio.run(run())
+        assert event["event"] == "goals"
+        assert event["data"]["records"][0]["projection"] == {
+            "months_to_target": 6,
+            "target_date": "2025-07-01",
+        }
+
+    def test_every_subscriber_gets_the_same_bytes(self, broadcaster):
+        async def run():
+            subs = [broadcaster.subscribe() for _ in range(3)]
+            storage.append_transaction(_tx("2025-01-10", -5.0))
+            await asyncio.sleep(0)
+            return [sub.queue.get_nowait() for sub in subs]
+
+        frames = asyncio.run(run())
+        assert frames[0] is frames[1] is frames[2]
+
+    def test_async_writes_are_published(self, broadcaster):
+        async def run():
+            sub = broadcaster.subscribe()
+            await async_storage.append_transaction(_tx("2025-01-10", -5.0))
+            return await asyncio.wait_for(sub.queue.get(), 5)
+
+        assert _parse(asyncio.run(run()))["event"] == "transactions"
+
+    def test_large_appends_sent_without_records(self, broadcaster, monkeypatch):
+        monkeypatch.setattr(events, "EVENT_RECORDS", 2)
+
+        async def run():
+            sub = broadcaster.subscribe()
+            storage.append_transactions([_tx("2025-01-10", -1.0)] * 3)
+            return await _drain(sub)
+
+        [event] = asyncio.run(run())
+        assert event["data"]["records"] == []
+        assert event["data"]["count"] == 3
+        assert event["data"]["summary"]["total_expense"] == 3.0
+
+    def test_resume_from_last_event_id(self, broadcaster):
+        for i in range(3):
+            storage.append_transaction(_tx("2025-01-10", -float(i + 1)))
+
+        async def run(last_event_id):
+            return await _drain(broadcaster.subscribe(last_event_id))
+
+        assert [e["id"] for e in asyncio.run(run(1))] == [2, 3]
+        assert asyncio.run(run(3)) == []
+
+    @pytest.mark.parametrize("last_event_id", [0, 99])
+    def test_reset_when_events_were_lost(self, broadcaster, last_event_id):
+        # History holds four events; the first of six has been dropped, and
+        # an id from before a restart is ahead of this process.
+        for i in range(6):
+            storage.append_transaction(_tx("2025-01-10", -1.0))
+
+        async def run():
+            return await _drain(broadcaster.subscribe(last_event_id))
+
+        assert [e["event"] for e in asyncio.run(run())] == ["reset"]
+
+    def test_slow_subscriber_reset(self, broadcaster, monkeypatch):
+        monkeypatch.setattr(events, "MAX_PENDING", 2)
+
+        async def run():
+            sub = broadcaster.subscribe()
+            for _ in range(3):
+                storage.append_transaction(_tx("2025-01-10", -1.0))
+            return await _drain(sub)
+
+        assert [e["event"] for e in asyncio.run(run())] == ["reset"]
+
+    def test_closed_loop_dropped(self, broadcaster):
+        async def run():
+            broadcaster.subscribe()
+
+        asyncio.run(run())
+        storage.append_transaction(_tx("2025-01-10", -1.0))
+        assert broadcaster.subscriber_count() == 0
+
+
+class TestEndpoint:
+    def test_streams_events(self, broadcaster):
+        """Drive /events over ASGI until a posted transaction arrives."""
+
+        async def run():
+            disconnected = asyncio.Event()
+            requested = False
+            chunks: list[bytes] = []
+            headers = {}
+
+            async def receive():
+                nonlocal requested
+                if not requested:
+                    requested = True
+                    return {"type": "http.request", "body": b"", "more_body": False}
+                await disconnected.wait()
+                return {"type": "http.disconnect"}
+
+            async def send(message):
+                if message["type"] == "http.response.start":
+                    headers.update(dict(message["headers"]))
+                elif message.get("body"):
+                    chunks.append(message["body"])
+                    if len(chunks) == 1:
+                        await async_storage.append_transaction(_tx("2025-01-10", -5.0))
+                    else:
+                        disconnected.set()
+
+            scope = {
+                "type": "http",
+                "asgi": {"version": "3.0"},
+                "http_version": "1.1",
+                "method": "GET",
+                "scheme": "http",
+                "path": "/events",
+                "raw_path": b"/events",
+                "root_path": "",
+                "query_string": b"",
+                "headers": [(b"host", b"testserver")],
+                "client": ("testclient", 1),
+                "server": ("testserver", 80),
+            }
+            await asyncio.wait_for(app(scope, receive, send), 5)
+            return headers, chunks
+
+        headers, chunks = asyncio.run(run())
+        assert headers[b"content-type"].startswith(b"text/event-stream")
+        assert chunks[0].startswith(b"retry:")
+        assert _parse(chunks[1])["data"]["records"][0]["merchant"] == "Cafe"
+        assert broadcaster.subscriber_count() == 0
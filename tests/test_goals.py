@@ -6,7 +6,7 @@ from fastapi.testclient import TestClient
 
 from app import storage
 from app.main import app
-from app.models import Goal
+from app.models import Goal, Transaction
 
 client = TestClient(app)
 
@@ -45,6 +45,22 @@ class TestListGoals:
         assert item["projection"]["months_to_target"] == 20
         assert item["projection"]["target_date"] == "2026-09-01"
 
+    def test_reads_only_goals(self, backend, monkeypatch):
+        storage.append_transaction(Transaction(date="2025-01-10", amount=-1.0, merchant="Cafe"))
+        storage.append_goal(
+            Goal(
+                name="Fund",
+                target_amount=100.0,
+                monthly_contribution=10.0,
+                start_date=date(2025, 1, 1),
+            )
+        )
+        if backend in ("sqlite", "partitioned"):
+            # These keep goals apart, so loading everything would be wasted.
+            monkeypatch.setattr(storage.get_store(), "load", lambda: pytest.fail("loaded"))
+        resp = client.get("/goals")
+        assert [g["name"] for g in resp.json()] == ["Fund"]
+
 
 class TestPostGoal:
     def test_create_returns_201(self):
@@ -1,6 +1,12 @@
+import time
+from datetime import date
+
+import pytest
 from fastapi.testclient import TestClient
 
+from app import storage, warmup
 from app.main import app
+from app.models import Category, Transaction
 
 client = TestClient(app)
 
@@ -20,3 +26,73 @@ def test_cors_headers():
         },
     )
     assert resp.headers["access-control-allow-origin"] == "http://localhost:5173"
+
+
+@pytest.fixture
+def isolated_data_dir(tmp_path, monkeypatch):
+    data_dir = tmp_path / "data"
+    monkeypatch.setattr(storage, "DATA_DIR", data_dir)
+    monkeypatch.setattr(storage, "DATA_FILE", data_dir / "compound.json")
+    monkeypatch.setattr(storage, "STORAGE_BACKEND", "json")
+    yield data_dir
+    warmup.READINESS.reset()
+
+
+def _ready(client: TestClient) -> dict:
+    for _ in range(200):
+        resp = client.get("/health/ready")
+        if resp.status_code == 200:
+            return resp.json()
+        assert resp.json()["status"] == "starting"
+        time.sleep(0.01)
+    raise AssertionError("warm-up did not finish")
+
+
+class TestReadiness:
+    def test_not_ready_before_warm_up(self, isolated_data_dir):
+        warmup.READINESS.reset()
+        resp = client.get("/health/ready")
+        assert resp.status_code == 503
+        assert resp.json()["status"] == "starting"
+
+    def test_ready_after_warm_up(self, isolated_data_dir):
+        storage.append_transaction(
+            Transaction(
+                date=date(2025, 1, 10), amount=-5.0, merchant="Cafe", category=Category.fun
+            )
+        )
+        storage._stores.clear()
+        with TestClient(app) as started:
+            body = _ready(started)
+        assert body["status"] == "ready"
+        assert set(body["warmup_seconds"]) == {"store", "encoders", "total"}
+        # The indexes were built by the warm-up, not by a request.
+        assert storage.get_store()._indexes is not None
+
+    def test_disabled(self, isolated_data_dir, monkeypatch):
+        monkeypatch.setattr(warmup, "ENABLED", False)
+        with TestClient(app) as started:
+            assert started.get("/health/ready").json() == {
+                "status": "ready",
+                "warmup_seconds": {},
+            }
+        assert not isolated_data_dir.exists()
+
+    def test_failure_reported(self, isolated_data_dir, monkeypatch):
+        def broken():
+            raise OSError("disk on fire")
+
+        monkeypatch.setattr(warmup, "_store", broken)
+        with TestClient(app) as started:
+            for _ in range(200):
+                if warmup.READINESS.error is not None:
+                    break
+                time.sleep(0.01)
+            resp = started.get("/health/ready")
+        assert resp.status_code == 503
+        assert resp.json() == {"status": "failed", "error": "OSError: disk on fire"}
+
+    @pytest.mark.parametrize("backend", ["sqlite", "partitioned", "binary"])
+    def test_other_backends(self, isolated_data_dir, monkeypatch, backend):
+        monkeypatch.setattr(storage, "STORAGE_BACKEND", backend)
+        assert warmup.run()["total"] >= 0
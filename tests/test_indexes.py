@@ -0,0 +1,87 @@
+import random
+from datetime import date, timedelta
+from uuid import uuid4
+
+import pytest
+
+from app.indexes import Columns, DateIndex, sort_key
+
+
+def _records(n: int, seed: int = 0) -> list[dict]:
+    rng = random.Random(seed)
+    start = date(2024, 1, 1)
+    return [
+        {
+            "id": str(uuid4()),
+            "date": (start + timedelta(days=rng.randrange(90))).isoformat(),
+            "category": rng.choice(["groceries", "rent", "fun"]),
+        }
+        for _ in range(n)
+    ]
+
+
+def _brute_force(records, from_date=None, to_date=None, category=None):
+    return sorted(
+        (
+            r
+            for r in records
+            if (from_date is None or r["date"] >= from_date.isoformat())
+            and (to_date is None or r["date"] <= to_date.isoformat())
+            and (category is None or r["category"] == category)
+        ),
+        key=sort_key,
+    )
+
+
+WINDOWS = [
+    (None, None, None),
+    (date(2024, 2, 1), None, None),
+    (None, date(2024, 1, 15), None),
+    (date(2024, 1, 10), date(2024, 1, 10), None),
+    (date(2024, 1, 20), date(2024, 3, 1), "fun"),
+    (None, None, "bills"),
+    (date(2025, 1, 1), None, None),
+]
+
+
+class TestDateIndex:
+    @pytest.mark.parametrize("from_date, to_date, category", WINDOWS)
+    def test_range_matches_scan(self, from_date, to_date, category):
+        records = _records(300)
+        index = DateIndex(records)
+        assert index.range(from_date, to_date, category) == _brute_force(
+            records, from_date, to_date, category
+        )
+
+    @pytest.mark.parametrize("from_date, to_date, category", WINDOWS)
+    def test_add_keeps_order(self, from_date, to_date, category):
+        records = _records(300, seed=1)
+        index = DateIndex(records[:100])
+        index.add(records[100:])
+        assert len(index) == 300
+        assert index.range(from_date, to_date, category) == _brute_force(
+            records, from_date, to_date, category
+        )
+
+    def test_new_category(self):
+        index = DateIndex([])
+        record = {"id": "a", "date": "2024-01-01", "category": "salary"}
+        index.add([record])
+        assert index.range(category="salary") == [record]
+
+
+class TestColumns:
+    def test_add_matches_build(self):
+        records = [{**r, "amount": i * 1.25 - 100} for i, r in enumerate(_records(300, seed=4))]
+        columns = Columns(records[:1])
+        views = columns.arrays()
+        for i in range(1, 300, 37):
+            columns.add(records[i : i + 37])
+        built = Columns(records).arrays()
+        assert len(columns) == 300
+        for grown, expected in zip(columns.arrays(), built):
+            assert grown.tolist() == expected.tolist()
+        # Views taken earlier still show the rows they had.
+        assert [len(v) for v in views] == [1, 1, 1]
+        assert views[0][0] == date.fromisoformat(records[0]["date"]).toordinal()
+
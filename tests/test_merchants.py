@@ -0,0 +1,109 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app import merchants, storage
+from app.main import app
+from app.merchants import MerchantIndex
+from app.models import Transaction
+
+client = TestClient(app)
+
+
+def _records(*merchants: str) -> list[dict]:
+    return [{"merchant": m} for m in merchants]
+
+
+def _store(*merchants: str) -> None:
+    storage.append_transactions(
+        [Transaction(date="2025-01-10", amount=-1.0, merchant=m, category="fun") for m in merchants]
+    )
+
+
+def _suggest(**params) -> list[tuple[str, int]]:
+    resp = client.get("/merchants/suggest", params=params)
+    assert resp.status_code == 200
+    return [(s["merchant"], s["transactions"]) for s in resp.json()]
+
+
+class TestMerchantIndex:
+    def test_ranked_by_frequency_then_name(self):
+        index = MerchantIndex(_records("Bakery", "Bar", "Bar", "Bank", "Bank", "Cafe"))
+        assert index.suggest("ba") == [("Bank", 2), ("Bar", 2), ("Bakery", 1)]
+        assert index.suggest("ba", limit=1) == [("Bank", 2)]
+        assert index.suggest("x") == []
+
+    def test_ignores_case_and_punctuation(self):
+        index = MerchantIndex(_records("Whole Foods", "WHOLE-FOODS", "Wholesale Club"))
+        # Shown as first recorded.
+        assert index.suggest("whole f") == [("Whole Foods", 2)]
+        assert index.suggest("Whole-") == [("Whole Foods", 2)]
+        assert index.suggest("WHOLE") == [("Whole Foods", 2), ("Wholesale Club", 1)]
+
+    def test_ties_at_the_limit_cut_by_name(self):
+        index = MerchantIndex(_records(*"edcba", "f", "f"))
+        assert index.suggest("", limit=3) == [("f", 2), ("a", 1), ("b", 1)]
+
+    def test_add(self, monkeypatch):
+        monkeypatch.setattr(merchants, "MERGE_AT", 2)
+        index = MerchantIndex(_records("Cafe", "Cinema"))
+        index.add(_records("Cinema", "Cinema", "Corner Shop"))
+        # Corner Shop is found before it is merged into the sorted arrays...
+        assert len(index._new) == 1
+        assert index.suggest("c") == [("Cinema", 3), ("Cafe", 1), ("Corner Shop", 1)]
+        index.add(_records("Chemist", "Corner Shop"))
+        # ...and after.
+        assert index._new == {}
+        assert index._keys == ["cafe", "chemist", "cinema", "corner shop"]
+        assert index.suggest("c") == [
+            ("Cinema", 3),
+            ("Corner Shop", 2),
+            ("Cafe", 1),
+            ("Chemist", 1),
+        ]
+
+    def test_from_counts(self):
+        index = MerchantIndex.from_counts([("Cafe", 2), ("CAFE", 1), ("Bar", 4)])
+        assert index.suggest("") == [("Bar", 4), ("Cafe", 3)]
+
+
+class TestSuggest:
+    def test_suggest(self, backend):
+        _store("Cafe Nero", "Cafe Nero", "Cafe Rouge", "Bakery")
+        assert _suggest(q="cafe") == [("Cafe Nero", 2), ("Cafe Rouge", 1)]
+        assert _suggest(q="cafe r") == [("Cafe Rouge", 1)]
+        assert _suggest(q="c", limit=1) == [("Cafe Nero", 2)]
+
+    def test_sees_new_appends(self, backend):
+        _store("Cafe Rouge")
+        assert _suggest(q="cafe") == [("Cafe Rouge", 1)]
+        _store("Cafe Nero", "Cafe Nero")
+        assert _suggest(q="cafe") == [("Cafe Nero", 2), ("Cafe Rouge", 1)]
+
+    def test_sees_replaced_store(self, backend):
+        _store("Cafe Rouge")
+        assert _suggest(q="cafe") == [("Cafe Rouge", 1)]
+        replacement = Transaction(date="2025-01-10", amount=-1.0, merchant="Cafe Nero")
+        storage.save_data({"transactions": [replacement.model_dump(mode="json")]})
+        assert _suggest(q="cafe") == [("Cafe Nero", 1)]
+
+    def test_not_modified(self, backend):
+        _store("Cafe")
+        etag = client.get("/merchants/suggest?q=c").headers["etag"]
+        resp = client.get("/merchants/suggest?q=c", headers={"If-None-Match": etag})
+        assert resp.status_code == 304
+
+    @pytest.mark.parametrize("params", [{}, {"q": ""}, {"q": "c", "limit": 0}])
+    def test_rejects_bad_params(self, backend, params):
+        assert client.get("/merchants/suggest", params=params).status_code == 422
+
+
+@pytest.mark.parametrize("backend", ["sqlite"], indirect=True)
+class TestSqliteMerchants:
+    def test_extended_by_own_appends(self, backend):
+        _store("Cafe")
+        store = storage.get_store()
+        assert store.suggest_merchants("c") == [("Cafe", 1)]
+        index = store._merchants[1]
+        _store("Cafe")
+        assert store.suggest_merchants("c") == [("Cafe", 2)]
+        assert store._merchants[1] is index
@@ -0,0 +1,100 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app import metrics, storage
+from app.main import app
+
+client = TestClient(app)
+
+TX = {"date": "2025-01-10", "amount": -50.0, "merchant": "Whole Foods", "category": "groceries"}
+
+
+@pytest.fixture(autouse=True)
+def isolated_data_dir(tmp_path, monkeypatch):
+    data_dir = tmp_path / "data"
+    monkeypatch.setattr(storage, "DATA_DIR", data_dir)
+    monkeypatch.setattr(storage, "DATA_FILE", data_dir / "compound.json")
+    return data_dir
+
+
+@pytest.fixture
+def enabled(monkeypatch):
+    monkeypatch.setattr(metrics, "ENABLED", True)
+    registry = metrics.Registry()
+    monkeypatch.setattr(metrics, "REGISTRY", registry)
+    return registry
+
+
+def _timings(resp) -> dict[str, float]:
+    entries = (e.split(";dur=") for e in resp.headers["server-timing"].split(", "))
+    return {name: float(dur) for name, dur in entries}
+
+
+class TestPhase:
+    def test_noop_outside_a_request(self):
+        with metrics.phase("load"):
+            pass
+        assert metrics.phase("load") is metrics.phase("other")
+
+    def test_repeated_phases_add_up(self):
+        timings: dict[str, float] = {}
+        token = metrics._timings.set(timings)
+        try:
+            for _ in range(3):
+                with metrics.phase("validate"):
+                    pass
+        finally:
+            metrics._timings.reset(token)
+        assert list(timings) == ["validate"]
+        assert timings["validate"] >= 0
+
+
+class TestRegistry:
+    def test_prometheus_text(self):
+        registry = metrics.Registry()
+        registry.observe("GET", "/summary", 200, 0.003, {"aggregate": 0.002})
+        registry.observe("GET", "/summary", 304, 2.0, {})
+        text = registry.render()
+        assert 'compound_requests_total{method="GET",route="/summary",status="200"} 1' in text
+        assert 'compound_requests_total{method="GET",route="/summary",status="304"} 1' in text
+        assert "# TYPE compound_request_duration_seconds histogram" in text
+        assert 'compound_request_duration_seconds_bucket{method="GET",route="/summary",le="0.0025"} 0' in text
+        assert 'compound_request_duration_seconds_bucket{method="GET",route="/summary",le="0.005"} 1' in text
+        assert 'compound_request_duration_seconds_bucket{method="GET",route="/summary",le="+Inf"} 2' in text
+        assert 'compound_request_duration_seconds_count{method="GET",route="/summary"} 2' in text
+        assert 'compound_request_duration_seconds_sum{method="GET",route="/summary"} 2.003' in text
+        assert 'phase="aggregate",le="0.0025"} 1' in text
+
+    def test_escapes_label_values(self):
+        registry = metrics.Registry()
+        registry.observe("GET", 'a"b\\c', 200, 0.1, {})
+        assert 'route="a\\"b\\\\c"' in registry.render()
+
+
+class TestMiddleware:
+    def test_disabled_by_default(self):
+        resp = client.get("/summary")
+        assert "server-timing" not in resp.headers
+        assert client.get("/metrics").status_code == 404
+
+    def test_server_timing_breakdown(self, enabled):
+        client.post("/transactions", json=TX)
+        timings = _timings(client.get("/summary"))
+        assert {"aggregate", "encode", "total"} <= set(timings)
+        assert timings["total"] >= timings["aggregate"]
+        assert {"validate", "write", "total"} <= set(_timings(client.post("/transactions", json=TX)))
+
+    def test_phases_on_the_reader_pool_are_counted(self, enabled):
+        client.post("/transactions", json=TX)
+        storage._stores.clear()
+        assert {"load", "index", "filter"} <= set(_timings(client.get("/transactions")))
+
+    def test_metrics_endpoint(self, enabled):
+        client.get("/summary")
+        client.get("/no-such-page")
+        resp = client.get("/metrics")
+        assert resp.status_code == 200
+        assert resp.headers["content-type"].startswith("text/plain; version=0.0.4")
+        assert 'compound_requests_total{method="GET",route="/summary",status="200"} 1' in resp.text
+        assert 'route="unmatched",status="404"} 1' in resp.text
+        assert 'route="/summary",phase="encode"' in resp.text
@@ -9,6 +9,8 @@ from app.models import (
     Goal,
     GoalCreate,
     GoalProjection,
+    GoalRecord,
+    GoalWithProjection,
     Transaction,
     TransactionCreate,
     compute_projection,
@@ -176,3 +178,17 @@ class TestComputeProjection:
         proj = compute_projection(g)
         assert proj.months_to_target == 1
         assert proj.target_date == date(2025, 4, 15)
+
+
+class TestGoalRecord:
+    @pytest.mark.parametrize("contribution", [300.0, 0.0])
+    def test_matches_goal_with_projection(self, contribution):
+        g = Goal(
+            name="Fund",
+            target_amount=1000.0,
+            monthly_contribution=contribution,
+            start_date=date(2025, 6, 1),
+        )
+        expected = GoalWithProjection(**g.model_dump(), projection=compute_projection(g))
+        record = GoalRecord.from_dict(g.model_dump(mode="json"))
+        assert record.with_projection() == expected.model_dump(mode="json")
@@ -0,0 +1,91 @@
+import gzip
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import pages
+from app.main import app
+from app.routers import ui
+
+client = TestClient(app)
+
+
+class TestChooseEncoding:
+    @pytest.mark.parametrize(
+        "header, expected",
+        [
+            (None, "identity"),
+            ("", "identity"),
+            ("gzip", "gzip"),
+            ("gzip, deflate, br", "br"),
+            ("br;q=0.5, gzip", "gzip"),
+            ("gzip;q=0", "identity"),
+            ("*", "br"),
+            ("deflate", "identity"),
+        ],
+    )
+    def test_negotiation(self, header, expected):
+        assert pages.choose_encoding(header, ("identity", "gzip", "br")) == expected
+
+    def test_unavailable_encoding_skipped(self):
+        assert pages.choose_encoding("br, gzip;q=0.8", ("identity", "gzip")) == "gzip"
+
+
+class TestServedPages:
+    def test_gzip_variant(self):
+        resp = client.get("/", headers={"Accept-Encoding": "gzip"})
+        assert resp.headers["content-encoding"] == "gzip"
+        assert "Accept-Encoding" in resp.headers["vary"]
+        assert "Compound" in resp.text
+
+    def test_identity_variant(self):
+        resp = client.get("/goals-page", headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in resp.headers
+        assert resp.content == (ui.TEMPLATES_DIR / "goals.html").read_bytes()
+
+    def test_cache_headers_and_etags(self):
+        plain = client.get("/summary-page", headers={"Accept-Encoding": "identity"})
+        zipped = client.get("/summary-page", headers={"Accept-Encoding": "gzip"})
+        assert plain.headers["cache-control"] == pages.CACHE_CONTROL
+        assert plain.headers["etag"] != zipped.headers["etag"]
+
+    def test_if_none_match(self):
+        etag = client.get("/", headers={"Accept-Encoding": "gzip"}).headers["etag"]
+        resp = client.get("/", headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+        assert resp.status_code == 304
+        assert resp.headers["etag"] == etag
+
+
+class TestPageCache:
+    def test_variants_decompress_to_template(self, tmp_path):
+        (tmp_path / "page.html").write_text("<p>hello</p>" * 100)
+        page = pages.PageCache(tmp_path).get("page.html")
+        assert gzip.decompress(page.variants["gzip"]) == page.variants["identity"]
+        assert len(page.variants["gzip"]) < len(page.variants["identity"])
+
+    def test_brotli_variant(self, tmp_path):
+        brotli = pytest.importorskip("brotli")
+        (tmp_path / "page.html").write_text("<p>hello</p>")
+        page = pages.PageCache(tmp_path).get("page.html")
+        assert brotli.decompress(page.variants["br"]) == page.variants["identity"]
+
+    def test_templates_not_reread(self, tmp_path):
+        path = tmp_path / "page.html"
+        path.write_text("<p>one</p>")
+        cache = pages.PageCache(tmp_path)
+        path.write_text("<p>two</p>")
+        assert cache.get("page.html").variants["identity"] == b"<p>one</p>"
+
+    def test_reload_picks_up_changes(self, tmp_path):
+        path = tmp_path / "page.html"
+        path.write_text("<p>one</p>")
+        cache = pages.PageCache(tmp_path, reload=True)
+        etag = cache.get("page.html").etags["identity"]
+        path.write_text("<p>two</p>")
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+        page = cache.get("page.html")
+        assert page.variants["identity"] == b"<p>two</p>"
+        assert page.etags["identity"] != etag
+        assert cache.cache_control == pages.RELOAD_CACHE_CONTROL
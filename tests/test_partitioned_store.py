@@ -0,0 +1,217 @@
+import base64
+import json
+from datetime import date
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import cli, storage
+from app.main import app
+from app.models import Category, Goal, Transaction, compute_summary
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def isolated_data_dir(tmp_path, monkeypatch):
+    data_dir = tmp_path / "data"
+    data_file = data_dir / "compound.json"
+    monkeypatch.setattr(storage, "DATA_DIR", data_dir)
+    monkeypatch.setattr(storage, "DATA_FILE", data_file)
+    monkeypatch.setattr(storage, "STORAGE_BACKEND", "partitioned")
+    return data_dir
+
+
+def _tx(day: str, amount: float, merchant: str, category: Category) -> Transaction:
+    return Transaction(
+        date=date.fromisoformat(day), amount=amount, merchant=merchant, category=category
+    )
+
+
+TXNS = [
+    _tx("2025-01-10", -50.0, "Whole Foods", Category.groceries),
+    _tx("2025-01-20", -1200.0, "Landlord", Category.rent),
+    _tx("2025-02-05", 3000.0, "Employer", Category.salary),
+    _tx("2025-02-18", -42.5, "Cinema", Category.fun),
+    _tx("2025-03-03", -61.0, "Whole Foods", Category.groceries),
+]
+
+GOAL = Goal(
+    name="Emergency Fund",
+    target_amount=10000.0,
+    monthly_contribution=500.0,
+    start_date=date(2025, 1, 1),
+)
+
+
+def _seed() -> None:
+    for tx in TXNS:
+        storage.append_transaction(tx)
+
+
+@pytest.fixture
+def reads(monkeypatch):
+    """Names of the files each store read goes to."""
+    store = storage.get_store()
+    read = store._read
+    names = []
+
+    def recording_read(path, size):
+        names.append(path.name)
+        return read(path, size)
+
+    monkeypatch.setattr(store, "_read", recording_read)
+    return names
+
+
+class TestPartitionedStore:
+    def test_one_file_per_month(self, isolated_data_dir):
+        _seed()
+        names = sorted(p.name.split(".")[0] for p in (isolated_data_dir / "transactions").iterdir())
+        assert names == ["2025-01", "2025-02", "2025-03"]
+        manifest = json.loads((isolated_data_dir / "manifest.json").read_text())
+        assert manifest["partitions"]["2025-01"]["rows"] == 2
+        assert manifest["partitions"]["2025-01"]["buckets"] == {
+            "groceries": [0, 5000, 1, 1],
+            "rent": [0, 120000, 1, 1],
+        }
+
+    def test_round_trip(self):
+        _seed()
+        storage.append_goal(GOAL)
+        data = storage.load_data()
+        assert data["transactions"] == [t.model_dump(mode="json") for t in TXNS]
+        assert data["goals"] == [GOAL.model_dump(mode="json")]
+
+    def test_save_replaces_store(self, isolated_data_dir):
+        _seed()
+        storage.append_goal(GOAL)
+        storage.save_data({"transactions": [TXNS[0].model_dump(mode="json")], "goals": []})
+        assert storage.load_data() == {
+            "transactions": [TXNS[0].model_dump(mode="json")],
+            "goals": [],
+        }
+        assert len(list((isolated_data_dir / "transactions").iterdir())) == 1
+        storage.append_transaction(TXNS[1])
+        assert len(storage.load_data()["transactions"]) == 2
+
+    def test_append_touches_only_its_partition(self, isolated_data_dir):
+        _seed()
+        files = {p.name: p.stat().st_mtime_ns for p in (isolated_data_dir / "transactions").iterdir()}
+        storage.append_transaction(_tx("2025-03-20", -5.0, "Cafe", Category.fun))
+        changed = {
+            p.name
+            for p in (isolated_data_dir / "transactions").iterdir()
+            if files.get(p.name) != p.stat().st_mtime_ns
+        }
+        assert [name.split(".")[0] for name in changed] == ["2025-03"]
+
+    def test_version_bumped_by_writes(self):
+        assert storage.store_version() == 0
+        _seed()
+        assert storage.store_version() == len(TXNS)
+        storage.save_data({"transactions": [], "goals": []})
+        assert storage.store_version() == len(TXNS) + 1
+
+    def test_uncommitted_tail_ignored_then_truncated(self, isolated_data_dir):
+        _seed()
+        path = next((isolated_data_dir / "transactions").glob("2025-03.*"))
+        with open(path, "ab") as f:
+            f.write(b'{"torn": tr')
+        storage._stores.clear()
+        assert len(storage.load_data()["transactions"]) == len(TXNS)
+        storage.append_transaction(_tx("2025-03-20", -5.0, "Cafe", Category.fun))
+        assert [t["merchant"] for t in storage.load_data()["transactions"]][-2:] == [
+            "Whole Foods",
+            "Cafe",
+        ]
+
+    def test_grown_partition_reads_only_new_bytes(self, isolated_data_dir):
+        _seed()
+        store = storage.get_store()
+        store.load()
+        path = next((isolated_data_dir / "transactions").glob("2025-03.*"))
+        size = path.stat().st_size
+        storage.append_transaction(_tx("2025-03-20", -5.0, "Cafe", Category.fun))
+        with open(path, "r+b") as f:
+            # Corrupt the already-cached part; only the tail should be read.
+            f.write(b"#" * size)
+        assert store.load()["transactions"][-1]["merchant"] == "Cafe"
+
+
+class TestRangeReads:
+    def test_query_reads_overlapping_partitions(self, reads):
+        _seed()
+        txns = storage.query_transactions(from_date=date(2025, 2, 10), to_date=date(2025, 2, 28))
+        assert [t["merchant"] for t in txns] == ["Cinema"]
+        assert [name.split(".")[0] for name in reads] == ["2025-02"]
+
+    def test_limit_stops_at_newest_partitions(self, reads):
+        _seed()
+        txns = storage.query_transactions(limit=2)
+        assert [t["merchant"] for t in txns] == ["Whole Foods", "Cinema"]
+        assert [name.split(".")[0] for name in reads] == ["2025-03", "2025-02"]
+
+    def test_category_skips_partitions_without_it(self, reads):
+        _seed()
+        txns = storage.query_transactions(category=Category.groceries)
+        assert [t["date"] for t in txns] == ["2025-03-03", "2025-01-10"]
+        assert sorted(name.split(".")[0] for name in reads) == ["2025-01", "2025-03"]
+
+    def test_whole_months_summarised_from_manifest(self, reads):
+        _seed()
+        assert storage.summarize(date(2025, 1, 1), date(2025, 2, 28)) == compute_summary(TXNS[:4])
+        assert reads == []
+
+    @pytest.mark.parametrize(
+        "from_date, to_date",
+        [(None, None), (date(2025, 1, 15), None), (None, date(2025, 2, 10)),
+         (date(2025, 1, 15), date(2025, 3, 1))],
+    )
+    def test_summarize_matches_compute_summary(self, from_date, to_date):
+        _seed()
+        expected = compute_summary(
+            [
+                t
+                for t in TXNS
+                if (from_date is None or t.date >= from_date)
+                and (to_date is None or t.date <= to_date)
+            ]
+        )
+        assert storage.summarize(from_date, to_date) == expected
+
+
+class TestEndpoints:
+    def test_list_and_pages(self):
+        _seed()
+        first = client.get("/transactions", params={"limit": 3})
+        assert [t["merchant"] for t in first.json()] == ["Whole Foods", "Cinema", "Employer"]
+        second = client.get(
+            "/transactions", params={"limit": 3, "cursor": first.headers["x-next-cursor"]}
+        )
+        assert [t["merchant"] for t in second.json()] == ["Landlord", "Whole Foods"]
+        assert "x-next-cursor" not in second.headers
+
+    def test_bad_cursor_date(self):
+        _seed()
+        cursor = base64.urlsafe_b64encode(b'["nope","x"]').decode()
+        resp = client.get("/transactions", params={"limit": 3, "cursor": cursor})
+        assert resp.status_code == 400
+
+    def test_post_summary_and_goals(self):
+        client.post(
+            "/transactions",
+            json={"date": "2025-03-01", "amount": -20.0, "merchant": "Cafe", "category": "fun"},
+        )
+        assert client.get("/summary").json()["spend_by_category"] == {"fun": 20.0}
+        client.post("/goals", json=GOAL.model_dump(mode="json", exclude={"id"}))
+        assert client.get("/goals").json()[0]["projection"]["months_to_target"] == 20
+
+
+class TestMigrate:
+    def test_json_to_partitioned(self):
+        json_store = storage.open_store("json", storage.DATA_FILE)
+        json_store.append("transactions", [t.model_dump(mode="json") for t in TXNS])
+        json_store.append("goals", [GOAL.model_dump(mode="json")])
+        cli.main(["migrate", "--to", "partitioned", "--data-file", str(storage.DATA_FILE)])
+        assert storage.load_data() == json_store.load()
@@ -0,0 +1,252 @@
+import json
+import sqlite3
+from datetime import date
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import cli, storage
+from app.main import app
+from app.models import Category, Goal, Transaction, compute_summary
+
+client = TestClient(app)
+
+
+@pytest.fixture(autouse=True)
+def isolated_data_dir(tmp_path, monkeypatch):
+    data_dir = tmp_path / "data"
+    data_file = data_dir / "compound.json"
+    monkeypatch.setattr(storage, "DATA_DIR", data_dir)
+    monkeypatch.setattr(storage, "DATA_FILE", data_file)
+    monkeypatch.setattr(storage, "STORAGE_BACKEND", "sqlite")
+    return data_dir
+
+
+TXNS = [
+    Transaction(
+        date=date(2025, 1, 10),
+        amount=-50.0,
+        merchant="Whole Foods",
+        category=Category.groceries,
+    ),
+    Transaction(
+        date=date(2025, 1, 20),
+        amount=-1200.0,
+        merchant="Landlord",
+        category=Category.rent,
+    ),
+    Transaction(
+        date=date(2025, 2, 5),
+        amount=3000.0,
+        merchant="Employer",
+        category=Category.salary,
+        notes="February",
+    ),
+]
+
+GOAL = Goal(
+    name="Emergency Fund",
+    target_amount=10000.0,
+    monthly_contribution=500.0,
+    start_date=date(2025, 1, 1),
+)
+
+
+def _seed() -> None:
+    for tx in TXNS:
+        storage.append_transaction(tx)
+
+
+class TestSqliteStore:
+    def test_selected_by_configuration(self, isolated_data_dir):
+        storage.load_data()
+        assert (isolated_data_dir / "compound.db").exists()
+        assert not (isolated_data_dir / "compound.json").exists()
+
+    def test_round_trip(self):
+        _seed()
+        storage.append_goal(GOAL)
+        data = storage.load_data()
+        assert data["transactions"] == [t.model_dump(mode="json") for t in TXNS]
+        assert data["goals"] == [GOAL.model_dump(mode="json")]
+
+    def test_save_replaces_store(self):
+        _seed()
+        storage.save_data({"transactions": [], "goals": []})
+        assert storage.load_data() == {"transactions": [], "goals": []}
+
+    def test_wal_mode_and_indexes(self, isolated_data_dir):
+        storage.load_data()
+        conn = sqlite3.connect(isolated_data_dir / "compound.db")
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        indexes = {
+            row[0]
+            for row in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'index'"
+                " AND tbl_name = 'transactions'"
+            )
+        }
+        assert {"ix_transactions_date", "ix_transactions_category_date"} <= indexes
+
+    def test_query_filters_and_order(self):
+        _seed()
+        txns = storage.query_transactions(from_date=date(2025, 1, 15))
+        assert [t["merchant"] for t in txns] == ["Employer", "Landlord"]
+        txns = storage.query_transactions(category=Category.groceries)
+        assert [t["merchant"] for t in txns] == ["Whole Foods"]
+
+    @pytest.mark.parametrize(
+        "from_date, to_date",
+        [(None, None), (date(2025, 1, 15), None), (None, date(2025, 1, 31))],
+    )
+    def test_summarize_matches_compute_summary(self, from_date, to_date):
+        _seed()
+        expected = compute_summary(
+            [
+                t
+                for t in TXNS
+                if (from_date is None or t.date >= from_date)
+                and (to_date is None or t.date <= to_date)
+            ]
+        )
+        assert storage.summarize(from_date, to_date) == expected
+
+    def test_monthly_totals_follow_writes(self, isolated_data_dir):
+        _seed()
+        conn = sqlite3.connect(isolated_data_dir / "compound.db")
+        rows = conn.execute(
+            "SELECT month, category, income, expense, expense_rows, rows"
+            " FROM monthly_totals ORDER BY month, category"
+        ).fetchall()
+        assert rows == [
+            ("2025-01", "groceries", 0, 5000, 1, 1),
+            ("2025-01", "rent", 0, 120000, 1, 1),
+            ("2025-02", "salary", 300000, 0, 0, 1),
+        ]
+        storage.save_data({"transactions": [], "goals": []})
+        assert conn.execute("SELECT COUNT(*) FROM monthly_totals").fetchone() == (0,)
+
+    def test_monthly_totals_backfilled(self, isolated_data_dir):
+        _seed()
+        conn = sqlite3.connect(isolated_data_dir / "compound.db")
+        with conn:
+            conn.execute("DROP TABLE monthly_totals")
+        storage._stores.clear()
+        assert storage.summarize() == compute_summary(TXNS)
+        assert conn.execute("SELECT SUM(rows) FROM monthly_totals").fetchone() == (3,)
+
+    def test_version_bumped_by_writes(self):
+        version = storage.store_version()
+        assert storage.store_version() == version
+        _seed()
+        assert storage.store_version() == version + len(TXNS)
+        storage.save_data({"transactions": [], "goals": []})
+        assert storage.store_version() == version + len(TXNS) + 1
+
+
+class TestEndpoints:
+    def test_list_transactions(self):
+        _seed()
+        resp = client.get("/transactions", params={"to": "2025-01-31"})
+        assert [t["date"] for t in resp.json()] == ["2025-01-20", "2025-01-10"]
+
+    def test_post_and_summary(self):
+        client.post("/transactions", json={
+            "date": "2025-03-01",
+            "amount": -20.0,
+            "merchant": "Cafe",
+            "category": "fun",
+        })
+        body = client.get("/summary").json()
+        assert body["total_expense"] == 20.0
+        assert body["spend_by_category"] == {"fun": 20.0}
+
+    def test_goals(self):
+        storage.append_goal(GOAL)
+        items = client.get("/goals").json()
+        assert items[0]["projection"]["months_to_target"] == 20
+
+
+class TestMigrate:
+    def test_json_to_sqlite(self, isolated_data_dir):
+        json_store = storage.open_store("json", storage.DATA_FILE)
+        json_store.append("transactions", [t.model_dump(mode="json") for t in TXNS])
+        json_store.append("goals", [GOAL.model_dump(mode="json")])
+
+        cli.main(["migrate", "--data-file", str(storage.DATA_FILE)])
+
+        assert storage.load_data() == json_store.load()
+
+    def test_sqlite_to_json(self, isolated_data_dir):
+        _seed()
+        cli.main([
+            "migrate", "--from", "sqlite", "--to", "json",
+            "--data-file", str(storage.DATA_FILE),
+        ])
+        raw = json.loads((isolated_data_dir / "compound.json").read_text())
+        assert len(raw["transactions"]) == 3
+
+    def test_refuses_missing_source(self, isolated_data_dir):
+        _seed()
+        with pytest.raises(SystemExit) as exc:
+            cli.main([
+                "migrate", "--from", "json", "--to", "sqlite",
+                "--data-file", str(storage.DATA_FILE),
+            ])
+        assert exc.value.code != 0
+        assert not (isolated_data_dir / "compound.json").exists()
+        assert len(storage.load_data()["transactions"]) == 3
+
+    def test_refuses_empty_source_without_force(self, isolated_data_dir):
+        storage.open_store("json", storage.DATA_FILE).save({"transactions": [], "goals": []})
+        _seed()
+        args = [
+            "migrate", "--from", "json", "--to", "sqlite",
+            "--data-file", str(storage.DATA_FILE),
+        ]
+        with pytest.raises(SystemExit):
+            cli.main(args)
+        assert len(storage.load_data()["transactions"]) == 3
+        cli.main([*args, "--force"])
+        assert storage.load_data()["transactions"] == []
+
+
+class TestExport:
+    def test_streams_from_cursor(self):
+        _seed()
+        resp = client.get("/transactions/export", params={"from": "2025-01-15"})
+        rows = [json.loads(line) for line in resp.text.splitlines()]
+        assert [r["merchant"] for r in rows] == ["Landlord", "Employer"]
+
+
+class TestPagination:
+    def test_keyset_pages(self):
+        _seed()
+        first = client.get("/transactions", params={"limit": 2})
+        assert [t["merchant"] for t in first.json()] == ["Employer", "Landlord"]
+        second = client.get(
+            "/transactions",
+            params={"limit": 2, "cursor": first.headers["x-next-cursor"]},
+        )
+        assert [t["merchant"] for t in second.json()] == ["Whole Foods"]
+        assert "x-next-cursor" not in second.headers
+
+
+class TestVerify:
+    @pytest.mark.parametrize("backend", ["json", "sqlite"])
+    def test_summaries_match(self, backend, capsys):
+        storage.open_store(backend, storage.DATA_FILE).append(
+            "transactions", [t.model_dump(mode="json") for t in TXNS]
+        )
+        cli.main(["verify", "--backend", backend, "--data-file", str(storage.DATA_FILE)])
+        assert "match" in capsys.readouterr().out
+
+    def test_reports_stale_totals(self, isolated_data_dir, capsys):
+        _seed()
+        conn = sqlite3.connect(isolated_data_dir / "compound.db")
+        with conn:
+            conn.execute("UPDATE monthly_totals SET expense = 0 WHERE category = 'rent'")
+        with pytest.raises(SystemExit) as exc:
+            cli.main(["verify", "--data-file", str(storage.DATA_FILE)])
+        assert exc.value.code == 1
+        assert "from=None to=None" in capsys.readouterr().err
@@ -1,10 +1,12 @@
 import json
+import multiprocessing
+import threading
 from datetime import date
 from pathlib import Path
 
 import pytest
 
-from app.models import Category, Goal, Transaction
+from app.models import Category, Goal, Transaction, compute_summary
 from app import storage
 
 
@@ -102,3 +104,218 @@ class TestAppendGoal:
         data = storage.load_data()
         assert len(data["transactions"]) == 1
         assert len(data["goals"]) == 1
+
+
+def _tx(i: int = 0) -> Transaction:
+    return Transaction(
+        date=date(2025, 1, i % 28 + 1),
+        amount=-10.0,
+        merchant=f"Store {i}",
+        category=Category.other,
+    )
+
+
+class TestRecordLog:
+    def test_append_does_not_rewrite_snapshot(self, isolated_data_dir):
+        storage.load_data()
+        snapshot = isolated_data_dir / "compound.json"
+        before = snapshot.read_text()
+        storage.append_transaction(_tx())
+        assert snapshot.read_text() == before
+        assert (isolated_data_dir / "compound.log").exists()
+
+    def test_compact_folds_log_into_snapshot(self, isolated_data_dir):
+        for i in range(3):
+            storage.append_transaction(_tx(i))
+        storage.compact()
+        assert not (isolated_data_dir / "compound.log").exists()
+        raw = json.loads((isolated_data_dir / "compound.json").read_text())
+        assert [t["merchant"] for t in raw["transactions"]] == [
+            "Store 0", "Store 1", "Store 2",
+        ]
+        assert len(storage.load_data()["transactions"]) == 3
+
+    def test_compacts_when_log_exceeds_threshold(self, isolated_data_dir, monkeypatch):
+        monkeypatch.setattr(storage, "COMPACT_THRESHOLD_BYTES", 1)
+        storage.append_transaction(_tx())
+        assert not (isolated_data_dir / "compound.log").exists()
+        assert len(storage.load_data()["transactions"]) == 1
+
+    def test_save_data_discards_log(self, isolated_data_dir):
+        storage.append_transaction(_tx())
+        storage.save_data({"transactions": [], "goals": []})
+        assert storage.load_data() == {"transactions": [], "goals": []}
+
+    def test_torn_tail_is_ignored(self, isolated_data_dir):
+        storage.append_transaction(_tx())
+        with open(isolated_data_dir / "compound.log", "a") as f:
+            f.write('{"kind": "transactions", "rec')
+        assert len(storage.load_data()["transactions"]) == 1
+
+    @pytest.mark.parametrize("reload_first", [True, False])
+    def test_append_after_torn_tail(self, isolated_data_dir, reload_first):
+        storage.append_transaction(_tx(0))
+        with open(isolated_data_dir / "compound.log", "a") as f:
+            f.write('{"kind": "transactions", "rec')
+        storage._stores.clear()  # Restart.
+        if reload_first:
+            assert len(storage.load_data()["transactions"]) == 1
+        storage.append_transaction(_tx(1))
+        storage._stores.clear()
+        data = storage.load_data()
+        assert [t["merchant"] for t in data["transactions"]] == ["Store 0", "Store 1"]
+
+    def test_recovers_interrupted_compaction(self, isolated_data_dir):
+        for i in range(2):
+            storage.append_transaction(_tx(i))
+        logged = (isolated_data_dir / "compound.log").read_text()
+        storage.compact()
+        # Crash after the snapshot was written but before the log was removed.
+        pending = isolated_data_dir / "compound.log.compacting"
+        pending.write_text(logged)
+        data = storage.load_data()
+        assert not pending.exists()
+        assert [t["merchant"] for t in data["transactions"]] == ["Store 0", "Store 1"]
+
+
+class TestReadCache:
+    def test_repeated_loads_hit_cache(self, isolated_data_dir):
+        storage.append_transaction(_tx())
+        storage.load_data()
+        before = storage.cache_stats()
+        first = storage.load_data()
+        assert storage.load_data() is first
+        after = storage.cache_stats()
+        assert after["hits"] - before["hits"] == 2
+        assert after["misses"] == before["misses"]
+
+    def test_append_updates_cache_in_place(self, isolated_data_dir):
+        storage.load_data()
+        storage.append_transaction(_tx(1))
+        before = storage.cache_stats()
+        data = storage.load_data()
+        assert [t["merchant"] for t in data["transactions"]] == ["Store 1"]
+        assert storage.cache_stats()["misses"] == before["misses"]
+
+    def test_external_write_invalidates(self, isolated_data_dir):
+        storage.load_data()
+        payload = {"transactions": [{"x": 1}], "goals": []}
+        (isolated_data_dir / "compound.json").write_text(json.dumps(payload))
+        assert storage.load_data() == payload
+
+    def test_external_log_append_invalidates(self, isolated_data_dir):
+        storage.load_data()
+        record = _tx(2).model_dump(mode="json")
+        with open(isolated_data_dir / "compound.log", "a") as f:
+            f.write(json.dumps({"kind": "transactions", "record": record}) + "\n")
+        assert storage.load_data()["transactions"] == [record]
+
+    def test_save_data_invalidates(self, isolated_data_dir):
+        storage.append_transaction(_tx())
+        storage.load_data()
+        storage.save_data({"transactions": [], "goals": [{"name": "g"}]})
+        assert storage.load_data() == {"transactions": [], "goals": [{"name": "g"}]}
+
+
+def _append_many(worker: int, count: int) -> None:
+    for i in range(count):
+        storage.append_transaction(_tx(worker * 1000 + i))
+
+
+class TestConcurrentWriters:
+    def test_threads_do_not_lose_updates(self, isolated_data_dir, monkeypatch):
+        monkeypatch.setattr(storage, "COMPACT_THRESHOLD_BYTES", 4096)
+        threads = [
+            threading.Thread(target=_append_many, args=(w, 25)) for w in range(8)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert len(storage.load_data()["transactions"]) == 200
+
+    def test_processes_do_not_lose_updates(self, isolated_data_dir, monkeypatch):
+        monkeypatch.setattr(storage, "COMPACT_THRESHOLD_BYTES", 4096)
+        ctx = multiprocessing.get_context("fork")
+        procs = [ctx.Process(target=_append_many, args=(w, 25)) for w in range(4)]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join()
+        assert all(p.exitcode == 0 for p in procs)
+        merchants = {t["merchant"] for t in storage.load_data()["transactions"]}
+        assert len(merchants) == 100
+
+
+class TestQueryTransactions:
+    def test_index_follows_appends(self, isolated_data_dir):
+        storage.append_transaction(_tx(5))
+        assert len(storage.query_transactions()) == 1
+        storage.append_transaction(_tx(1))
+        storage.append_transaction(_tx(9))
+        dates = [t["date"] for t in storage.query_transactions()]
+        assert dates == ["2025-01-10", "2025-01-06", "2025-01-02"]
+        window = storage.query_transactions(date(2025, 1, 2), date(2025, 1, 6))
+        assert [t["merchant"] for t in window] == ["Store 5", "Store 1"]
+
+    def test_index_rebuilt_after_external_write(self, isolated_data_dir):
+        storage.append_transaction(_tx(1))
+        storage.query_transactions()
+        record = _tx(2).model_dump(mode="json")
+        with open(isolated_data_dir / "compound.log", "a") as f:
+            f.write(json.dumps({"kind": "transactions", "record": record}) + "\n")
+        assert len(storage.query_transactions()) == 2
+
+
+class TestSummarize:
+    def test_aggregates_follow_appends(self, isolated_data_dir):
+        storage.append_transaction(_tx(1))
+        storage.summarize()
+        storage.append_transaction(_tx(9))
+        storage.append_transaction(
+            Transaction(
+                date=date(2025, 2, 3),
+                amount=250.0,
+                merchant="Employer",
+                category=Category.salary,
+            )
+        )
+        txns = [Transaction(**t) for t in storage.load_data()["transactions"]]
+        assert storage.summarize() == compute_summary(txns)
+        assert storage.summarize(date(2025, 1, 5)) == compute_summary(txns[1:])
+
+
+class TestVersion:
+    def test_reads_do_not_change_version(self, isolated_data_dir):
+        version = storage.store_version()
+        storage.load_data()
+        storage.query_transactions()
+        assert storage.store_version() == version
+
+    def test_writes_increase_version(self, isolated_data_dir):
+        versions = [storage.store_version()]
+        storage.append_transaction(_tx(1))
+        versions.append(storage.store_version())
+        storage.save_data({"transactions": [], "goals": []})
+        versions.append(storage.store_version())
+        assert versions == sorted(set(versions))
+
+    def test_compaction_keeps_version(self, isolated_data_dir):
+        storage.append_transaction(_tx(1))
+        version = storage.store_version()
+        storage.compact()
+        assert storage.store_version() == version
+
+    def test_external_write_changes_version(self, isolated_data_dir):
+        storage.append_transaction(_tx(1))
+        version = storage.store_version()
+        record = _tx(2).model_dump(mode="json")
+        with open(isolated_data_dir / "compound.log", "a") as f:
+            f.write(json.dumps({"kind": "transactions", "record": record}) + "\n")
+        assert storage.store_version() > version
+
+    def test_lost_version_file_still_moves_forward(self, isolated_data_dir):
+        storage.append_transaction(_tx(1))
+        version = storage.store_version()
+        (isolated_data_dir / "compound.version").unlink()
+        assert storage.store_version() > version
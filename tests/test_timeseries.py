@@ -0,0 +1,186 @@
+import random
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app import storage, timeseries
+from app.indexes import Columns
+from app.main import app
+from app.models import Category, Granularity, Transaction
+
+client = TestClient(app)
+
+
+def _records(n: int, seed: int = 0) -> list[dict]:
+    rng = random.Random(seed)
+    start = date(2022, 11, 1)
+    return [
+        Transaction(
+            date=start + timedelta(days=rng.randrange(800)),
+            amount=round(rng.uniform(-500, 500), 2),
+            merchant=f"Merchant {rng.randrange(20)}",
+            category=rng.choice(list(Category)),
+        ).model_dump(mode="json")
+        for _ in range(n)
+    ]
+
+
+def _filter(records, from_date=None, to_date=None):
+    return [
+        r
+        for r in records
+        if (from_date is None or r["date"] >= from_date.isoformat())
+        and (to_date is None or r["date"] <= to_date.isoformat())
+    ]
+
+
+def _assert_close(actual, expected):
+    assert actual["granularity"] == expected["granularity"]
+    assert [p["period"] for p in actual["points"]] == [p["period"] for p in expected["points"]]
+    for a, e in zip(actual["points"], expected["points"]):
+        for key in ("income", "expense", "net"):
+            assert a[key] == pytest.approx(e[key])
+        if "categories" in e:
+            assert a["categories"].keys() == e["categories"].keys()
+            for c in e["categories"]:
+                assert a["categories"][c] == pytest.approx(e["categories"][c])
+        else:
+            assert "categories" not in a
+
+
+RANGES = [(None, None), (date(2023, 2, 15), date(2024, 3, 3)), (date(2030, 1, 1), None)]
+
+
+class TestPeriodLabel:
+    @pytest.mark.parametrize(
+        "granularity, label",
+        [
+            (Granularity.day, "2025-03-14"),
+            (Granularity.week, "2025-03-10"),
+            (Granularity.month, "2025-03"),
+            (Granularity.year, "2025"),
+        ],
+    )
+    def test_labels(self, granularity, label):
+        assert timeseries.period_label("2025-03-14", granularity) == label
+
+    def test_week_starts_on_monday(self):
+        assert timeseries.period_label("2025-03-10", Granularity.week) == "2025-03-10"
+        assert timeseries.period_label("2025-03-16", Granularity.week) == "2025-03-10"
+        assert timeseries.period_label("2025-01-01", Granularity.week) == "2024-12-30"
+
+
+class TestFromColumns:
+    @pytest.mark.parametrize("granularity", list(Granularity))
+    @pytest.mark.parametrize("by_category", [False, True])
+    @pytest.mark.parametrize("from_date, to_date", RANGES)
+    def test_matches_from_records(self, granularity, by_category, from_date, to_date):
+        records = _records(600, seed=1)
+        actual = timeseries.from_columns(
+            *Columns(records).arrays(), granularity, from_date, to_date, by_category
+        )
+        expected = timeseries.from_records(
+            _filter(records, from_date, to_date), granularity, by_category
+        )
+        _assert_close(actual, expected)
+
+    def test_totals(self):
+        records = [
+            {"date": "2025-01-05", "amount": 100.0, "category": "salary"},
+            {"date": "2025-01-20", "amount": -30.25, "category": "fun"},
+            {"date": "2025-03-01", "amount": -10.0, "category": "fun"},
+        ]
+        series = timeseries.from_columns(
+            *Columns(records).arrays(), Granularity.month, by_category=True
+        )
+        assert series == {
+            "granularity": "month",
+            "points": [
+                {
+                    "period": "2025-01",
+                    "income": 100.0,
+                    "expense": 30.25,
+                    "net": 69.75,
+                    "categories": {
+                        "salary": {"income": 100.0, "expense": 0.0, "net": 100.0},
+                        "fun": {"income": 0.0, "expense": 30.25, "net": -30.25},
+                    },
+                },
+                {
+                    "period": "2025-03",
+                    "income": 0.0,
+                    "expense": 10.0,
+                    "net": -10.0,
+                    "categories": {"fun": {"income": 0.0, "expense": 10.0, "net": -10.0}},
+                },
+            ],
+        }
+
+    @pytest.mark.parametrize("granularity", list(Granularity))
+    def test_sized_by_days_with_records(self, granularity, monkeypatch):
+        records = [
+            {"date": "0001-01-01", "amount": 5.0, "category": "salary"},
+            {"date": "9999-12-31", "amount": -2.5, "category": "fun"},
+        ]
+        sizes = []
+        real_bincount = np.bincount
+
+        def bincount(x, *args, minlength=0, **kwargs):
+            sizes.append(minlength)
+            return real_bincount(x, *args, minlength=minlength, **kwargs)
+
+        monkeypatch.setattr(np, "bincount", bincount)
+        series = timeseries.from_columns(
+            *Columns(records).arrays(), granularity, by_category=True
+        )
+        assert max(sizes) == 2 * len(timeseries.CATEGORIES)
+        assert [p["net"] for p in series["points"]] == [5.0, -2.5]
+
+    def test_empty(self):
+        assert timeseries.from_columns(*Columns([]).arrays(), Granularity.day) == {
+            "granularity": "day",
+            "points": [],
+        }
+
+
+class TestEndpoint:
+    @pytest.mark.parametrize("granularity", list(Granularity))
+    def test_matches_from_records(self, backend, granularity):
+        records = _records(300, seed=2)
+        storage.get_store().append("transactions", records)
+        resp = client.get(
+            "/summary/timeseries",
+            params={
+                "granularity": granularity.value,
+                "from": "2023-02-15",
+                "to": "2024-03-03",
+                "by_category": "true",
+            },
+        )
+        assert resp.status_code == 200
+        assert resp.headers["etag"]
+        expected = timeseries.from_records(
+            _filter(records, date(2023, 2, 15), date(2024, 3, 3)), granularity, True
+        )
+        _assert_close(resp.json(), expected)
+
+    def test_defaults_to_months_and_follows_appends(self, backend):
+        storage.get_store().append("transactions", _records(50, seed=3))
+        client.get("/summary/timeseries")
+        client.post(
+            "/transactions",
+            json={"date": "2031-05-02", "amount": 12.5, "merchant": "Refund", "category": "other"},
+        )
+        body = client.get("/summary/timeseries").json()
+        assert body["granularity"] == "month"
+        assert body["points"][-1] == {
+            "period": "2031-05",
+            "income": 12.5,
+            "expense": 0.0,
+            "net": 12.5,
+        }
+
+    def test_rejects_unknown_granularity(self, backend):
+        assert client.get("/summary/timeseries", params={"granularity": "hour"}).status_code == 422
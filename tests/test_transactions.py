@@ -1,10 +1,15 @@
+import asyncio
+import base64
+import csv
+import io
+import json
 from datetime import date
 from uuid import UUID
 
 import pytest
 from fastapi.testclient import TestClient
 
-from app import storage
+from app import export, storage
 from app.main import app
 from app.models import Category, Transaction
 
@@ -204,3 +209,322 @@ class TestPostTransaction:
             "category": "nonexistent",
         })
         assert resp.status_code == 422
+
+
+async def _chunks(body: bytes, size: int):
+    for i in range(0, len(body), size):
+        yield body[i : i + size]
+
+
+async def _collect(items) -> list:
+    return [item async for item in items]
+
+
+class TestBulkImport:
+    def test_csv(self):
+        body = (
+            "date,amount,merchant,category,notes\n"
+            "2025-01-10,-50.00,Whole Foods,groceries,\n"
+            '2025-01-20,-1200,Landlord,rent,"January\nrent"\n'
+            "2025-02-05,3000,Employer,salary,\n"
+        )
+        resp = client.post(
+            "/transactions/bulk", content=body, headers={"Content-Type": "text/csv"}
+        )
+        assert resp.status_code == 200
+        assert resp.json() == {"inserted": 3, "failed": 0, "errors": []}
+        txns = storage.load_data()["transactions"]
+        assert [t["merchant"] for t in txns] == ["Whole Foods", "Landlord", "Employer"]
+        assert txns[0]["notes"] is None
+        assert txns[1]["notes"] == "January\nrent"
+        assert txns[2]["category"] == "salary"
+
+    def test_ndjson(self):
+        body = "\n".join(
+            tx.model_dump_json(exclude={"id"}) for tx in TXNS
+        ) + "\n"
+        resp = client.post(
+            "/transactions/bulk",
+            content=body,
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+        assert resp.json()["inserted"] == 3
+        assert len(client.get("/transactions").json()) == 3
+
+    def test_reports_row_errors_without_aborting(self):
+        body = (
+            '{"date": "2025-01-01", "amount": -5, "merchant": "A"}\n'
+            '{"date": "nope", "amount": -5, "merchant": "B"}\n'
+            "not json\n"
+            '{"date": "2025-01-03", "amount": -5, "merchant": "C", "category": "x"}\n'
+            '{"date": "2025-01-04", "amount": -5, "merchant": "D"}\n'
+        )
+        resp = client.post(
+            "/transactions/bulk",
+            content=body,
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+        result = resp.json()
+        assert result["inserted"] == 2
+        assert result["failed"] == 3
+        assert [e["row"] for e in result["errors"]] == [2, 3, 4]
+        assert result["errors"][0]["message"].startswith("date:")
+        assert result["errors"][1]["message"].startswith("invalid JSON")
+        merchants = [t["merchant"] for t in storage.load_data()["transactions"]]
+        assert merchants == ["A", "D"]
+
+    def test_commits_once_per_batch(self, monkeypatch):
+        from app import ingest
+
+        monkeypatch.setattr(ingest, "BATCH_SIZE", 2)
+        writes = []
+        real_append_many = storage.get_store().append_many
+
+        def append_many(entries):
+            writes.extend(len(records) for _, records in entries)
+            real_append_many(entries)
+
+        monkeypatch.setattr(storage.get_store(), "append_many", append_many)
+        body = "date,amount,merchant\n" + "".join(
+            f"2025-01-0{i + 1},-1,M{i}\n" for i in range(5)
+        )
+        resp = client.post(
+            "/transactions/bulk", content=body, headers={"Content-Type": "text/csv"}
+        )
+        assert resp.json()["inserted"] == 5
+        assert writes == [2, 2, 1]
+
+    def test_error_report_is_capped(self, monkeypatch):
+        from app import ingest
+
+        monkeypatch.setattr(ingest, "MAX_REPORTED_ERRORS", 2)
+        body = "date,amount,merchant\n" + "bad,-1,M\n" * 5
+        resp = client.post(
+            "/transactions/bulk", content=body, headers={"Content-Type": "text/csv"}
+        )
+        result = resp.json()
+        assert result["failed"] == 5
+        assert len(result["errors"]) == 2
+
+    def test_unbalanced_quote_fails_the_lines_it_swallows(self, monkeypatch):
+        from app import ingest
+
+        monkeypatch.setattr(ingest, "MAX_RECORD_LINES", 3)
+        body = (
+            "date,amount,merchant,notes\n"
+            '2025-01-01,-1,A,"unterminated\n'
+            + "".join(f"2025-01-02,-1,M{i}\n" for i in range(5))
+        )
+        resp = client.post(
+            "/transactions/bulk", content=body, headers={"Content-Type": "text/csv"}
+        )
+        result = resp.json()
+        # The bad row swallows the lines up to the cap, then reading resyncs.
+        assert result["inserted"] == 3 and result["failed"] == 3
+        assert [e["row"] for e in result["errors"]] == [1, 2, 3]
+        assert result["errors"][0]["message"] == "invalid CSV: unterminated quoted field"
+        merchants = [t["merchant"] for t in storage.load_data()["transactions"]]
+        assert merchants == ["M2", "M3", "M4"]
+
+    def test_unbalanced_quote_resyncs_in_linear_time(self):
+        from app import ingest
+
+        body = 'date,amount,merchant\n2025-01-01,-1,"A\n' + "2025-01-02,-1,M\n" * 50_000
+        rows = asyncio.run(_collect(ingest._csv_rows(_chunks(body.encode(), 4096))))
+        errors = [r for r in rows if isinstance(r, ingest.InvalidRow)]
+        assert errors == [ingest.InvalidRow("invalid CSV: unterminated quoted field")] * (
+            ingest.MAX_RECORD_LINES
+        )
+        assert len(rows) == 1 + 50_000
+
+    def test_quote_open_at_end_fails_every_line(self):
+        body = "date,amount,merchant\n2025-01-01,-1,A\n2025-01-02,-1,\"B\n" + "".join(
+            f"2025-01-0{i},-1,M{i}\n" for i in range(3, 6)
+        )
+        resp = client.post(
+            "/transactions/bulk", content=body, headers={"Content-Type": "text/csv"}
+        )
+        result = resp.json()
+        assert result["inserted"] == 1 and result["failed"] == 4
+        assert [e["row"] for e in result["errors"]] == [2, 3, 4, 5]
+
+    def test_rows_must_be_objects(self):
+        body = (
+            '"x"\n'
+            "[1]\n"
+            "null\n"
+            '{"date": "2025-01-01", "amount": -5, "merchant": "A"}\n'
+        )
+        resp = client.post(
+            "/transactions/bulk", content=body, headers={"Content-Type": "application/x-ndjson"}
+        )
+        result = resp.json()
+        assert result["inserted"] == 1
+        assert [e["message"] for e in result["errors"]] == [
+            "invalid JSON: expected an object, got a string",
+            "invalid JSON: expected an object, got an array",
+            "invalid JSON: expected an object, got null",
+        ]
+
+    def test_long_line_dropped_without_buffering(self, monkeypatch):
+        from app import ingest
+
+        monkeypatch.setattr(ingest, "MAX_ROW_BYTES", 100)
+        body = b"x" * 10_000 + b"\nshort\n" + b"y" * 10_000
+        lines = asyncio.run(_collect(ingest._lines(_chunks(body, 7))))
+        too_long = ingest.InvalidRow("row too long")
+        assert lines == [too_long, "short", too_long]
+
+    @pytest.mark.parametrize(
+        "content_type, header",
+        [("text/csv", "date,amount,merchant\n"), ("application/x-ndjson", "")],
+    )
+    def test_long_line_is_one_error(self, monkeypatch, content_type, header):
+        from app import ingest
+
+        monkeypatch.setattr(ingest, "MAX_ROW_BYTES", 100)
+        good = (
+            '{"date": "2025-01-01", "amount": -1, "merchant": "A"}\n'
+            if header == ""
+            else "2025-01-01,-1,A\n"
+        )
+        body = header + "x" * 1000 + "\n" + good
+        resp = client.post(
+            "/transactions/bulk", content=body, headers={"Content-Type": content_type}
+        )
+        result = resp.json()
+        assert result["inserted"] == 1 and result["failed"] == 1
+        assert result["errors"][0]["message"].endswith("row too long")
+
+    @pytest.mark.parametrize("content_type", ["text/csv", "application/x-ndjson"])
+    def test_undecodable_body(self, content_type):
+        resp = client.post(
+            "/transactions/bulk", content=b"\xff\xfe", headers={"Content-Type": content_type}
+        )
+        assert resp.status_code == 200
+        assert resp.json()["failed"] == 1
+        assert resp.json()["errors"][0]["message"].endswith("not valid UTF-8")
+
+    def test_undecodable_line_costs_one_row(self):
+        body = "\ufeffdate,amount,merchant\n2025-01-01,-1,Caf\u00e9\n".encode()
+        body += b"2025-01-02,-1,Caf\xe9\n2025-01-03,-1,Bar\n"
+        resp = client.post(
+            "/transactions/bulk", content=body, headers={"Content-Type": "text/csv"}
+        )
+        result = resp.json()
+        assert result["inserted"] == 2
+        assert result["errors"] == [{"row": 2, "message": "invalid CSV: not valid UTF-8"}]
+        merchants = [t["merchant"] for t in storage.load_data()["transactions"]]
+        assert merchants == ["Caf\u00e9", "Bar"]
+
+    def test_unsupported_content_type(self):
+        resp = client.post(
+            "/transactions/bulk", content="{}", headers={"Content-Type": "application/json"}
+        )
+        assert resp.status_code == 415
+
+
+class TestExport:
+    def test_ndjson(self):
+        _seed(TXNS)
+        resp = client.get("/transactions/export")
+        assert resp.status_code == 200
+        assert resp.headers["content-type"].startswith("application/x-ndjson")
+        rows = [json.loads(line) for line in resp.text.splitlines()]
+        assert [r["merchant"] for r in rows] == ["Whole Foods", "Landlord", "Employer"]
+        assert set(rows[0]) == {"id", "date", "amount", "merchant", "category", "notes"}
+
+    def test_csv(self):
+        _seed(TXNS)
+        resp = client.get("/transactions/export", params={"format": "csv"})
+        assert resp.headers["content-type"].startswith("text/csv")
+        assert 'filename="transactions.csv"' in resp.headers["content-disposition"]
+        rows = list(csv.DictReader(io.StringIO(resp.text)))
+        assert [r["merchant"] for r in rows] == ["Whole Foods", "Landlord", "Employer"]
+        assert rows[0]["amount"] == "-50.0"
+
+    def test_filters(self):
+        _seed(TXNS)
+        resp = client.get(
+            "/transactions/export",
+            params={"from": "2025-01-15", "to": "2025-01-31", "category": "rent"},
+        )
+        rows = [json.loads(line) for line in resp.text.splitlines()]
+        assert [r["merchant"] for r in rows] == ["Landlord"]
+
+    def test_empty_csv_has_header(self):
+        resp = client.get("/transactions/export", params={"format": "csv"})
+        assert resp.text == "id,date,amount,merchant,category,notes\n"
+
+    def test_invalid_format(self):
+        resp = client.get("/transactions/export", params={"format": "xml"})
+        assert resp.status_code == 422
+
+    def test_encoding_is_lazy(self, monkeypatch):
+        monkeypatch.setattr(export, "CHUNK_ROWS", 10)
+        consumed = 0
+
+        def rows():
+            nonlocal consumed
+            for tx in TXNS * 100:
+                consumed += 1
+                yield tx.model_dump(mode="json")
+
+        chunks = export.encode(rows(), export.ExportFormat.ndjson)
+        first = next(chunks)
+        assert first.count("\n") == 10
+        assert consumed <= 11
+
+
+def _raw_cursor(key: list) -> str:
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+
+class TestPagination:
+    def _pages(self, **params):
+        pages, cursor = [], None
+        while True:
+            query = dict(params)
+            if cursor is not None:
+                query["cursor"] = cursor
+            resp = client.get("/transactions", params=query)
+            assert resp.status_code == 200
+            pages.append(resp.json())
+            cursor = resp.headers.get("x-next-cursor")
+            if cursor is None:
+                return pages
+
+    def test_walks_all_pages_in_order(self):
+        _seed(TXNS)
+        # Several transactions on the same day exercise the id tiebreak.
+        _seed([
+            Transaction(date=date(2025, 1, 20), amount=-1.0, merchant=f"M{i}")
+            for i in range(4)
+        ])
+        everything = client.get("/transactions").json()
+        pages = self._pages(limit=2)
+        assert [len(p) for p in pages] == [2, 2, 2, 1]
+        assert [t for p in pages for t in p] == everything
+
+    def test_no_cursor_when_page_not_full(self):
+        _seed(TXNS)
+        resp = client.get("/transactions", params={"limit": 3})
+        assert len(resp.json()) == 3
+        assert "x-next-cursor" not in resp.headers
+
+    def test_filters_apply_to_pages(self):
+        _seed(TXNS)
+        pages = self._pages(limit=1, to="2025-01-31")
+        assert [p[0]["merchant"] for p in pages] == ["Landlord", "Whole Foods"]
+
+    @pytest.mark.parametrize(
+        "cursor",
+        ["nope", _raw_cursor(["nope", "x"]), _raw_cursor(["20250101", "x"]), _raw_cursor([1, "x"])],
+    )
+    def test_invalid_cursor(self, cursor):
+        resp = client.get("/transactions", params={"limit": 1, "cursor": cursor})
+        assert resp.status_code == 400
+
+    def test_limit_bounds(self):
+        assert client.get("/transactions", params={"limit": 0}).status_code == 422
+        assert client.get("/transactions", params={"limit": 5000}).status_code == 422
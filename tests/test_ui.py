@@ -1,3 +1,5 @@
+import pytest
+
 from fastapi.testclient import TestClient
 
 from app.main import app
@@ -101,3 +103,14 @@ def test_home_links_to_goals():
 def test_summary_page_links_to_goals():
     resp = client.get("/summary-page")
     assert '/goals-page' in resp.text
+
+
+def test_home_pages_transactions():
+    html = client.get("/").text
+    assert 'id="load-more"' in html
+    assert "X-Next-Cursor" in html
+
+
+@pytest.mark.parametrize("path", ["/", "/goals-page", "/summary-page"])
+def test_pages_send_conditional_requests(path):
+    assert "If-None-Match" in client.get(path).text